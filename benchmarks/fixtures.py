@@ -0,0 +1,94 @@
+import pathlib
+import typing
+import json
+
+import torch
+import numpy
+
+from modules.nsf_hifigan.env import AttrDict
+from modules.nsf_hifigan.models import Generator
+from modules.rmvpe.model import E2E0
+
+SIGNALS = ("sweep", "vocal", "silence", "noise")
+
+# Architecture of the 44.1 kHz NSF-HiFiGAN release (128 mels, hop 512), the one the README recommends.
+NSF_HIFIGAN_CONFIG = {
+    "resblock": "1",
+    "upsample_rates": [8, 8, 2, 2, 2],
+    "upsample_kernel_sizes": [16, 16, 4, 4, 4],
+    "upsample_initial_channel": 512,
+    "resblock_kernel_sizes": [3, 7, 11],
+    "resblock_dilation_sizes": [[1, 3, 5], [1, 3, 5], [1, 3, 5]],
+    "num_mels": 128,
+    "n_fft": 2048,
+    "hop_size": 512,
+    "win_size": 2048,
+    "sampling_rate": 44100,
+    "fmin": 40,
+    "fmax": 16000,
+}
+
+# Same hop and mel layout with a fraction of the channels and one resblock kernel, for tests that compile the vocoder.
+TINY_NSF_HIFIGAN_CONFIG = {**NSF_HIFIGAN_CONFIG, "upsample_initial_channel": 32, "resblock_kernel_sizes": [3], "resblock_dilation_sizes": [[1, 3, 5]]}
+
+def sweep(duration: float, sample_rate: int) -> numpy.ndarray:
+    # Exponential sine sweep from 50 Hz to 2 kHz, repeated every 10 seconds.
+    time_axis = numpy.arange(int(duration * sample_rate)) / sample_rate % 10
+    rate = numpy.log(2000 / 50) / 10
+
+    return 0.5 * numpy.sin(2 * numpy.pi * 50 * (numpy.exp(rate * time_axis) - 1) / rate)
+
+def vocal(duration: float, sample_rate: int, seed: int = 0) -> numpy.ndarray:
+    # Harmonic tone with a melody, vibrato, a formant-like spectral tilt, breath noise and short pauses between notes.
+    random = numpy.random.default_rng(seed)
+    time_axis = numpy.arange(int(duration * sample_rate)) / sample_rate
+
+    notes = 220 * 2 ** (random.integers(-7, 8, int(duration) + 1) / 12)
+    frequency = notes[time_axis.astype(int)] * 2 ** (0.3 * numpy.sin(2 * numpy.pi * 5.5 * time_axis) / 12)
+    phase = 2 * numpy.pi * numpy.cumsum(frequency) / sample_rate
+
+    audio = sum(numpy.sin(harmonic * phase) / harmonic ** 1.5 for harmonic in range(1, 13))
+    audio = audio * (time_axis % 1 < 0.85) + 0.02 * random.standard_normal(len(time_axis))
+
+    return 0.4 * audio / numpy.max(numpy.abs(audio))
+
+def silence(duration: float, sample_rate: int) -> numpy.ndarray:
+    return numpy.zeros(int(duration * sample_rate))
+
+def noise(duration: float, sample_rate: int, seed: int = 0) -> numpy.ndarray:
+    return 0.3 * numpy.random.default_rng(seed).standard_normal(int(duration * sample_rate))
+
+def synthetic_audio(signal: str, duration: float, sample_rate: int = 44100) -> numpy.ndarray:
+    generators = {"sweep": sweep, "vocal": vocal, "silence": silence, "noise": noise}
+
+    if signal not in generators:
+        raise ValueError(f"Unknown signal: {signal} (expected one of {', '.join(SIGNALS)})")
+
+    return generators[signal](duration, sample_rate).astype(numpy.float32)
+
+def random_checkpoints(directory: str, seed: int = 0, config: dict = NSF_HIFIGAN_CONFIG) -> typing.Tuple[str, str]:
+    # Randomly initialized weights of the real architectures, saved in the layout of the released checkpoints,
+    # so the benchmarks run the same loading and inference code without downloading anything.
+    directory = pathlib.Path(directory)
+    torch.manual_seed(seed)
+
+    nsf_hifigan = directory / "nsf_hifigan" / "model"
+    nsf_hifigan.parent.mkdir(parents=True, exist_ok=True)
+    (nsf_hifigan.parent / "config.json").write_text(json.dumps(config))
+    torch.save({"generator": Generator(AttrDict(config)).state_dict()}, nsf_hifigan)
+
+    rmvpe = directory / "rmvpe" / "model.pt"
+    rmvpe.parent.mkdir(parents=True, exist_ok=True)
+    torch.save(E2E0(4, 1, (2, 2)).state_dict(), rmvpe)
+
+    return str(nsf_hifigan), str(rmvpe)
+
+def remove_excitation_noise(generator: Generator) -> Generator:
+    # Without noise and with only the fundamental feeding the source, the excitation no longer depends on the random
+    # draws, so renders can be compared sample for sample across batches, processes and runs.
+    generator.m_source.l_sin_gen.noise_std = 0
+
+    with torch.no_grad():
+        generator.m_source.l_linear.weight[:, 1:] = 0
+
+    return generator
@@ -0,0 +1,67 @@
+import subprocess
+import argparse
+import pathlib
+import json
+import time
+import typing
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# Imports the models and builds a `Shift` in a fresh interpreter, so the timings include every import it pulls in.
+MODEL_READY = """
+import time
+start = time.perf_counter()
+from modules.shifter import Shift
+imported = time.perf_counter()
+Shift({nsf_hifigan!r}, {rmvpe!r}, "cpu")
+print(imported - start, time.perf_counter() - imported)
+"""
+
+def run(command: typing.List[str]) -> typing.Tuple[float, str]:
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+
+    return time.perf_counter() - start, result.stdout
+
+def summarize(times: typing.List[float]) -> typing.Dict[str, float]:
+    times = sorted(times)
+
+    return {"min": times[0], "median": times[len(times) // 2], "max": times[-1], "runs": len(times)}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--nsf_hifigan", type=str, default="checkpoints/nsf_hifigan/model")
+    parser.add_argument("--rmvpe", type=str, default="checkpoints/rmvpe/model.pt")
+    parser.add_argument("--skip_models", action="store_true", help="only time `shift.py --help`")
+    parser.add_argument("--output", type=str, help="write the results to this JSON file")
+    arguments = parser.parse_args()
+
+    results = {"python": sys.version.split()[0]}
+
+    results["help"] = summarize([run([sys.executable, "shift.py", "--help"])[0] for _ in range(arguments.runs)])
+    print(f"shift.py --help: {results['help']['median']:.3f}s (median of {arguments.runs})")
+
+    if not arguments.skip_models:
+        code = MODEL_READY.format(nsf_hifigan=arguments.nsf_hifigan, rmvpe=arguments.rmvpe)
+        wall, imports, models = [], [], []
+
+        for _ in range(arguments.runs):
+            elapsed, stdout = run([sys.executable, "-c", code])
+            import_time, model_time = map(float, stdout.split()[-2:])
+
+            wall.append(elapsed)
+            imports.append(import_time)
+            models.append(model_time)
+
+        results["model_ready"] = summarize(wall)
+        results["import"] = summarize(imports)
+        results["load_models"] = summarize(models)
+        print(f"First model ready: {results['model_ready']['median']:.3f}s (import {results['import']['median']:.3f}s, models {results['load_models']['median']:.3f}s)")
+
+    if arguments.output:
+        pathlib.Path(arguments.output).write_text(json.dumps(results, indent=4))
+
+if __name__ == "__main__":
+    main()
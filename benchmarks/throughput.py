@@ -0,0 +1,237 @@
+import dataclasses
+import subprocess
+import statistics
+import platform
+import argparse
+import tempfile
+import pathlib
+import typing
+import json
+import time
+import sys
+import os
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import loguru
+import soundfile
+import torch
+import numpy
+
+from benchmarks.fixtures import SIGNALS, synthetic_audio, random_checkpoints
+from modules.shifter import Shift, BatchProcessor
+from modules.shifter.shift import F0_THRESHOLD
+from modules.shifter.profiler import current_memory, peak_memory, reset_peak_memory
+
+BENCHMARKS = ("mel", "rmvpe", "generator", "shift", "batch")
+BATCH_FILES = 4
+
+@dataclasses.dataclass
+class Measurement:
+    benchmark: str
+    signal: str
+    duration: float
+    threads: int
+    seconds: float
+    rtf: float
+    # Above the memory held before the runs.
+    peak_memory_mb: float
+    runs: int
+
+    @property
+    def key(self) -> typing.Tuple[str, str, float, int]:
+        return self.benchmark, self.signal, self.duration, self.threads
+
+def measure(function: typing.Callable[[], typing.Any], repeat: int, device: torch.device) -> typing.Tuple[float, float]:
+    # The peak is reported above the memory held before the runs (models, earlier benchmarks). It covers the untimed
+    # first run too, which is where the allocator grows: later runs reuse the memory it keeps.
+    reset_peak_memory(device)
+    baseline = current_memory(device)
+
+    # One untimed run first, so one-off costs (allocator growth, mel filterbanks, resampling kernels) are not timed.
+    function()
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times), peak_memory(device) - baseline
+
+def benchmark_functions(shifter: Shift, processor: BatchProcessor, audio: numpy.ndarray, batch_input: pathlib.Path, batch_output: pathlib.Path) -> typing.Dict[str, typing.Callable[[], typing.Any]]:
+    device = shifter.device
+    audio_tensor = torch.from_numpy(audio).unsqueeze(0).to(device)
+    audio_16k = shifter.resampler(audio_tensor[0], shifter.sample_rate, 16000)
+    analysis = shifter.analyze(audio)
+    f0 = torch.from_numpy(shifter.align_f0(analysis, 0)).float().unsqueeze(0).to(device)
+
+    def generator():
+        with torch.no_grad():
+            return shifter.generator(analysis.mel, f0)
+
+    return {
+        "mel": lambda: shifter.mel_extractor(audio_tensor),
+        "rmvpe": lambda: shifter.rmvpe.infer_from_audio(audio_16k, 16000, device, F0_THRESHOLD),
+        "generator": generator,
+        "shift": lambda: shifter.process_audio(audio, 2.0),
+        "batch": lambda: processor.process(str(batch_input), str(batch_output), 2.0, overwrite=True),
+    }
+
+def run(arguments: argparse.Namespace, nsf_hifigan: str, rmvpe: str, directory: pathlib.Path) -> typing.List[Measurement]:
+    device = torch.device(arguments.device)
+    measurements = []
+
+    for threads in arguments.threads:
+        torch.set_num_threads(threads)
+
+        shifter = Shift(nsf_hifigan, rmvpe, arguments.device, chunk_size=arguments.chunk_size, batch_size=arguments.batch_size)
+        processor = BatchProcessor(nsf_hifigan, rmvpe, arguments.device, chunk_size=arguments.chunk_size, batch_size=arguments.batch_size, workers=arguments.workers) if "batch" in arguments.benchmarks else None
+
+        for signal in arguments.signals:
+            for duration in arguments.lengths:
+                audio = synthetic_audio(signal, duration, shifter.sample_rate)
+                batch_input = directory / "input" / f"{signal}_{duration:g}"
+
+                if processor is not None and not batch_input.exists():
+                    batch_input.mkdir(parents=True)
+
+                    for index in range(BATCH_FILES):
+                        soundfile.write(str(batch_input / f"{index}.wav"), audio, shifter.sample_rate)
+
+                functions = benchmark_functions(shifter, processor, audio, batch_input, directory / "output")
+
+                for benchmark in arguments.benchmarks:
+                    seconds, peak = measure(functions[benchmark], arguments.repeat, device)
+                    audio_seconds = duration * (BATCH_FILES if benchmark == "batch" else 1)
+                    measurement = Measurement(benchmark, signal, duration, threads, seconds, seconds / audio_seconds, peak, arguments.repeat)
+                    measurements.append(measurement)
+
+                    print(f"{benchmark:<10}{signal:<9}{duration:>8g}s{threads:>4} threads{seconds:>10.3f}s  RTF {measurement.rtf:.4f}  peak +{peak:.0f} MB", flush=True)
+
+    return measurements
+
+def length_scaling(measurements: typing.List[Measurement]) -> typing.Dict[str, float]:
+    # Slope of log(time) over log(length) per benchmark, signal and thread count: 1.0 is linear in the audio length.
+    groups = {}
+
+    for measurement in measurements:
+        groups.setdefault(f"{measurement.benchmark}/{measurement.signal}/{measurement.threads}", []).append(measurement)
+
+    slopes = {}
+
+    for key, group in groups.items():
+        if len({measurement.duration for measurement in group}) > 1:
+            slopes[key] = float(numpy.polyfit(numpy.log([measurement.duration for measurement in group]), numpy.log([measurement.seconds for measurement in group]), 1)[0])
+
+    return slopes
+
+def thread_scaling(measurements: typing.List[Measurement]) -> typing.Dict[str, typing.Dict[int, float]]:
+    # Speedup over the fewest threads per benchmark, signal and length: n is perfect scaling to n times the threads.
+    groups = {}
+
+    for measurement in measurements:
+        groups.setdefault(f"{measurement.benchmark}/{measurement.signal}/{measurement.duration:g}s", []).append(measurement)
+
+    speedups = {}
+
+    for key, group in groups.items():
+        if len({measurement.threads for measurement in group}) > 1:
+            reference = min(group, key=lambda measurement: measurement.threads)
+            speedups[key] = {measurement.threads: reference.seconds / measurement.seconds for measurement in sorted(group, key=lambda measurement: measurement.threads)}
+
+    return speedups
+
+def git_commit() -> typing.Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment(arguments: argparse.Namespace) -> typing.Dict[str, typing.Any]:
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "device": arguments.device,
+        "chunk_size": arguments.chunk_size,
+        "batch_size": arguments.batch_size,
+        "workers": arguments.workers,
+        "checkpoints": "random" if not arguments.nsf_hifigan else "given",
+    }
+
+def compare(measurements: typing.List[Measurement], baseline_path: str, tolerance: float) -> int:
+    # Returns the number of measurements whose real-time factor got worse than the baseline by more than `tolerance`.
+    baseline = {Measurement(**row).key: Measurement(**row) for row in json.loads(pathlib.Path(baseline_path).read_text())["results"]}
+    regressions = 0
+
+    print(f"\nCompared with {baseline_path}:")
+
+    for measurement in measurements:
+        previous = baseline.get(measurement.key)
+
+        if previous is None:
+            continue
+
+        ratio = measurement.rtf / previous.rtf
+        regressed = ratio > 1 + tolerance
+        regressions += regressed
+
+        print(f"{measurement.benchmark:<10}{measurement.signal:<9}{measurement.duration:>8g}s{measurement.threads:>4} threads  RTF {previous.rtf:.4f} → {measurement.rtf:.4f} ({(ratio - 1) * 100:+.1f}%)" + ("  REGRESSION" if regressed else ""))
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--benchmarks", type=str, nargs="+", default=list(BENCHMARKS), choices=BENCHMARKS)
+    parser.add_argument("--signals", type=str, nargs="+", default=["vocal"], choices=SIGNALS)
+    parser.add_argument("--lengths", type=float, nargs="+", default=[1, 10, 60], help="seconds of audio, use --chunk_size for minutes-long lengths (up to 1800)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[torch.get_num_threads()])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--device", type=str, default="cpu", choices=["cuda", "cpu"])
+    parser.add_argument("--chunk_size", type=float, default=None)
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--nsf_hifigan", type=str, default=None, help="real checkpoints instead of random weights")
+    parser.add_argument("--rmvpe", type=str, default=None)
+    parser.add_argument("--output", type=str, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=str, help="JSON file of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative RTF increase reported as a regression")
+    arguments = parser.parse_args()
+
+    loguru.logger.remove()
+    loguru.logger.add(sys.stderr, level="WARNING")
+
+    with tempfile.TemporaryDirectory(prefix="pitchshift_benchmark_") as directory:
+        directory = pathlib.Path(directory)
+
+        if arguments.nsf_hifigan and arguments.rmvpe:
+            nsf_hifigan, rmvpe = arguments.nsf_hifigan, arguments.rmvpe
+        else:
+            nsf_hifigan, rmvpe = random_checkpoints(str(directory / "checkpoints"))
+
+        measurements = run(arguments, nsf_hifigan, rmvpe, directory)
+
+    slopes = length_scaling(measurements)
+    speedups = thread_scaling(measurements)
+
+    for key, slope in slopes.items():
+        print(f"Length scaling {key}: time ~ length^{slope:.2f}")
+
+    for key, speedup in speedups.items():
+        print(f"Thread scaling {key}: " + ", ".join(f"{threads} threads {value:.2f}x" for threads, value in speedup.items()))
+
+    if arguments.output:
+        pathlib.Path(arguments.output).write_text(json.dumps({"environment": environment(arguments), "results": [dataclasses.asdict(measurement) for measurement in measurements], "length_scaling": slopes, "thread_scaling": speedups}, indent=4))
+
+    if arguments.baseline:
+        return 1 if compare(measurements, arguments.baseline, arguments.tolerance) else 0
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,8 +6,8 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from torch.nn import Conv1d, ConvTranspose1d, AvgPool1d, Conv2d
-from torch.nn.utils import weight_norm, remove_weight_norm, spectral_norm
+from torch.nn import Conv1d, ConvTranspose1d
+from torch.nn.utils import weight_norm, remove_weight_norm
 
 from .env import AttrDict
 from .utils import init_weights, get_padding
@@ -15,13 +15,17 @@ from .utils import init_weights, get_padding
 LRELU_SLOPE = 0.1
 
 
-def load_model(model_path, device='cuda'):
+def load_config(model_path):
     config_file = os.path.join(os.path.split(model_path)[0], 'config.json')
     with open(config_file) as f:
         data = f.read()
 
     json_config = json.loads(data)
-    h = AttrDict(json_config)
+    return AttrDict(json_config)
+
+
+def load_model(model_path, device='cuda', dtype=torch.float32):
+    h = load_config(model_path)
 
     generator = Generator(h).to(device)
 
@@ -29,33 +33,37 @@ def load_model(model_path, device='cuda'):
     generator.load_state_dict(cp_dict['generator'])
     generator.eval()
     generator.remove_weight_norm()
+    generator.to(dtype)
     del cp_dict
     return generator, h
 
 
 class ResBlock1(torch.nn.Module):
-    def __init__(self, h, channels, kernel_size=3, dilation=(1, 3, 5)):
+    def __init__(self, h, channels, kernel_size=3, dilation=(1, 3, 5), fused=False):
         super(ResBlock1, self).__init__()
         self.h = h
+        norm_f = weight_norm if not fused else (lambda module: module)
         self.convs1 = nn.ModuleList([
-            weight_norm(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[0],
-                               padding=get_padding(kernel_size, dilation[0]))),
-            weight_norm(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[1],
-                               padding=get_padding(kernel_size, dilation[1]))),
-            weight_norm(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[2],
-                               padding=get_padding(kernel_size, dilation[2])))
+            norm_f(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[0],
+                          padding=get_padding(kernel_size, dilation[0]))),
+            norm_f(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[1],
+                          padding=get_padding(kernel_size, dilation[1]))),
+            norm_f(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[2],
+                          padding=get_padding(kernel_size, dilation[2])))
         ])
-        self.convs1.apply(init_weights)
+        if not fused:
+            self.convs1.apply(init_weights)
 
         self.convs2 = nn.ModuleList([
-            weight_norm(Conv1d(channels, channels, kernel_size, 1, dilation=1,
-                               padding=get_padding(kernel_size, 1))),
-            weight_norm(Conv1d(channels, channels, kernel_size, 1, dilation=1,
-                               padding=get_padding(kernel_size, 1))),
-            weight_norm(Conv1d(channels, channels, kernel_size, 1, dilation=1,
-                               padding=get_padding(kernel_size, 1)))
+            norm_f(Conv1d(channels, channels, kernel_size, 1, dilation=1,
+                          padding=get_padding(kernel_size, 1))),
+            norm_f(Conv1d(channels, channels, kernel_size, 1, dilation=1,
+                          padding=get_padding(kernel_size, 1))),
+            norm_f(Conv1d(channels, channels, kernel_size, 1, dilation=1,
+                          padding=get_padding(kernel_size, 1)))
         ])
-        self.convs2.apply(init_weights)
+        if not fused:
+            self.convs2.apply(init_weights)
 
     def forward(self, x):
         for c1, c2 in zip(self.convs1, self.convs2):
@@ -66,6 +74,16 @@ class ResBlock1(torch.nn.Module):
             x = xt + x
         return x
 
+    def step(self, x, state):
+        # forward() on the next samples of a stream, see Generator.vocode_step
+        for c1, c2 in zip(self.convs1, self.convs2):
+            xt = F.leaky_relu(x, LRELU_SLOPE)
+            xt = state.conv(c1, xt)
+            xt = F.leaky_relu(xt, LRELU_SLOPE)
+            xt = state.conv(c2, xt)
+            x = state.add(c2, xt, x)
+        return x
+
     def remove_weight_norm(self):
         for l in self.convs1:
             remove_weight_norm(l)
@@ -74,16 +92,18 @@ class ResBlock1(torch.nn.Module):
 
 
 class ResBlock2(torch.nn.Module):
-    def __init__(self, h, channels, kernel_size=3, dilation=(1, 3)):
+    def __init__(self, h, channels, kernel_size=3, dilation=(1, 3), fused=False):
         super(ResBlock2, self).__init__()
         self.h = h
+        norm_f = weight_norm if not fused else (lambda module: module)
         self.convs = nn.ModuleList([
-            weight_norm(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[0],
-                               padding=get_padding(kernel_size, dilation[0]))),
-            weight_norm(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[1],
-                               padding=get_padding(kernel_size, dilation[1])))
+            norm_f(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[0],
+                          padding=get_padding(kernel_size, dilation[0]))),
+            norm_f(Conv1d(channels, channels, kernel_size, 1, dilation=dilation[1],
+                          padding=get_padding(kernel_size, dilation[1])))
         ])
-        self.convs.apply(init_weights)
+        if not fused:
+            self.convs.apply(init_weights)
 
     def forward(self, x):
         for c in self.convs:
@@ -92,11 +112,104 @@ class ResBlock2(torch.nn.Module):
             x = xt + x
         return x
 
+    def step(self, x, state):
+        # forward() on the next samples of a stream, see Generator.vocode_step
+        for c in self.convs:
+            xt = F.leaky_relu(x, LRELU_SLOPE)
+            xt = state.conv(c, xt)
+            x = state.add(c, xt, x)
+        return x
+
     def remove_weight_norm(self):
         for l in self.convs:
             remove_weight_norm(l)
 
 
+class ExcitationState:
+    """ State of the harmonic source between two consecutive chunks of one signal
+    ExcitationState(phase, generator)
+    phase: tensor(batchsize, dim), phase of every harmonic after the last sample, in cycles
+    generator: torch.Generator the random initial phase and the noise are drawn from
+    """
+
+    def __init__(self, phase, generator):
+        self.phase = phase
+        self.generator = generator
+
+    @classmethod
+    def create(cls, batchsize, dim, device='cpu', seed=None):
+        generator = torch.Generator(device=device)
+        if seed is None:
+            generator.seed()
+        else:
+            generator.manual_seed(seed)
+        phase = torch.rand(batchsize, dim, generator=generator, device=device, dtype=torch.float64)
+        phase[:, 0] = 0
+        return cls(phase, generator)
+
+    def clone(self):
+        # snapshot that replays the same phase and noise, e.g. to render a chunk again
+        generator = torch.Generator(device=self.generator.device)
+        generator.set_state(self.generator.get_state())
+        return ExcitationState(self.phase.clone(), generator)
+
+
+class VocoderState:
+    """ State of the vocoder's convolutions between two consecutive blocks of one stream
+    VocoderState()
+    inputs: dict, for every convolution, the input samples it has not used up yet, starting as its left padding
+    pending: dict, for every sum, the samples one operand has reached and the others have not yet
+    skip: dict, for every transposed convolution, the output samples its padding still crops
+    Every layer only returns the samples all of its inputs have arrived for, so the output of a stream trails
+    its input by a fixed number of samples and matches a whole-file render from there on.
+    """
+
+    def __init__(self):
+        self.inputs = {}
+        self.pending = {}
+        self.skip = {}
+
+    def conv(self, conv, x):
+        # unpadded convolution over the kept and the new input, the input of the outputs it cannot compute yet is kept
+        if conv not in self.inputs:
+            self.inputs[conv] = x.new_zeros(*x.shape[:-1], conv.padding[0])
+        x = torch.cat([self.inputs[conv], x], -1)
+        stride = conv.stride[0]
+        span = conv.dilation[0] * (conv.kernel_size[0] - 1) + 1
+        length = (x.shape[-1] - span) // stride + 1 if x.shape[-1] >= span else 0
+        self.inputs[conv] = x[..., length * stride:]
+        if not length:
+            return x.new_zeros(x.shape[0], conv.out_channels, 0)
+        return F.conv1d(x[..., :(length - 1) * stride + span], conv.weight, conv.bias, conv.stride, 0, conv.dilation)
+
+    def conv_transpose(self, conv, x):
+        # the last inputs whose outputs overlap the new ones are kept, only the outputs no later input adds to are returned
+        stride = conv.stride[0]
+        overlap = -(-conv.kernel_size[0] // stride) - 1
+        if conv not in self.inputs:
+            self.inputs[conv] = x.new_zeros(*x.shape[:-1], overlap)
+            self.skip[conv] = conv.padding[0]
+        if not x.shape[-1]:
+            return x.new_zeros(x.shape[0], conv.out_channels, 0)
+        x = torch.cat([self.inputs[conv], x], -1)
+        self.inputs[conv] = x[..., x.shape[-1] - overlap:]
+        x = F.conv_transpose1d(x, conv.weight, conv.bias, conv.stride)[..., overlap * stride:x.shape[-1] * stride]
+        skip = min(self.skip[conv], x.shape[-1])
+        self.skip[conv] -= skip
+        return x[..., skip:]
+
+    def add(self, key, *operands):
+        # the operands start at the same sample but can end at different ones, the sum covers the samples all of them reached
+        if key in self.pending:
+            operands = [torch.cat([pending, operand], -1) for pending, operand in zip(self.pending[key], operands)]
+        length = min(operand.shape[-1] for operand in operands)
+        self.pending[key] = [operand[..., length:] for operand in operands]
+        x = operands[0][..., :length]
+        for operand in operands[1:]:
+            x = x + operand[..., :length]
+        return x
+
+
 class SineGen(torch.nn.Module):
     """ Definition of sine generator
     SineGen(samp_rate, harmonic_num = 0,
@@ -109,13 +222,14 @@ class SineGen(torch.nn.Module):
     noise_std: std of Gaussian noise (default 0.003)
     voiced_thoreshold: F0 threshold for U/V classification (default 0)
     flag_for_pulse: this SinGen is used inside PulseGen (default False)
+    block_frames: frames synthesized per pass of the reused scratch buffers (default 256)
     Note: when flag_for_pulse is True, the first time step of a voiced
         segment is always sin(np.pi) or cos(0)
     """
 
     def __init__(self, samp_rate, harmonic_num=0,
                  sine_amp=0.1, noise_std=0.003,
-                 voiced_threshold=0):
+                 voiced_threshold=0, block_frames=256):
         super(SineGen, self).__init__()
         self.sine_amp = sine_amp
         self.noise_std = noise_std
@@ -123,6 +237,8 @@ class SineGen(torch.nn.Module):
         self.dim = self.harmonic_num + 1
         self.sampling_rate = samp_rate
         self.voiced_threshold = voiced_threshold
+        self.block_frames = block_frames
+        self._scratch = {}
 
     def _f02uv(self, f0):
         # generate uv signal
@@ -130,50 +246,75 @@ class SineGen(torch.nn.Module):
         uv = uv * (f0 > self.voiced_threshold)
         return uv
 
+    def _buffer(self, name, numel, dtype, device):
+        # scratch memory kept across calls, grown when a longer input comes in
+        buffer = self._scratch.get(name)
+        if buffer is None or buffer.numel() < numel or buffer.dtype != dtype or buffer.device != device:
+            buffer = torch.empty(numel, dtype=dtype, device=device)
+            self._scratch[name] = buffer
+        return buffer[:numel]
+
     @torch.no_grad()
-    def forward(self, f0, upp):
-        """ sine_tensor, uv = forward(f0)
-        input F0: tensor(batchsize=1, length, dim=1)
-                  f0 for unvoiced steps should be 0
-        output sine_tensor: tensor(batchsize=1, length, dim)
-        output uv: tensor(batchsize=1, length, 1)
+    def excitation(self, f0, upp, phase=None, generator=None):
+        """ sine_tensor, uv, phase = excitation(f0, upp, phase, generator)
+        input F0: tensor(batchsize, length), f0 for unvoiced steps should be 0
+        input phase: tensor(batchsize, dim) in cycles, as returned by the previous chunk,
+                     or None to start with a random initial phase
+        input generator: torch.Generator for the initial phase and the noise, or None for the global one
+        output sine_tensor: tensor(batchsize, length * upp, dim), sines plus noise
+        output uv: tensor(batchsize, length * upp, 1)
+        output phase: tensor(batchsize, dim), phase after the last sample
         """
-        f0 = f0.unsqueeze(-1)
-        fn = torch.multiply(f0, torch.arange(1, self.dim + 1, device=f0.device).reshape((1, 1, -1)))
-        rad_values = (fn / self.sampling_rate) % 1  ###%1意味着n_har的乘积无法后处理优化
-        rand_ini = torch.rand(fn.shape[0], fn.shape[2], device=fn.device)
-        rand_ini[:, 0] = 0
-        rad_values[:, 0, :] = rad_values[:, 0, :] + rand_ini
-        is_half = rad_values.dtype is not torch.float32
-        tmp_over_one = torch.cumsum(rad_values.double(), 1)  # % 1  #####%1意味着后面的cumsum无法再优化
-        if is_half:
-            tmp_over_one = tmp_over_one.half()
-        else:
-            tmp_over_one = tmp_over_one.float()
-        tmp_over_one *= upp
-        tmp_over_one = F.interpolate(
-            tmp_over_one.transpose(2, 1), scale_factor=upp,
-            mode='linear', align_corners=True
-        ).transpose(2, 1)
-        rad_values = F.interpolate(rad_values.transpose(2, 1), scale_factor=upp, mode='nearest').transpose(2, 1)
-        tmp_over_one %= 1
-        tmp_over_one_idx = (tmp_over_one[:, 1:, :] - tmp_over_one[:, :-1, :]) < 0
-        cumsum_shift = torch.zeros_like(rad_values)
-        cumsum_shift[:, 1:, :] = tmp_over_one_idx * -1.0
+        batch, length = f0.shape
+        dtype = f0.dtype
+        rad_values = (f0.unsqueeze(-1) * torch.arange(1, self.dim + 1, device=f0.device, dtype=dtype) / self.sampling_rate) % 1
+        if phase is None:
+            rand_ini = torch.rand(batch, self.dim, generator=generator, device=f0.device)
+            rand_ini[:, 0] = 0
+            rad_values[:, 0, :] = rad_values[:, 0, :] + rand_ini
+            phase = torch.zeros(batch, self.dim, device=f0.device, dtype=torch.float64)
+
+        # every sample of frame t advances the phase by rad_values[t], so sample m of frame t sits at
+        # start[t] + (m + 1) * rad_values[t], start[t] being the phase reached by the previous frames
         rad_values = rad_values.double()
-        cumsum_shift = cumsum_shift.double()
-        sine_waves = torch.sin(torch.cumsum(rad_values + cumsum_shift, dim=1) * 2 * np.pi)
-        if is_half:
-            sine_waves = sine_waves.half()
-        else:
-            sine_waves = sine_waves.float()
-        sine_waves = sine_waves * self.sine_amp
+        start = (torch.cumsum(rad_values, 1) - rad_values) * upp + phase.double().unsqueeze(1)
+        start %= 1
+        phase = (start[:, -1, :] + upp * rad_values[:, -1, :]) % 1 if length else phase.double()
+
         uv = self._f02uv(f0)
-        uv = F.interpolate(uv.transpose(2, 1), scale_factor=upp, mode='nearest').transpose(2, 1)
         noise_amp = uv * self.noise_std + (1 - uv) * self.sine_amp / 3
-        noise = noise_amp * torch.randn_like(sine_waves)
-        sine_waves = sine_waves * uv + noise
-        return sine_waves, uv, noise
+        sine_gain = uv * self.sine_amp
+
+        # the noise is drawn straight into the output, the sines are then accumulated on top of it block by block
+        sine_waves = torch.randn(batch, length * upp, self.dim, generator=generator, device=f0.device, dtype=dtype)
+        frames = sine_waves.view(batch, length, upp, self.dim)
+        frames *= noise_amp[:, :, None, None]
+        ramp = torch.arange(1, upp + 1, device=f0.device, dtype=torch.float64).unsqueeze(-1)
+        for begin in range(0, length, self.block_frames):
+            end = min(begin + self.block_frames, length)
+            shape = (batch, end - begin, upp, self.dim)
+            numel = int(np.prod(shape))
+            block = self._buffer('phase', numel, torch.float64, f0.device).view(shape)
+            torch.mul(rad_values[:, begin:end, None, :], ramp, out=block)
+            block += start[:, begin:end, None, :]
+            block *= 2 * np.pi
+            block.sin_()
+            sines = self._buffer('sines', numel, dtype, f0.device).view(shape)
+            sines.copy_(block)
+            frames[:, begin:end].addcmul_(sines, sine_gain[:, begin:end, None, None])
+
+        uv = uv.repeat_interleave(upp, 1).unsqueeze(-1)
+        return sine_waves, uv, phase
+
+    def forward(self, f0, upp):
+        """ sine_tensor, uv = forward(f0)
+        input F0: tensor(batchsize, length)
+                  f0 for unvoiced steps should be 0
+        output sine_tensor: tensor(batchsize, length * upp, dim)
+        output uv: tensor(batchsize, length * upp, 1)
+        """
+        sine_waves, uv, _ = self.excitation(f0, upp)
+        return sine_waves, uv
 
 
 class SourceModuleHnNSF(torch.nn.Module):
@@ -209,16 +350,26 @@ class SourceModuleHnNSF(torch.nn.Module):
         self.l_linear = torch.nn.Linear(harmonic_num + 1, 1)
         self.l_tanh = torch.nn.Tanh()
 
-    def forward(self, x, upp):
-        sine_wavs, uv, _ = self.l_sin_gen(x, upp)
-        sine_merge = self.l_tanh(self.l_linear(sine_wavs))
-        return sine_merge
+    def forward(self, x, upp, state=None):
+        # with an ExcitationState, the source continues from the previous chunk and the new state is returned too
+        if state is None:
+            sine_wavs, _ = self.l_sin_gen(x, upp)
+        else:
+            sine_wavs, _, phase = self.l_sin_gen.excitation(x, upp, state.phase, state.generator)
+        # the sine source is generated from float32 f0 and only cast to the weight dtype here
+        sine_merge = self.l_tanh(self.l_linear(sine_wavs.to(self.l_linear.weight.dtype)))
+        if state is None:
+            return sine_merge
+        return sine_merge, ExcitationState(phase, state.generator)
 
 
 class Generator(torch.nn.Module):
-    def __init__(self, h):
+    def __init__(self, h, fused=False):
         super(Generator, self).__init__()
         self.h = h
+        # fused: the layers are built for weights that had their weight norm removed already (see `remove_weight_norm`),
+        # so they are neither wrapped in weight norm nor initialized
+        norm_f = weight_norm if not fused else (lambda module: module)
         self.num_kernels = len(h.resblock_kernel_sizes)
         self.num_upsamples = len(h.upsample_rates)
         self.m_source = SourceModuleHnNSF(
@@ -226,13 +377,13 @@ class Generator(torch.nn.Module):
             harmonic_num=8
         )
         self.noise_convs = nn.ModuleList()
-        self.conv_pre = weight_norm(Conv1d(h.num_mels, h.upsample_initial_channel, 7, 1, padding=3))
+        self.conv_pre = norm_f(Conv1d(h.num_mels, h.upsample_initial_channel, 7, 1, padding=3))
         resblock = ResBlock1 if h.resblock == '1' else ResBlock2
 
         self.ups = nn.ModuleList()
         for i, (u, k) in enumerate(zip(h.upsample_rates, h.upsample_kernel_sizes)):
             c_cur = h.upsample_initial_channel // (2 ** (i + 1))
-            self.ups.append(weight_norm(
+            self.ups.append(norm_f(
                 ConvTranspose1d(h.upsample_initial_channel // (2 ** i), h.upsample_initial_channel // (2 ** (i + 1)),
                                 k, u, padding=(k - u) // 2)))
             if i + 1 < len(h.upsample_rates):  #
@@ -246,15 +397,25 @@ class Generator(torch.nn.Module):
         for i in range(len(self.ups)):
             ch //= 2
             for j, (k, d) in enumerate(zip(h.resblock_kernel_sizes, h.resblock_dilation_sizes)):
-                self.resblocks.append(resblock(h, ch, k, d))
+                self.resblocks.append(resblock(h, ch, k, d, fused))
 
-        self.conv_post = weight_norm(Conv1d(ch, 1, 7, 1, padding=3))
-        self.ups.apply(init_weights)
-        self.conv_post.apply(init_weights)
+        self.conv_post = norm_f(Conv1d(ch, 1, 7, 1, padding=3))
+        if not fused:
+            self.ups.apply(init_weights)
+            self.conv_post.apply(init_weights)
         self.upp = int(np.prod(h.upsample_rates))
 
-    def forward(self, x, f0):
-        har_source = self.m_source(f0, self.upp).transpose(1, 2)
+    def initial_state(self, batchsize=1, device='cpu', seed=None):
+        return ExcitationState.create(batchsize, self.m_source.l_sin_gen.dim, device, seed)
+
+    def forward(self, x, f0, state=None):
+        if state is None:
+            har_source = self.m_source(f0, self.upp).transpose(1, 2)
+            return self.vocode(x, har_source)
+        har_source, state = self.m_source(f0, self.upp, state)
+        return self.vocode(x, har_source.transpose(1, 2)), state
+
+    def vocode(self, x, har_source):
         x = self.conv_pre(x)
         for i in range(self.num_upsamples):
             x = F.leaky_relu(x, LRELU_SLOPE)
@@ -274,6 +435,23 @@ class Generator(torch.nn.Module):
 
         return x
 
+    def vocode_step(self, x, har_source, state):
+        # vocode() on the next mel frames and excitation samples of a stream, which may cover different frames: with the
+        # VocoderState of the previous blocks, only the new samples go through every layer
+        x = state.conv(self.conv_pre, x)
+        for i in range(self.num_upsamples):
+            x = F.leaky_relu(x, LRELU_SLOPE)
+            x = state.conv_transpose(self.ups[i], x)
+            x_source = state.conv(self.noise_convs[i], har_source)
+            x = state.add(self.noise_convs[i], x, x_source)
+            resblocks = self.resblocks[i * self.num_kernels:(i + 1) * self.num_kernels]
+            x = state.add(self.ups[i], *[resblock.step(x, state) for resblock in resblocks]) / self.num_kernels
+        x = F.leaky_relu(x)
+        x = state.conv(self.conv_post, x)
+        x = torch.tanh(x)
+
+        return x
+
     def remove_weight_norm(self):
         loguru.logger.info("Removing weight norm...")
         for l in self.ups:
@@ -282,157 +460,3 @@ class Generator(torch.nn.Module):
             l.remove_weight_norm()
         remove_weight_norm(self.conv_pre)
         remove_weight_norm(self.conv_post)
-
-
-class DiscriminatorP(torch.nn.Module):
-    def __init__(self, period, kernel_size=5, stride=3, use_spectral_norm=False):
-        super(DiscriminatorP, self).__init__()
-        self.period = period
-        norm_f = weight_norm if use_spectral_norm == False else spectral_norm
-        self.convs = nn.ModuleList([
-            norm_f(Conv2d(1, 32, (kernel_size, 1), (stride, 1), padding=(get_padding(5, 1), 0))),
-            norm_f(Conv2d(32, 128, (kernel_size, 1), (stride, 1), padding=(get_padding(5, 1), 0))),
-            norm_f(Conv2d(128, 512, (kernel_size, 1), (stride, 1), padding=(get_padding(5, 1), 0))),
-            norm_f(Conv2d(512, 1024, (kernel_size, 1), (stride, 1), padding=(get_padding(5, 1), 0))),
-            norm_f(Conv2d(1024, 1024, (kernel_size, 1), 1, padding=(2, 0))),
-        ])
-        self.conv_post = norm_f(Conv2d(1024, 1, (3, 1), 1, padding=(1, 0)))
-
-    def forward(self, x):
-        fmap = []
-
-        # 1d to 2d
-        b, c, t = x.shape
-        if t % self.period != 0:  # pad first
-            n_pad = self.period - (t % self.period)
-            x = F.pad(x, (0, n_pad), "reflect")
-            t = t + n_pad
-        x = x.view(b, c, t // self.period, self.period)
-
-        for l in self.convs:
-            x = l(x)
-            x = F.leaky_relu(x, LRELU_SLOPE)
-            fmap.append(x)
-        x = self.conv_post(x)
-        fmap.append(x)
-        x = torch.flatten(x, 1, -1)
-
-        return x, fmap
-
-
-class MultiPeriodDiscriminator(torch.nn.Module):
-    def __init__(self, periods=None):
-        super(MultiPeriodDiscriminator, self).__init__()
-        self.periods = periods if periods is not None else [2, 3, 5, 7, 11]
-        self.discriminators = nn.ModuleList()
-        for period in self.periods:
-            self.discriminators.append(DiscriminatorP(period))
-
-    def forward(self, y, y_hat):
-        y_d_rs = []
-        y_d_gs = []
-        fmap_rs = []
-        fmap_gs = []
-        for i, d in enumerate(self.discriminators):
-            y_d_r, fmap_r = d(y)
-            y_d_g, fmap_g = d(y_hat)
-            y_d_rs.append(y_d_r)
-            fmap_rs.append(fmap_r)
-            y_d_gs.append(y_d_g)
-            fmap_gs.append(fmap_g)
-
-        return y_d_rs, y_d_gs, fmap_rs, fmap_gs
-
-
-class DiscriminatorS(torch.nn.Module):
-    def __init__(self, use_spectral_norm=False):
-        super(DiscriminatorS, self).__init__()
-        norm_f = weight_norm if use_spectral_norm == False else spectral_norm
-        self.convs = nn.ModuleList([
-            norm_f(Conv1d(1, 128, 15, 1, padding=7)),
-            norm_f(Conv1d(128, 128, 41, 2, groups=4, padding=20)),
-            norm_f(Conv1d(128, 256, 41, 2, groups=16, padding=20)),
-            norm_f(Conv1d(256, 512, 41, 4, groups=16, padding=20)),
-            norm_f(Conv1d(512, 1024, 41, 4, groups=16, padding=20)),
-            norm_f(Conv1d(1024, 1024, 41, 1, groups=16, padding=20)),
-            norm_f(Conv1d(1024, 1024, 5, 1, padding=2)),
-        ])
-        self.conv_post = norm_f(Conv1d(1024, 1, 3, 1, padding=1))
-
-    def forward(self, x):
-        fmap = []
-        for l in self.convs:
-            x = l(x)
-            x = F.leaky_relu(x, LRELU_SLOPE)
-            fmap.append(x)
-        x = self.conv_post(x)
-        fmap.append(x)
-        x = torch.flatten(x, 1, -1)
-
-        return x, fmap
-
-
-class MultiScaleDiscriminator(torch.nn.Module):
-    def __init__(self):
-        super(MultiScaleDiscriminator, self).__init__()
-        self.discriminators = nn.ModuleList([
-            DiscriminatorS(use_spectral_norm=True),
-            DiscriminatorS(),
-            DiscriminatorS(),
-        ])
-        self.meanpools = nn.ModuleList([
-            AvgPool1d(4, 2, padding=2),
-            AvgPool1d(4, 2, padding=2)
-        ])
-
-    def forward(self, y, y_hat):
-        y_d_rs = []
-        y_d_gs = []
-        fmap_rs = []
-        fmap_gs = []
-        for i, d in enumerate(self.discriminators):
-            if i != 0:
-                y = self.meanpools[i - 1](y)
-                y_hat = self.meanpools[i - 1](y_hat)
-            y_d_r, fmap_r = d(y)
-            y_d_g, fmap_g = d(y_hat)
-            y_d_rs.append(y_d_r)
-            fmap_rs.append(fmap_r)
-            y_d_gs.append(y_d_g)
-            fmap_gs.append(fmap_g)
-
-        return y_d_rs, y_d_gs, fmap_rs, fmap_gs
-
-
-def feature_loss(fmap_r, fmap_g):
-    loss = 0
-    for dr, dg in zip(fmap_r, fmap_g):
-        for rl, gl in zip(dr, dg):
-            loss += torch.mean(torch.abs(rl - gl))
-
-    return loss * 2
-
-
-def discriminator_loss(disc_real_outputs, disc_generated_outputs):
-    loss = 0
-    r_losses = []
-    g_losses = []
-    for dr, dg in zip(disc_real_outputs, disc_generated_outputs):
-        r_loss = torch.mean((1 - dr) ** 2)
-        g_loss = torch.mean(dg ** 2)
-        loss += (r_loss + g_loss)
-        r_losses.append(r_loss.item())
-        g_losses.append(g_loss.item())
-
-    return loss, r_losses, g_losses
-
-
-def generator_loss(disc_outputs):
-    loss = 0
-    gen_losses = []
-    for dg in disc_outputs:
-        l = torch.mean((1 - dg) ** 2)
-        gen_losses.append(l)
-        loss += l
-
-    return loss, gen_losses
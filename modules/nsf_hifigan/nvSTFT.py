@@ -137,4 +137,10 @@ class STFT():
         return spect
 
 
-stft = STFT()
+def __getattr__(name):
+    # the default STFT is only built on first use, importing this module stays cheap
+    if name == "stft":
+        global stft
+        stft = STFT()
+        return stft
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,19 +1,21 @@
 import numpy as np
 import torch
 import torch.nn.functional as F
-from torchaudio.transforms import Resample
 from .constants import *
 from .model import E2E0, E2E
 from .spec import MelSpectrogram 
 from .utils import to_local_average_f0, to_viterbi_f0
 
 class RMVPE:
-    def __init__(self, model_path, hop_length=160):
+    def __init__(self, model_path, hop_length=160, resampler=None, dtype=torch.float32, model=None):
+        self.resampler = resampler
+        self.dtype = dtype
         self.resample_kernel = {}
-        model = E2E0(4, 1, (2, 2))
-        ckpt = torch.load(model_path)
-        state_dict = (ckpt if all(isinstance(v, torch.Tensor) for v in ckpt.values()) else ckpt.get("model", ckpt.get("state_dict", ckpt)))
-        model.load_state_dict(state_dict, strict=False)
+        if model is None:
+            model = E2E0(4, 1, (2, 2))
+            ckpt = torch.load(model_path, map_location='cpu')
+            state_dict = (ckpt if all(isinstance(v, torch.Tensor) for v in ckpt.values()) else ckpt.get("model", ckpt.get("state_dict", ckpt)))
+            model.load_state_dict(state_dict, strict=False)
         model.eval()
         self.model = model
         self.mel_extractor = MelSpectrogram(N_MELS, SAMPLE_RATE, WINDOW_LENGTH, hop_length, None, MEL_FMIN, MEL_FMAX)
@@ -23,9 +25,16 @@ class RMVPE:
         with torch.no_grad():
             n_frames = mel.shape[-1]
             mel = F.pad(mel, (0, 32 * ((n_frames - 1) // 32 + 1) - n_frames), mode='constant')
-            hidden = self.model(mel)
+            hidden = self.forward_model(mel)
             return hidden[:, :n_frames]
 
+    def forward_model(self, mel):
+        # weights cast to a reduced dtype run natively, fp32 weights with a reduced `dtype` run under autocast
+        weight = next(self.model.parameters(), None)
+        weight_dtype = weight.dtype if weight is not None else torch.float32
+        with torch.autocast(mel.device.type, dtype=self.dtype, enabled=self.dtype != weight_dtype):
+            return self.model(mel.to(weight_dtype)).float()
+
     def decode(self, hidden, thred=0.03, use_viterbi=False):
         if use_viterbi:
             f0 = to_viterbi_f0(hidden, thred=thred)
@@ -33,21 +42,61 @@ class RMVPE:
             f0 = to_local_average_f0(hidden, thred=thred)  
         return f0
 
-    def infer_from_audio(self, audio, sample_rate=16000, device=None, thred=0.03, use_viterbi=False):
+    def resample(self, audio, sample_rate=16000, device=None):
         if device is None:
             device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        audio = torch.from_numpy(audio).float().unsqueeze(0).to(device)
-        if sample_rate == 16000:
-            audio_res = audio
+        if isinstance(audio, torch.Tensor):
+            audio = audio.float().reshape(1, -1).to(device)
         else:
-            key_str = str(sample_rate)
-            if key_str not in self.resample_kernel:
-                self.resample_kernel[key_str] = Resample(sample_rate, 16000, lowpass_filter_width=128)
-            self.resample_kernel[key_str] = self.resample_kernel[key_str].to(device)
-            audio_res = self.resample_kernel[key_str](audio)
+            audio = torch.from_numpy(audio).float().unsqueeze(0).to(device)
+        if sample_rate == 16000:
+            return audio
+        if self.resampler is not None:
+            return self.resampler(audio, sample_rate, 16000)
+        key_str = str(sample_rate)
+        if key_str not in self.resample_kernel:
+            from torchaudio.transforms import Resample
+            self.resample_kernel[key_str] = Resample(sample_rate, 16000, lowpass_filter_width=128)
+        self.resample_kernel[key_str] = self.resample_kernel[key_str].to(device)
+        return self.resample_kernel[key_str](audio)
+
+    def infer_from_audio(self, audio, sample_rate=16000, device=None, thred=0.03, use_viterbi=False):
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        audio_res = self.resample(audio, sample_rate, device)
         mel_extractor = self.mel_extractor.to(device)
         self.model = self.model.to(device)
         mel = mel_extractor(audio_res, center=True)
         hidden = self.mel2hidden(mel)
         f0 = self.decode(hidden, thred=thred, use_viterbi=use_viterbi)
-        return f0
\ No newline at end of file
+        return f0
+
+    def infer_batch(self, audios, sample_rate=16000, device=None, thred=0.03, use_viterbi=False, max_batch_frames=1024, batch_size=8):
+        # Short mels are padded to a multiple of 32 frames, exactly as mel2hidden pads them, and mels of equal padded
+        # length go through E2E0 together. Mels longer than `max_batch_frames` run on their own: the BiGRU sees the
+        # whole sequence, so cutting them into segments would change their F0 depending on the rest of the batch.
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        mel_extractor = self.mel_extractor.to(device)
+        self.model = self.model.to(device)
+        mels = [mel_extractor(self.resample(audio, sample_rate, device), center=True) for audio in audios]
+
+        hiddens = [None] * len(mels)
+        groups = {}
+        for i, mel in enumerate(mels):
+            n = mel.shape[-1]
+            if n > max_batch_frames:
+                hiddens[i] = self.mel2hidden(mel)[0]
+                continue
+            groups.setdefault(32 * ((n - 1) // 32 + 1), []).append(i)
+
+        with torch.no_grad():
+            for length, group in groups.items():
+                for offset in range(0, len(group), batch_size):
+                    batch = group[offset:offset + batch_size]
+                    mel_batch = torch.stack([F.pad(mels[i][0], (0, length - mels[i].shape[-1]), mode='constant') for i in batch])
+                    hidden = self.forward_model(mel_batch)
+                    for i, h in zip(batch, hidden):
+                        hiddens[i] = h[:mels[i].shape[-1]]
+
+        return [self.decode(hidden.unsqueeze(0), thred=thred, use_viterbi=use_viterbi) for hidden in hiddens]
@@ -1,7 +1,42 @@
 import torch
 import numpy as np
 import torch.nn.functional as F
-from librosa.filters import mel
+
+
+def hz_to_mel(frequencies, htk=False):
+    frequencies = np.asanyarray(frequencies, dtype=np.float64)
+    if htk:
+        return 2595.0 * np.log10(1.0 + frequencies / 700.0)
+    # Slaney's Auditory Toolbox scale: linear below 1 kHz, logarithmic above
+    f_sp = 200.0 / 3
+    min_log_mel = 1000.0 / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(frequencies >= 1000.0, min_log_mel + np.log(np.maximum(frequencies, 1e-10) / 1000.0) / logstep, frequencies / f_sp)
+
+
+def mel_to_hz(mels, htk=False):
+    mels = np.asanyarray(mels, dtype=np.float64)
+    if htk:
+        return 700.0 * (10.0 ** (mels / 2595.0) - 1.0)
+    f_sp = 200.0 / 3
+    min_log_mel = 1000.0 / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(mels >= min_log_mel, 1000.0 * np.exp(logstep * (mels - min_log_mel)), f_sp * mels)
+
+
+def mel(sr, n_fft, n_mels=128, fmin=0.0, fmax=None, htk=False):
+    # Same filterbank as librosa.filters.mel (slaney normalization), without importing librosa and scipy
+    if fmax is None:
+        fmax = float(sr) / 2
+    fftfreqs = np.fft.rfftfreq(n=n_fft, d=1.0 / sr)
+    mel_f = mel_to_hz(np.linspace(hz_to_mel(fmin, htk=htk), hz_to_mel(fmax, htk=htk), n_mels + 2), htk=htk)
+    fdiff = np.diff(mel_f)
+    ramps = np.subtract.outer(mel_f, fftfreqs)
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:n_mels + 2] - mel_f[:n_mels]))[:, None]
+    return weights.astype(np.float32)
 
 class MelSpectrogram(torch.nn.Module):
     def __init__(
@@ -1,6 +1,5 @@
 import sys
 import numpy as np
-import librosa
 import torch
 from functools import reduce
 from .constants import *
@@ -61,47 +60,106 @@ def summary(model, file=sys.stdout):
     
 def to_local_average_cents(salience, center=None, thred=0.03):
     """
-    find the weighted average cents near the argmax bin
+    find the weighted average cents near the argmax bin (or near `center`) of every frame
     """
 
+    if isinstance(salience, torch.Tensor):
+        if center is not None:
+            center = center.cpu().numpy() if isinstance(center, torch.Tensor) else center
+        cents = to_local_average_cents(salience.detach().cpu().numpy(), center, thred)
+        return torch.from_numpy(np.asarray(cents)).to(salience.device)
+
+    if salience.ndim not in (1, 2):
+        raise Exception("label should be either 1d or 2d ndarray")
+
     if not hasattr(to_local_average_cents, 'cents_mapping'):
         # the bin number-to-cents mapping
         to_local_average_cents.cents_mapping = (
                 20 * np.arange(N_CLASS) + CONST)
 
-    if salience.ndim == 1:
-        if center is None:
-            center = int(np.argmax(salience))
-        start = max(0, center - 4)
-        end = min(len(salience), center + 5)
-        salience = salience[start:end]
-        product_sum = np.sum(
-            salience * to_local_average_cents.cents_mapping[start:end])
-        weight_sum = np.sum(salience)
-        return product_sum / weight_sum if np.max(salience) > thred else 0
-    if salience.ndim == 2:
-        return np.array([to_local_average_cents(salience[i, :], None, thred) for i in
-                         range(salience.shape[0])])
-
-    raise Exception("label should be either 1d or 2d ndarray")
-    
-def to_viterbi_cents(salience, thred=0.03):
-    # Create viterbi transition matrix
-    if not hasattr(to_viterbi_cents, 'transition'):
-        xx, yy = np.meshgrid(range(N_CLASS), range(N_CLASS))
-        transition = np.maximum(30 - abs(xx - yy), 0)
-        transition = transition / transition.sum(axis=1, keepdims=True)
-        to_viterbi_cents.transition = transition
+    frames = np.atleast_2d(salience)
+    if center is None:
+        center = np.argmax(frames, axis=1)
+    center = np.asarray(center, dtype=np.int64).reshape(-1, 1)
+
+    # 9-bin window around the center, clipped to the valid bins
+    idx = np.arange(frames.shape[1])[None, :]
+    weights = frames * ((idx >= center - 4) & (idx < center + 5))
+    product_sum = np.sum(weights * to_local_average_cents.cents_mapping[:frames.shape[1]], axis=1)
+    weight_sum = np.sum(weights, axis=1)
+    voiced = np.max(weights, axis=1) > thred
+    cents = np.where(voiced, product_sum / np.where(voiced, weight_sum, 1), 0)
+
+    return cents[0] if salience.ndim == 1 else cents
+
+def viterbi_transition_band(n_states=N_CLASS, width=30):
+    """
+    log transition weights of the +-(width - 1) band of the triangular transition matrix,
+    row-normalized per source state exactly like the dense matrix
+    """
+
+    offsets = np.arange(-(width - 1), width)
+    weights = width - np.abs(offsets)
+    idx = np.arange(n_states)
+    row_sum = np.array([weights[(i + offsets >= 0) & (i + offsets < n_states)].sum() for i in idx])
+
+    return np.log(weights), np.log(row_sum)
 
+def viterbi_path(prob, width=30):
+    """
+    banded viterbi decoding of a [T, N] frame-wise probability matrix; only transitions within
+    +-(width - 1) bins are possible, so every step costs O(N * width) instead of O(N^2)
+    """
+
+    is_tensor = isinstance(prob, torch.Tensor)
+    if is_tensor:
+        device = prob.device
+        prob = prob.detach().cpu().numpy()
+
+    n_frames, n_states = prob.shape
+    band = width - 1
+
+    if not hasattr(viterbi_path, 'bands'):
+        viterbi_path.bands = {}
+    if (n_states, width) not in viterbi_path.bands:
+        viterbi_path.bands[(n_states, width)] = viterbi_transition_band(n_states, width)
+    log_trans, log_row_sum = viterbi_path.bands[(n_states, width)]
+
+    log_prob = np.log(prob + np.finfo(prob.dtype).tiny)
+    pointers = np.empty((n_frames, n_states), dtype=np.int16)
+    padded = np.full(n_states + 2 * band, -np.inf)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * band + 1)  # [N, 2 * band + 1] view of source states j - band .. j + band
+    scores = np.empty(windows.shape)
+    states = np.arange(n_states)
+    target = states - band
+
+    if n_frames == 0:
+        path = np.zeros(0, dtype=np.int64)
+        return torch.from_numpy(path).to(device) if is_tensor else path
+
+    value = log_prob[0] - np.log(n_states)
+    for t in range(1, n_frames):
+        padded[band:band + n_states] = value - log_row_sum
+        np.add(windows, log_trans, out=scores)
+        best = np.argmax(scores, axis=1)
+        pointers[t] = target + best
+        value = scores[states, best] + log_prob[t]
+
+    path = np.empty(n_frames, dtype=np.int64)
+    path[-1] = np.argmax(value)
+    for t in range(n_frames - 1, 0, -1):
+        path[t - 1] = pointers[t, path[t]]
+
+    return torch.from_numpy(path).to(device) if is_tensor else path
+
+def to_viterbi_cents(salience, thred=0.03):
     # Convert to probability
-    prob = salience.T
-    prob = prob / prob.sum(axis=0)    
+    prob = salience / salience.sum(axis=1, keepdims=True)
 
     # Perform viterbi decoding
-    path = librosa.sequence.viterbi(prob, to_viterbi_cents.transition).astype(np.int64)
+    path = viterbi_path(prob)
 
-    return np.array([to_local_average_cents(salience[i, :], path[i], thred) for i in
-                     range(len(path))])
+    return to_local_average_cents(salience, path, thred)
 
 def to_local_average_f0(hidden, center=None, thred=0.03):
     idx = torch.arange(N_CLASS, device=hidden.device)[None, None, :]  # [B=1, T=1, N]
@@ -121,22 +179,12 @@ def to_local_average_f0(hidden, center=None, thred=0.03):
     return f0.squeeze(0).cpu().numpy()
 
 def to_viterbi_f0(hidden, thred=0.03):
-    # Create viterbi transition matrix
-    if not hasattr(to_viterbi_cents, 'transition'):
-        xx, yy = np.meshgrid(range(N_CLASS), range(N_CLASS))
-        transition = np.maximum(30 - abs(xx - yy), 0)
-        transition = transition / transition.sum(axis=1, keepdims=True)
-        to_viterbi_cents.transition = transition
-    
     # Convert to probability
-    prob = hidden.squeeze(0).cpu().numpy()
-    prob = prob.T
-    prob = prob / prob.sum(axis=0) 
-    
+    prob = hidden.squeeze(0)
+    prob = prob / prob.sum(dim=1, keepdim=True)
+
     # Perform viterbi decoding
-    path = librosa.sequence.viterbi(prob, to_viterbi_cents.transition).astype(np.int64)
-    center = torch.from_numpy(path).unsqueeze(0).unsqueeze(-1).to(hidden.device)
-    
+    path = viterbi_path(prob)
+    center = path.unsqueeze(0).unsqueeze(-1)
+
     return to_local_average_f0(hidden, center=center, thred=thred)
-    
-        
\ No newline at end of file
@@ -1,5 +1,4 @@
-from .shift import Shift
-from .batch import BatchProcessor
+import importlib
 
 from .utils import (
     hz2note,
@@ -9,16 +8,37 @@ from .utils import (
     f0_shift,
     pitch_shift,
     shift_suffix,
+    parse_key_shifts,
 )
 
 __all__ = [
     "Shift",
     "BatchProcessor",
+    "StreamingShift",
+    "ShiftClient",
     "hz2note",
     "note_hz",
     "format_hz",
     "f0_range",
     "f0_shift",
     "pitch_shift",
-    "shift_suffix"
+    "shift_suffix",
+    "parse_key_shifts"
 ]
+
+# The model-backed classes pull in torch, so they are only imported when first used.
+LAZY_EXPORTS = {
+    "Shift": ".shift",
+    "BatchProcessor": ".batch",
+    "StreamingShift": ".streaming",
+    "ShiftClient": ".client",
+}
+
+def __getattr__(name: str):
+    if name not in LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+
+    return value
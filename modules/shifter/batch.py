@@ -5,8 +5,19 @@ import enum
 import loguru
 import tqdm
 import os
+import multiprocessing
+import collections
+import concurrent.futures
+import time
+import json
+import csv
+
+import torch
+import numpy
 
 from modules.shifter.shift import Shift
+from modules.shifter.bucket import bucket_by_length
+from modules.shifter.profiler import Record, torch_trace_path, write_report, merge_records, summarize, mark_peak_rss, peak_rss_since_mark
 from modules.shifter.utils import pitch_shift, shift_suffix
 
 EXTENSIONS = {
@@ -19,6 +30,10 @@ EXTENSIONS = {
     ".wma"
 }
 
+BUCKET_WINDOW = 4
+SLOWEST_FILES = 5
+REPORT_FIELDS = ("input_path", "output_path", "status", "error", "duration", "processing_time", "rtf", "peak_rss_mb")
+
 class Status(enum.Enum):
     SUCCESS = "success"
     SKIPPED = "skipped"
@@ -30,6 +45,23 @@ class Result:
     output_path: pathlib.Path
     status: Status
     error: typing.Optional[str] = None
+    # Seconds of audio, seconds spent on this output (its share when several outputs are rendered together) and the
+    # peak resident memory of the process while it was processed, in MB.
+    duration: float = 0.0
+    processing_time: float = 0.0
+    peak_rss_mb: float = 0.0
+
+    @property
+    def rtf(self) -> float:
+        return self.processing_time / self.duration if self.duration else 0.0
+
+@dataclasses.dataclass
+class Task:
+    indices: typing.List[int]
+    input_path: pathlib.Path
+    output_paths: typing.List[pathlib.Path]
+    key_shifts: typing.List[float]
+    silent: bool
 
 def get_suffix_string(key_shift: float) -> str:
     if key_shift == int(key_shift):
@@ -37,10 +69,88 @@ def get_suffix_string(key_shift: float) -> str:
     else:
         return f"_{key_shift}x"
 
+def process_task(shifter: Shift, task: Task, audio: typing.Optional[numpy.ndarray] = None, track_memory: bool = False) -> typing.List[Result]:
+    start = time.perf_counter()
+
+    if track_memory:
+        mark_peak_rss()
+
+    try:
+        for output_path in task.output_paths:
+            os.makedirs(output_path.parent, exist_ok=True)
+
+        with shifter.profiler.record(str(task.input_path)):
+            if len(task.key_shifts) > 1 or audio is not None:
+                output_audios = shifter.process_file_multi(str(task.input_path), [str(output_path) for output_path in task.output_paths], task.key_shifts, task.silent, audio)
+            elif task.silent:
+                output_audios = [shifter.process_file_silent(str(task.input_path), str(task.output_paths[0]), task.key_shifts[0])]
+            else:
+                output_audios = [shifter.process_file(str(task.input_path), str(task.output_paths[0]), task.key_shifts[0])]
+
+        return completed_task(task, len(output_audios[0]) / shifter.sample_rate, time.perf_counter() - start)
+    except Exception as e:
+        return failed_task(task, e)
+
+def completed_task(task: Task, duration: float, processing_time: float) -> typing.List[Result]:
+    # The outputs of a task are rendered together, so each one is charged an equal share of its time.
+    share = processing_time / len(task.output_paths)
+
+    return [Result(task.input_path, output_path, Status.SUCCESS, duration=duration, processing_time=share, peak_rss_mb=peak_rss_since_mark()) for output_path in task.output_paths]
+
+def task_output(task: Task, position: int) -> Task:
+    return Task([task.indices[position]], task.input_path, [task.output_paths[position]], [task.key_shifts[position]], task.silent)
+
+def failed_task(task: Task, error: Exception) -> typing.List[Result]:
+    if task.silent:
+        tqdm.tqdm.write(f"Failed: {task.input_path.name} - {error}")
+    else:
+        loguru.logger.error(f"Failed: {task.input_path} - {error}")
+
+    return [Result(task.input_path, output_path, Status.FAILED, str(error)) for output_path in task.output_paths]
+
+_worker_shifter: typing.Optional[Shift] = None
+_worker_track_memory = False
+
+def _init_worker(shifter: typing.Optional[Shift], shift_arguments: tuple, num_threads: int, profile: bool = False, torch_trace: typing.Optional[str] = None, track_memory: bool = False) -> None:
+    global _worker_shifter, _worker_track_memory
+
+    torch.set_num_threads(num_threads)
+    _worker_shifter = shifter if shifter is not None else Shift(*shift_arguments)
+    _worker_track_memory = track_memory
+
+    if profile and not _worker_shifter.profiler.enabled:
+        _worker_shifter.enable_profiling(torch_trace)
+
+def _run_worker_task(task: Task) -> typing.Tuple[Task, typing.List[Result], typing.List[Record]]:
+    results = process_task(_worker_shifter, task, track_memory=_worker_track_memory)
+
+    return task, results, _worker_shifter.profiler.drain()
+
 class BatchProcessor:
-    def __init__(self, nsf_hifigan: str, pitch_extractor: str = None, device: str = "cuda", sample_rate: int = 44100):
-        self.shifter = Shift(nsf_hifigan, pitch_extractor, device, sample_rate)
+    def __init__(self, nsf_hifigan: str, pitch_extractor: str = None, device: str = "cuda", sample_rate: int = 44100, chunk_size: float = None, chunk_overlap: float = 0.2, workers: int = 1, prefetch: int = 0, batch_size: int = 1, f0_cache: str = None, f0_cache_size: float = 1024, use_viterbi: bool = False, precision: str = "fp32", quantize: bool = False, backend: str = "torch", compile: bool = False, profile: str = None, profile_torch: bool = False, report: str = None):
+        self.shift_arguments = (nsf_hifigan, pitch_extractor, device, sample_rate, chunk_size, chunk_overlap, batch_size, f0_cache, f0_cache_size, use_viterbi, precision, quantize, backend, compile)
         self.sample_rate = sample_rate
+        self.workers = max(1, workers)
+        self.prefetch = max(0, prefetch)
+        self.profile = profile
+        self.report = report
+        # Per-file peaks reset the process-wide VmHWM through /proc/self/clear_refs before every file, which is only
+        # done when a profile or report shows them. Otherwise the summary reports the peak of the whole run.
+        self.track_memory = bool(profile or report)
+        self.torch_trace = torch_trace_path(profile) if profile and profile_torch else None
+        self.records: typing.List[Record] = []
+
+        # Forked workers inherit the parent's models copy-on-write, so they are loaded once up front.
+        # CUDA and ONNX Runtime sessions cannot be forked, so in that case every spawned worker loads its own copy instead.
+        self.start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() and not str(device).startswith("cuda") and backend != "onnx" else "spawn"
+        
+        if self.workers == 1 or self.start_method == "fork":
+            self.shifter = Shift(*self.shift_arguments)
+
+            if profile:
+                self.shifter.enable_profiling(self.torch_trace)
+        else:
+            self.shifter = None
     
     @staticmethod
     def find_audio_files(path: str, recursive: bool = False) -> typing.List[pathlib.Path]:
@@ -61,9 +171,10 @@ class BatchProcessor:
         
         return sorted(set(files))
     
-    def process(self, input_path: str, output_path: str, key_shift: float, recursive: bool = False, overwrite: bool = False, output_format: str = "wav", progress_callback: typing.Optional[typing.Callable[[int, int, str], None]] = None, silent: bool = True, add_suffix: bool = False) -> typing.List[Result]:
+    def process(self, input_path: str, output_path: str, key_shift: typing.Union[float, typing.List[float]], recursive: bool = False, overwrite: bool = False, output_format: str = "wav", progress_callback: typing.Optional[typing.Callable[[int, int, str], None]] = None, silent: bool = True, add_suffix: bool = False) -> typing.List[Result]:
         input_path = pathlib.Path(input_path)
         output_path = pathlib.Path(output_path)
+        key_shifts = list(key_shift) if isinstance(key_shift, (list, tuple)) else [key_shift]
 
         files = self.find_audio_files(str(input_path), recursive)
 
@@ -73,69 +184,72 @@ class BatchProcessor:
             return []
         
         loguru.logger.info(f"Found {len(files)} audio file(s)")
-        loguru.logger.info(f"Pitch shift: {pitch_shift(key_shift)}")
+
+        for key in key_shifts:
+            loguru.logger.info(f"Pitch shift: {pitch_shift(key)}")
+
+        # Several keys per file would otherwise all be written to the same output path
+        add_suffix = add_suffix or len(key_shifts) > 1
 
         if add_suffix:
-            suffix_string = get_suffix_string(key_shift)
-            loguru.logger.debug(f"Suffix string: '{suffix_string}' (type: {type(suffix_string).__name__})")
+            suffix_strings = [get_suffix_string(key) for key in key_shifts]
+            loguru.logger.debug(f"Suffix strings: {suffix_strings}")
         else:
-            suffix_string = ""
+            suffix_strings = [""]
 
-        tasks = []
+        outputs = []
         for file in files:
-            if input_path.is_file():
-                if add_suffix:
-                    out = output_path.parent / f"{output_path.stem}{suffix_string}{output_path.suffix}"
-                else:
-                    out = output_path
-            else:
-                relative = file.relative_to(input_path)
-                if add_suffix:
-                    new_name = f"{relative.stem}{suffix_string}.{output_format}"
-                    out = output_path / relative.parent / new_name
+            for key, suffix_string in zip(key_shifts, suffix_strings):
+                if input_path.is_file():
+                    if add_suffix:
+                        out = output_path.parent / f"{output_path.stem}{suffix_string}{output_path.suffix}"
+                    else:
+                        out = output_path
                 else:
-                    out = output_path / relative.with_suffix(f".{output_format}")
-            
-            should_process = overwrite or not out.exists()
-            tasks.append((file, out, should_process))
+                    relative = file.relative_to(input_path)
+                    if add_suffix:
+                        new_name = f"{relative.stem}{suffix_string}.{output_format}"
+                        out = output_path / relative.parent / new_name
+                    else:
+                        out = output_path / relative.with_suffix(f".{output_format}")
+                
+                should_process = overwrite or not out.exists()
+                outputs.append((file, out, key, should_process))
         
-        results = []
+        results: typing.List[typing.Optional[Result]] = [None] * len(outputs)
         success_count = 0
         skip_count = 0
         fail_count = 0
+        tasks = {}
 
-        with tqdm.tqdm(total=len(tasks), desc="Processing", unit="file") as progress_bar:
-            for index, (inp, out, should_process) in enumerate(tasks):
-                if not should_process:
-                    results.append(Result(inp, out, Status.SKIPPED))
-                    skip_count += 1
-                    progress_bar.update(1)
-                    progress_bar.set_postfix({
-                        "Success": success_count,
-                        "Skipped": skip_count,
-                        "Failed": fail_count
-                    })
-                    continue
+        for index, (inp, out, key, should_process) in enumerate(outputs):
+            if should_process:
+                task = tasks.setdefault(inp, Task([], inp, [], [], silent))
+                task.indices.append(index)
+                task.output_paths.append(out)
+                task.key_shifts.append(key)
+            else:
+                results[index] = Result(inp, out, Status.SKIPPED)
+                skip_count += 1
 
-                try:
-                    os.makedirs(out.parent, exist_ok=True)
+        start = time.perf_counter()
 
-                    if silent:
-                        self.shifter.process_file_silent(str(inp), str(out), key_shift)
-                    else:
-                        self.shifter.process_file(str(inp), str(out), key_shift)
+        with tqdm.tqdm(total=len(outputs), desc="Processing", unit="file") as progress_bar:
+            progress_bar.update(skip_count)
+            progress_bar.set_postfix({
+                "Success": success_count,
+                "Skipped": skip_count,
+                "Failed": fail_count
+            })
+
+            for completed, (index, result) in enumerate(self.run_tasks(list(tasks.values())), start=1):
+                results[index] = result
 
-                    results.append(Result(inp, out, Status.SUCCESS))
+                if result.status == Status.SUCCESS:
                     success_count += 1
-                except Exception as e:
-                    results.append(Result(inp, out, Status.FAILED, str(e)))
+                else:
                     fail_count += 1
 
-                    if silent:
-                        tqdm.tqdm.write(f"Failed: {inp.name} - {e}")
-                    else:
-                        loguru.logger.error(f"Failed: {inp} - {e}")
-                
                 progress_bar.update(1)
                 progress_bar.set_postfix({
                     "Success": success_count,
@@ -144,13 +258,245 @@ class BatchProcessor:
                 })
 
                 if progress_callback:
-                    progress_callback(index + 1, len(tasks), str(inp.name))
+                    progress_callback(skip_count + completed, len(outputs), str(result.input_path.name))
         
-        self.print_summary(results)
+        wall_time = time.perf_counter() - start
+        records, self.records = self.records + (self.shifter.profiler.drain() if self.shifter is not None else []), []
+        stages = summarize(merge_records(records)) if records else None
+
+        self.print_summary(results, wall_time, stages)
+
+        if self.profile:
+            write_report(records, self.profile)
+
+        if self.report:
+            self.write_results(results, self.report, wall_time, stages)
 
         return results
     
-    def print_summary(self, results: typing.List[Result]) -> None:
+    def run_tasks(self, tasks: typing.List[Task]) -> typing.Iterator[typing.Tuple[int, Result]]:
+        if not tasks:
+            return
+
+        workers = min(self.workers, len(tasks))
+
+        if self.prefetch > 0 and workers > 1:
+            loguru.logger.warning(f"--prefetch is ignored with --workers {workers}: every worker decodes and encodes its own files")
+        elif self.prefetch > 0 and self.shifter is not None and self.shifter.batch_size > 1:
+            loguru.logger.warning(f"--prefetch is ignored with --batch_size {self.shifter.batch_size}: batched runs decode a window of files at a time")
+
+        if workers == 1 and self.shifter is not None:
+            if self.shifter.batch_size > 1:
+                yield from self.run_batched(tasks)
+
+                return
+
+            if self.prefetch > 0:
+                yield from self.run_pipelined(tasks)
+
+                return
+
+            for task in tasks:
+                yield from zip(task.indices, process_task(self.shifter, task, track_memory=self.track_memory))
+
+            return
+
+        num_threads = max(1, torch.get_num_threads() // workers)
+        loguru.logger.info(f"Starting {workers} workers ({self.start_method}, {num_threads} thread(s) each)")
+
+        context = multiprocessing.get_context(self.start_method)
+        with context.Pool(workers, initializer=_init_worker, initargs=(self.shifter if self.start_method == "fork" else None, self.shift_arguments, num_threads, bool(self.profile), self.torch_trace, self.track_memory)) as pool:
+            for task, results, records in pool.imap_unordered(_run_worker_task, tasks):
+                self.records.extend(records)
+                yield from zip(task.indices, results)
+
+    def load_task_audio(self, task: Task) -> typing.Tuple[numpy.ndarray, float]:
+        start = time.perf_counter()
+
+        with self.shifter.profiler.record(str(task.input_path)):
+            return self.shifter.load_audio(str(task.input_path)), time.perf_counter() - start
+
+    def save_outputs(self, task: Task, output_audios: typing.List) -> float:
+        start = time.perf_counter()
+
+        with self.shifter.profiler.record(str(task.input_path)):
+            for output_path, output_audio in zip(task.output_paths, output_audios):
+                self.shifter.save_audio(str(output_path), output_audio)
+
+        return time.perf_counter() - start
+
+    def run_pipelined(self, tasks: typing.List[Task]) -> typing.Iterator[typing.Tuple[int, Result]]:
+        # Decoding runs at most `prefetch` files ahead of the model and encoding at most `prefetch` files
+        # behind it, so the amount of audio held in memory stays bounded however long the task list is. A file's
+        # processing time is the sum of its decoding, rendering and encoding times, which overlap with other files.
+        with concurrent.futures.ThreadPoolExecutor(self.prefetch, thread_name_prefix="decode") as decoder, concurrent.futures.ThreadPoolExecutor(self.prefetch, thread_name_prefix="encode") as encoder:
+            pending = iter(tasks)
+            decoding = collections.deque()
+            encoding = collections.deque()
+
+            def decode_next() -> None:
+                task = next(pending, None)
+
+                if task is not None:
+                    decoding.append((task, decoder.submit(self.load_task_audio, task)))
+
+            for _ in range(self.prefetch):
+                decode_next()
+
+            while decoding:
+                task, decoded = decoding.popleft()
+                decode_next()
+
+                try:
+                    audio, decode_time = decoded.result()
+                    start = time.perf_counter()
+
+                    if self.track_memory:
+                        mark_peak_rss()
+
+                    if not task.silent:
+                        loguru.logger.info(f"Processing: {task.input_path}")
+
+                    with self.shifter.profiler.record(str(task.input_path)):
+                        output_audios, f0 = self.shifter.render_multi(audio, task.key_shifts)
+
+                    render_time = time.perf_counter() - start
+
+                    if not task.silent:
+                        for key in task.key_shifts:
+                            self.shifter.log_f0(f0, key)
+
+                    for output_path in task.output_paths:
+                        os.makedirs(output_path.parent, exist_ok=True)
+
+                    encoding.append((task, encoder.submit(self.save_outputs, task, output_audios), len(audio) / self.shifter.sample_rate, decode_time + render_time))
+                except Exception as e:
+                    yield from zip(task.indices, failed_task(task, e))
+
+                while len(encoding) > self.prefetch or (encoding and not decoding):
+                    task, encoded, duration, processing_time = encoding.popleft()
+
+                    try:
+                        encode_time = encoded.result()
+
+                        if not task.silent:
+                            for output_path in task.output_paths:
+                                loguru.logger.info(f"Saved output: {output_path}")
+
+                        yield from zip(task.indices, completed_task(task, duration, processing_time + encode_time))
+                    except Exception as e:
+                        yield from zip(task.indices, failed_task(task, e))
+
+    def run_batched(self, tasks: typing.List[Task]) -> typing.Iterator[typing.Tuple[int, Result]]:
+        # Files are analysed a window at a time with batched RMVPE, then every (file, key) pair is vocoded in
+        # buckets of similar mel length so that each Generator call runs with batch_size > 1 while wasting
+        # little compute on padding. Analysis and vocoding are profiled per window of files, the rest per file.
+        # A file's processing time is its decoding and saving plus its share of the window's analysis and buckets.
+        shifter = self.shifter
+        profiler = shifter.profiler
+        window = shifter.batch_size * BUCKET_WINDOW
+
+        for offset in range(0, len(tasks), window):
+            loaded = []
+            ready = []
+            window_name = f"window {offset // window} ({len(tasks[offset:offset + window])} files)"
+
+            durations = {}
+            times = collections.defaultdict(float)
+
+            if self.track_memory:
+                mark_peak_rss()
+
+            for task in tasks[offset:offset + window]:
+                try:
+                    if not task.silent:
+                        loguru.logger.info(f"Processing: {task.input_path}")
+
+                    start = time.perf_counter()
+
+                    with profiler.record(str(task.input_path)):
+                        audio = shifter.normalize_input(shifter.load_audio(str(task.input_path)))
+
+                    if shifter.chunk_size and len(audio) > shifter.chunk_size * shifter.sample_rate:
+                        # Long files are rendered in chunks on their own, reusing the audio decoded above.
+                        decode_time = time.perf_counter() - start
+                        results = process_task(shifter, task, audio, self.track_memory)
+
+                        for result in results:
+                            result.processing_time += decode_time / len(results)
+
+                        yield from zip(task.indices, results)
+                        continue
+
+                    loaded.append((task, audio))
+                    durations[id(task)] = len(audio) / shifter.sample_rate
+                    times[id(task)] += time.perf_counter() - start
+                except Exception as e:
+                    yield from zip(task.indices, failed_task(task, e))
+
+            try:
+                start = time.perf_counter()
+
+                with profiler.record(window_name):
+                    analyses = shifter.analyze_batch([audio for _, audio in loaded]) if loaded else []
+
+                ready = [(task, analysis) for (task, _), analysis in zip(loaded, analyses)]
+
+                for task, _ in loaded:
+                    times[id(task)] += (time.perf_counter() - start) / len(loaded)
+            except Exception as e:
+                # One bad file should not fail the whole window, so fall back to analysing them one by one.
+                loguru.logger.debug(f"Batched analysis failed ({e}), analysing files individually")
+
+                for task, audio in loaded:
+                    try:
+                        start = time.perf_counter()
+                        ready.append((task, shifter.analyze(audio)))
+                        times[id(task)] += time.perf_counter() - start
+                    except Exception as e:
+                        yield from zip(task.indices, failed_task(task, e))
+
+            # Every output of a file is charged an equal share of the file's decoding and analysis.
+            items = [(task, position, analysis) for task, analysis in ready for position in range(len(task.key_shifts))]
+
+            for bucket in bucket_by_length([analysis.mel.shape[-1] for _, _, analysis in items], shifter.batch_size):
+                bucket_items = [items[position] for position in bucket]
+
+                try:
+                    start = time.perf_counter()
+
+                    with profiler.record(window_name):
+                        outputs = shifter.synthesize_batch([analysis for _, _, analysis in bucket_items], [task.key_shifts[position] for task, position, _ in bucket_items])
+
+                    synthesis_time = (time.perf_counter() - start) / len(bucket_items)
+                except Exception as e:
+                    for task, position, _ in bucket_items:
+                        output_task = task_output(task, position)
+                        yield from zip(output_task.indices, failed_task(output_task, e))
+
+                    continue
+
+                for (task, position, analysis), output_audio in zip(bucket_items, outputs):
+                    output_task = task_output(task, position)
+                    output_path = output_task.output_paths[0]
+
+                    try:
+                        if not task.silent:
+                            shifter.log_f0(analysis.f0, output_task.key_shifts[0])
+
+                        os.makedirs(output_path.parent, exist_ok=True)
+                        start = time.perf_counter()
+
+                        with profiler.record(str(task.input_path)):
+                            shifter.save_audio(str(output_path), shifter.normalize_output(output_audio))
+
+                        processing_time = times[id(task)] / len(task.key_shifts) + synthesis_time + time.perf_counter() - start
+
+                        yield output_task.indices[0], Result(task.input_path, output_path, Status.SUCCESS, duration=durations[id(task)], processing_time=processing_time, peak_rss_mb=peak_rss_since_mark())
+                    except Exception as e:
+                        yield from zip(output_task.indices, failed_task(output_task, e))
+
+    def print_summary(self, results: typing.List[Result], wall_time: float = 0.0, stages: typing.Optional[typing.Dict[str, typing.Dict[str, float]]] = None) -> None:
         success = sum(1 for r in results if r.status == Status.SUCCESS)
         skipped = sum(1 for r in results if r.status == Status.SKIPPED)
         failed = sum(1 for r in results if r.status == Status.FAILED)
@@ -167,3 +513,63 @@ class BatchProcessor:
             for result in results:
                 if result.status == Status.FAILED:
                     loguru.logger.error(f" - {result.input_path}: {result.error}")
+
+        summary = summarize_results(results, wall_time)
+
+        if summary["audio_seconds"] > 0:
+            loguru.logger.info(f" - Audio: {summary['audio_seconds']:.1f}s in {wall_time:.1f}s ({summary['audio_hours_per_wall_hour']:.2f} audio-hours per wall-hour)")
+            loguru.logger.info(f" - Real-time factor: mean {summary['rtf_mean']:.3f}, max {summary['rtf_max']:.3f}")
+            loguru.logger.info(f" - Peak RSS: {summary['peak_rss_mb']:.0f} MB")
+            loguru.logger.info("Slowest files:")
+
+            for result in summary["slowest"]:
+                loguru.logger.info(f" - {result.output_path}: {result.processing_time:.2f}s for {result.duration:.1f}s of audio (RTF {result.rtf:.3f})")
+
+        if stages and "total" in stages:
+            loguru.logger.info("Stages (share of the total time, nested stages are included in their parents):")
+
+            for name, stage in stages.items():
+                if name != "total":
+                    loguru.logger.info(f" - {name}: {stage['wall_total']:.2f}s ({stage['wall_total'] / stages['total']['wall_total'] * 100:.1f}%)")
+
+    def write_results(self, results: typing.List[Result], path: str, wall_time: float, stages: typing.Optional[typing.Dict[str, typing.Dict[str, float]]] = None) -> None:
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rows = [result_row(result) for result in results]
+
+        if path.suffix.lower() == ".csv":
+            with open(path, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=REPORT_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            summary = summarize_results(results, wall_time)
+            summary["slowest"] = [result_row(result) for result in summary["slowest"]]
+            path.write_text(json.dumps({"summary": summary, "files": rows, "stages": stages or {}}, indent=4))
+
+        loguru.logger.info(f"Saved report: {path}")
+
+def summarize_results(results: typing.List[Result], wall_time: float) -> typing.Dict[str, typing.Any]:
+    # Audio is counted per output, so shifting one file to several keys counts its duration once per key.
+    completed = [result for result in results if result.status == Status.SUCCESS and result.duration > 0]
+    audio_seconds = sum(result.duration for result in completed)
+    rtfs = [result.rtf for result in completed]
+
+    return {
+        "files": len(results),
+        "success": sum(1 for result in results if result.status == Status.SUCCESS),
+        "skipped": sum(1 for result in results if result.status == Status.SKIPPED),
+        "failed": sum(1 for result in results if result.status == Status.FAILED),
+        "audio_seconds": audio_seconds,
+        "wall_time": wall_time,
+        "audio_hours_per_wall_hour": audio_seconds / wall_time if wall_time else 0.0,
+        "rtf_mean": float(numpy.mean(rtfs)) if rtfs else 0.0,
+        "rtf_max": max(rtfs, default=0.0),
+        "peak_rss_mb": max((result.peak_rss_mb for result in completed), default=0.0),
+        "slowest": sorted(completed, key=lambda result: -result.processing_time)[:SLOWEST_FILES],
+    }
+
+def result_row(result: Result) -> typing.Dict[str, typing.Any]:
+    row = {field: getattr(result, field) for field in REPORT_FIELDS}
+
+    return {**row, "input_path": str(result.input_path), "output_path": str(result.output_path), "status": result.status.value}
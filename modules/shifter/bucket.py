@@ -0,0 +1,19 @@
+import typing
+
+def bucket_by_length(lengths: typing.Sequence[int], batch_size: int, max_padding: float = 0.1) -> typing.List[typing.List[int]]:
+    # Groups indices of similar length so that padding every item of a bucket to its longest member wastes at most `max_padding` of the compute.
+    order = sorted(range(len(lengths)), key=lambda index: lengths[index], reverse=True)
+    buckets = []
+    bucket = []
+
+    for index in order:
+        if bucket and (len(bucket) >= batch_size or lengths[index] < lengths[bucket[0]] * (1 - max_padding)):
+            buckets.append(bucket)
+            bucket = []
+
+        bucket.append(index)
+
+    if bucket:
+        buckets.append(bucket)
+
+    return buckets
@@ -0,0 +1,56 @@
+import dataclasses
+import typing
+import math
+
+import numpy
+
+CONTEXT_SECONDS = 0.5
+
+@dataclasses.dataclass
+class Chunk:
+    start: int
+    end: int
+    window_start: int
+    window_end: int
+    fade_in: int
+    fade_out: int
+
+def seconds_to_frames(seconds: float, sample_rate: int, hop_length: int) -> int:
+    return int(math.ceil(seconds * sample_rate / hop_length))
+
+def plan_chunks(num_frames: int, chunk_frames: int, overlap_frames: int, context_frames: int) -> typing.List[Chunk]:
+    if chunk_frames <= overlap_frames:
+        raise ValueError(f"Chunk size ({chunk_frames} frames) must be larger than overlap ({overlap_frames} frames)")
+
+    step = chunk_frames - overlap_frames
+    chunks = []
+    start = 0
+
+    while True:
+        end = min(start + chunk_frames, num_frames)
+        is_last = end >= num_frames
+
+        chunks.append(Chunk(
+            start=start,
+            end=end,
+            window_start=max(0, start - context_frames),
+            window_end=min(num_frames, end + context_frames),
+            fade_in=overlap_frames if chunks else 0,
+            fade_out=0 if is_last else overlap_frames,
+        ))
+
+        if is_last:
+            return chunks
+
+        start += step
+
+def crossfade_window(length: int, fade_in: int, fade_out: int) -> numpy.ndarray:
+    window = numpy.ones(length, dtype=numpy.float32)
+
+    if fade_in > 0:
+        window[:fade_in] = 0.5 - 0.5 * numpy.cos(numpy.pi * (numpy.arange(fade_in) + 0.5) / fade_in)
+
+    if fade_out > 0:
+        window[length - fade_out:] *= 0.5 + 0.5 * numpy.cos(numpy.pi * (numpy.arange(fade_out) + 0.5) / fade_out)
+
+    return window
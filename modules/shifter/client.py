@@ -0,0 +1,81 @@
+import urllib.request
+import urllib.parse
+import urllib.error
+import pathlib
+import typing
+import json
+import io
+import os
+import loguru
+
+import soundfile
+import numpy
+
+SERVER_ENVIRONMENT = "PITCHSHIFT_SERVER"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+def server_url() -> typing.Optional[str]:
+    return os.environ.get(SERVER_ENVIRONMENT) or None
+
+class ShiftClient:
+    # Mirrors the file and array methods of `Shift`, so a script can swap a local `Shift` for a running
+    # `shift.py serve` instance without other changes.
+    def __init__(self, url: typing.Optional[str] = None, sample_rate: int = 44100, timeout: float = 600):
+        self.url = (url or server_url() or f"http://{DEFAULT_HOST}:{DEFAULT_PORT}").rstrip("/")
+        self.sample_rate = sample_rate
+        self.timeout = timeout
+
+    def request(self, path: str, data: typing.Optional[bytes] = None, query: typing.Optional[dict] = None) -> bytes:
+        url = f"{self.url}{path}" + (f"?{urllib.parse.urlencode(query)}" if query else "")
+        request = urllib.request.Request(url, data=data, method="POST" if data is not None else "GET", headers={"Content-Type": "application/octet-stream"})
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+
+            raise RuntimeError(f"Server error {e.code}: {message}") from None
+
+    def health(self) -> dict:
+        return json.loads(self.request("/health"))
+
+    def shift_bytes(self, data: bytes, key_shift: float, output_format: str = "wav", filename: str = "") -> bytes:
+        return self.request("/shift", data, {"key_shift": key_shift, "format": output_format, "filename": filename})
+
+    def process_audio(self, audio: numpy.ndarray, key_shift: float) -> numpy.ndarray:
+        buffer = io.BytesIO()
+        soundfile.write(buffer, audio, self.sample_rate, format="WAV", subtype="FLOAT")
+
+        output_audio, _ = soundfile.read(io.BytesIO(self.shift_bytes(buffer.getvalue(), key_shift)), dtype="float32")
+
+        return output_audio
+
+    def process_file(self, input_path: str, output_path: str, key_shift: float) -> numpy.ndarray:
+        loguru.logger.info(f"Processing: {input_path} ({self.url})")
+
+        output_audio = self.process_file_silent(input_path, output_path, key_shift)
+
+        loguru.logger.success("Process completed successfully!")
+
+        return output_audio
+
+    def process_file_silent(self, input_path: str, output_path: str, key_shift: float) -> numpy.ndarray:
+        output_format = pathlib.Path(output_path).suffix.lstrip(".").lower() or "wav"
+        output_format = output_format if output_format in ("wav", "flac", "ogg") else "wav"
+
+        data = self.shift_bytes(pathlib.Path(input_path).read_bytes(), key_shift, output_format, pathlib.Path(input_path).name)
+        pathlib.Path(output_path).write_bytes(data)
+
+        output_audio, _ = soundfile.read(io.BytesIO(data), dtype="float32")
+
+        return output_audio
+
+    def process_file_multi(self, input_path: str, output_paths: typing.List[str], key_shifts: typing.List[float], silent: bool = False) -> typing.List[numpy.ndarray]:
+        process = self.process_file_silent if silent else self.process_file
+
+        return [process(input_path, output_path, key_shift) for output_path, key_shift in zip(output_paths, key_shifts)]
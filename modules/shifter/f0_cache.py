@@ -0,0 +1,101 @@
+import hashlib
+import pathlib
+import typing
+import os
+import loguru
+
+import torch
+import numpy
+
+from modules.shifter.utils import checkpoint_signature
+
+# Part of every key, bumped whenever the curves for the same settings change (version 2: batched RMVPE runs long inputs
+# whole instead of in approximate segments), so entries written by older versions are no longer found and age out.
+CACHE_VERSION = 2
+# Eviction goes down to this fraction of the limit, so a full cache is scanned once per 10% of new entries, not on every write.
+EVICTION_TARGET = 0.9
+
+class F0Cache:
+    def __init__(self, directory: str, model_path: str, threshold: float, max_size_mb: float = 1024, use_viterbi: bool = False, precision: str = "fp32", backend: str = "torch"):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        # Total size of the cache as this process knows it, None until the first write scans the directory.
+        self.size: typing.Optional[int] = None
+
+        # The checkpoint is identified by its size and modification time, like the fused and exported models, rather
+        # than hashed, so every Shift and worker starts without reading the whole file.
+        self.namespace = f"v{CACHE_VERSION}:{pathlib.Path(model_path).resolve()}:{checkpoint_signature(model_path)}:{threshold}" + (":viterbi" if use_viterbi else "") + (f":{precision}" if precision != "fp32" else "") + (f":{backend}" if backend != "torch" else "")
+
+        loguru.logger.info(f"Using F0 cache: {self.directory} ({max_size_mb:.0f} MB)")
+
+    def key(self, audio_16k: typing.Union[numpy.ndarray, torch.Tensor]) -> str:
+        if isinstance(audio_16k, torch.Tensor):
+            audio_16k = audio_16k.detach().cpu().numpy()
+
+        digest = hashlib.sha256(self.namespace.encode())
+        digest.update(numpy.ascontiguousarray(audio_16k, dtype=numpy.float32).tobytes())
+
+        return digest.hexdigest()
+
+    def path(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}.npy"
+
+    def get(self, key: str) -> typing.Optional[numpy.ndarray]:
+        path = self.path(key)
+
+        try:
+            f0 = numpy.load(path)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+        # The modification time doubles as the last-access time for LRU eviction. Another process may have evicted the
+        # entry since it was read, which leaves nothing to touch but does not make the loaded curve any less valid.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return f0
+
+    def put(self, key: str, f0: numpy.ndarray) -> None:
+        path = self.path(key)
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+
+        with open(temporary, "wb") as file:
+            numpy.save(file, f0.astype(numpy.float32))
+
+        os.replace(temporary, path)
+
+        # The directory is only scanned when the running total goes over the limit, which also picks up the entries
+        # written by other processes sharing the cache since the last scan.
+        if self.size is not None:
+            self.size += path.stat().st_size
+
+        if self.size is None or self.size > self.max_size:
+            self.size = self.evict()
+
+    def evict(self) -> int:
+        entries = []
+        total = 0
+
+        for path in self.directory.glob("*.npy"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_size:
+            return total
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_size * EVICTION_TARGET:
+                break
+
+            path.unlink(missing_ok=True)
+            total -= size
+
+        return total
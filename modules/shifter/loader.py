@@ -0,0 +1,176 @@
+import dataclasses
+import subprocess
+import tempfile
+import pathlib
+import typing
+import struct
+import shutil
+import time
+import io
+
+import soundfile
+import numpy
+
+# Formats libsndfile may not decode, which are handed to ffmpeg when it is installed
+FFMPEG_EXTENSIONS = {
+    ".m4a",
+    ".aac",
+    ".wma"
+}
+
+WAV_FORMATS = {
+    (1, 16): ("<i2", 2 ** 15),
+    (1, 32): ("<i4", 2 ** 31),
+    (3, 32): ("<f4", 1.0),
+    (3, 64): ("<f8", 1.0),
+}
+
+@dataclasses.dataclass
+class DecodedAudio:
+    audio: numpy.ndarray
+    sample_rate: int
+    decoder: str
+    decode_time: float
+
+@dataclasses.dataclass
+class WavLayout:
+    offset: int
+    frames: int
+    channels: int
+    sample_rate: int
+    dtype: str
+    scale: float
+
+def read_wav_layout(path: str) -> typing.Optional[WavLayout]:
+    with open(path, "rb") as file:
+        header = file.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+
+        wav_format = None
+
+        while True:
+            chunk = file.read(8)
+            if len(chunk) < 8:
+                return None
+
+            chunk_id, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+
+            if chunk_id == b"fmt ":
+                data = file.read(size)
+                format_tag, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", data[:16])
+
+                # WAVE_FORMAT_EXTENSIBLE keeps the real format tag in the sub-format GUID
+                if format_tag == 0xFFFE and size >= 26:
+                    format_tag = struct.unpack("<H", data[24:26])[0]
+
+                wav_format = (format_tag, channels, sample_rate, block_align, bits)
+            elif chunk_id == b"data":
+                if wav_format is None:
+                    return None
+
+                format_tag, channels, sample_rate, block_align, bits = wav_format
+                if (format_tag, bits) not in WAV_FORMATS or block_align != channels * bits // 8:
+                    return None
+
+                offset = file.tell()
+                size = min(size, pathlib.Path(path).stat().st_size - offset)
+                dtype, scale = WAV_FORMATS[(format_tag, bits)]
+
+                return WavLayout(offset, size // block_align, channels, sample_rate, dtype, scale)
+            else:
+                file.seek(size, 1)
+
+            if size % 2:
+                file.seek(1, 1)
+
+def to_mono_float32(data: numpy.ndarray, scale: float = 1.0) -> numpy.ndarray:
+    if data.shape[1] == 1:
+        audio = data[:, 0]
+    else:
+        audio = data.mean(axis=1, dtype=numpy.float32)
+
+    if scale != 1.0:
+        return (audio / numpy.float32(scale)).astype(numpy.float32, copy=False)
+
+    return audio.astype(numpy.float32, copy=False)
+
+def decode_wav(path: str) -> typing.Optional[typing.Tuple[numpy.ndarray, int]]:
+    layout = read_wav_layout(path)
+    if layout is None or layout.frames == 0:
+        return None
+
+    # Copy-on-write mapping: mono float32 files are used without any copy, everything else is converted
+    # straight from the page cache instead of going through an intermediate read buffer.
+    data = numpy.memmap(path, dtype=layout.dtype, mode="c", offset=layout.offset, shape=(layout.frames, layout.channels))
+
+    return to_mono_float32(data, layout.scale), layout.sample_rate
+
+def decode_soundfile(path: typing.Union[str, typing.BinaryIO]) -> typing.Tuple[numpy.ndarray, int]:
+    data, sample_rate = soundfile.read(path, dtype="float32", always_2d=True)
+
+    return to_mono_float32(data), sample_rate
+
+def decode_ffmpeg(path: str, sample_rate: int) -> typing.Tuple[numpy.ndarray, int]:
+    command = ["ffmpeg", "-v", "error", "-nostdin", "-i", path, "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "-"]
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {path}: {process.stderr.decode(errors='replace').strip()}")
+
+    return numpy.frombuffer(process.stdout, dtype=numpy.float32).copy(), sample_rate
+
+def decode_librosa(path: str, sample_rate: typing.Optional[int] = None) -> typing.Tuple[numpy.ndarray, int]:
+    import librosa
+
+    return librosa.load(path, sr=sample_rate, mono=True)
+
+def decode_audio(path: str, sample_rate: typing.Optional[int] = None) -> DecodedAudio:
+    # `sample_rate` is only a hint for decoders that resample internally anyway (ffmpeg, audioread),
+    # everything else returns the native rate and leaves resampling to the caller.
+    start = time.perf_counter()
+    extension = pathlib.Path(path).suffix.lower()
+    decoded = None
+
+    if extension == ".wav":
+        try:
+            decoded, decoder = decode_wav(path), "wav-mmap"
+        except (struct.error, ValueError):
+            decoded = None
+
+    if decoded is None and extension not in FFMPEG_EXTENSIONS:
+        try:
+            decoded, decoder = decode_soundfile(path), "soundfile"
+        except (RuntimeError, TypeError):
+            decoded = None
+
+    if decoded is None and sample_rate is not None and shutil.which("ffmpeg"):
+        decoded, decoder = decode_ffmpeg(path, sample_rate), "ffmpeg"
+
+    if decoded is None:
+        decoded, decoder = decode_librosa(path, sample_rate), "librosa"
+
+    audio, native_rate = decoded
+
+    return DecodedAudio(audio, native_rate, decoder, time.perf_counter() - start)
+
+def decode_audio_bytes(data: bytes, sample_rate: typing.Optional[int] = None, suffix: str = "") -> DecodedAudio:
+    # Formats libsndfile can read from memory are decoded in place, anything else goes through a temporary file.
+    start = time.perf_counter()
+
+    try:
+        audio, native_rate = decode_soundfile(io.BytesIO(data))
+
+        return DecodedAudio(audio, native_rate, "soundfile", time.perf_counter() - start)
+    except (RuntimeError, TypeError):
+        pass
+
+    with tempfile.NamedTemporaryFile(suffix=suffix) as file:
+        file.write(data)
+        file.flush()
+
+        decoded = decode_audio(file.name, sample_rate)
+
+    decoded.decode_time = time.perf_counter() - start
+
+    return decoded
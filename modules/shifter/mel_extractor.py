@@ -1,7 +1,7 @@
-import librosa.filters
-
 import torch
 
+from modules.rmvpe.spec import mel as mel_filters
+
 class MelExtractor:
     def __init__(self, sample_rate: int = 44100, num_fft: int = 2048, win_length: int = 2048, hop_length: int = 512, fmin: int = 40, fmax: int = 16000, num_mels: int = 128, center: bool = False,):
         self.sample_rate = sample_rate
@@ -14,21 +14,27 @@ class MelExtractor:
         self.center = center
         self.mel_basis = {}
         self.hann_window = {}
+
+    @property
+    def padding(self) -> int:
+        return int((self.win_size - self.hop_length) / 2)
     
-    def __call__(self, audio):
+    def __call__(self, audio, pad: bool = True):
         mel_basis_key = f"{self.fmax}_{audio.device}"
 
         if mel_basis_key not in self.mel_basis:
-            mel = librosa.filters.mel(sr=self.sample_rate, n_fft=self.num_fft, n_mels=self.num_mels, fmin=self.fmin, fmax=self.fmax,)
+            mel = mel_filters(sr=self.sample_rate, n_fft=self.num_fft, n_mels=self.num_mels, fmin=self.fmin, fmax=self.fmax,)
             self.mel_basis[mel_basis_key] = torch.from_numpy(mel).float().to(audio.device)
         
         hann_window_key = f"{audio.device}"
         if hann_window_key not in self.hann_window:
             self.hann_window[hann_window_key] = torch.hann_window(self.win_size, device=audio.device)
         
-        padding_amount = int((self.win_size - self.hop_length) / 2)
-        audio = torch.nn.functional.pad(audio.unsqueeze(1), (padding_amount, padding_amount), mode="reflect",)
-        audio = audio.squeeze(1)
+        # Without padding, frame t is computed from samples [t * hop - padding, t * hop - padding + num_fft) of the
+        # given audio, which lets a stream compute new frames from the tail of its input.
+        if pad:
+            audio = torch.nn.functional.pad(audio.unsqueeze(1), (self.padding, self.padding), mode="reflect",)
+            audio = audio.squeeze(1)
 
         spectrogram = torch.stft(audio, self.num_fft, self.hop_length, self.win_size, self.hann_window[hann_window_key], self.center, "reflect", False, True, True,)
         spectrogram = torch.abs(spectrogram)
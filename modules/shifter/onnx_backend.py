@@ -0,0 +1,179 @@
+import pathlib
+import typing
+import json
+import loguru
+
+import torch
+import numpy
+
+from modules.nsf_hifigan.models import Generator, SourceModuleHnNSF, ExcitationState, load_config
+from modules.rmvpe.model import E2E0
+from modules.shifter.precision import compare_precision
+from modules.shifter.utils import checkpoint_signature
+
+ONNX_SUFFIX = ".onnx"
+OPSET_VERSION = 17
+
+def onnx_path(model_path: str) -> pathlib.Path:
+    path = pathlib.Path(model_path)
+
+    return path.with_name(path.stem + ONNX_SUFFIX)
+
+def write_metadata(path: pathlib.Path, metadata: typing.Dict[str, str]) -> None:
+    import onnx
+
+    model = onnx.load(str(path))
+
+    for key, value in metadata.items():
+        entry = model.metadata_props.add()
+        entry.key, entry.value = key, value
+
+    onnx.save(model, str(path))
+
+class VocoderExport(torch.nn.Module):
+    # Everything after the harmonic source: the excitation is random, so it is generated outside of the graph
+    # and fed in, which keeps ONNX Runtime and PyTorch outputs comparable sample for sample.
+    def __init__(self, generator: Generator):
+        super().__init__()
+        self.generator = generator
+
+    def forward(self, mel: torch.Tensor, source: torch.Tensor) -> torch.Tensor:
+        return self.generator.vocode(mel, source)
+
+def export_generator(generator: Generator, model_path: str) -> pathlib.Path:
+    path = onnx_path(model_path)
+    generator = generator.cpu().float().eval()
+
+    mel = torch.full((1, generator.h.num_mels, 64), -5.0)
+    source = torch.zeros(1, 1, 64 * generator.upp)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            VocoderExport(generator), (mel, source), str(path),
+            input_names=["mel", "source"],
+            output_names=["audio"],
+            dynamic_axes={"mel": {0: "batch", 2: "frames"}, "source": {0: "batch", 2: "samples"}, "audio": {0: "batch", 2: "samples"}},
+            opset_version=OPSET_VERSION,
+            dynamo=False,
+        )
+
+    linear = generator.m_source.l_linear
+    write_metadata(path, {
+        "signature": checkpoint_signature(model_path),
+        "source_weight": json.dumps(linear.weight.detach().flatten().tolist()),
+        "source_bias": json.dumps(linear.bias.detach().flatten().tolist()),
+    })
+
+    loguru.logger.info(f"Exported ONNX model: {path}")
+
+    return path
+
+def export_rmvpe(model: E2E0, model_path: str) -> pathlib.Path:
+    path = onnx_path(model_path)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model.cpu().float().eval(), (torch.zeros(1, 128, 64),), str(path),
+            input_names=["mel"],
+            output_names=["hidden"],
+            dynamic_axes={"mel": {0: "batch", 2: "frames"}, "hidden": {0: "batch", 1: "frames"}},
+            opset_version=OPSET_VERSION,
+            dynamo=False,
+        )
+
+    write_metadata(path, {"signature": checkpoint_signature(model_path)})
+
+    loguru.logger.info(f"Exported ONNX model: {path}")
+
+    return path
+
+def create_session(model_path: str):
+    try:
+        import onnxruntime
+    except ImportError as error:
+        raise ImportError("The ONNX backend requires onnxruntime (pip install onnxruntime)") from error
+
+    path = onnx_path(model_path)
+
+    if not path.exists():
+        raise FileNotFoundError(f"ONNX model not found: {path} (export it with shift.py --export_onnx)")
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = torch.get_num_threads()
+
+    session = onnxruntime.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+    metadata = session.get_modelmeta().custom_metadata_map
+
+    if metadata.get("signature") != checkpoint_signature(model_path):
+        loguru.logger.warning(f"ONNX model is older than its checkpoint, export it again: {path}")
+
+    return session, metadata
+
+class OnnxGenerator(torch.nn.Module):
+    # Only the network runs in ONNX Runtime. The harmonic source (like the mel and F0 stages around it) is still
+    # computed in torch, so this backend does not remove the torch dependency.
+    def __init__(self, model_path: str, h: typing.Any):
+        super().__init__()
+        self.session, metadata = create_session(model_path)
+        self.upp = int(numpy.prod(h.upsample_rates))
+
+        self.m_source = SourceModuleHnNSF(sampling_rate=h.sampling_rate, harmonic_num=8)
+        self.m_source.l_linear.weight.data = torch.tensor(json.loads(metadata["source_weight"])).reshape(1, -1)
+        self.m_source.l_linear.bias.data = torch.tensor(json.loads(metadata["source_bias"]))
+        self.eval()
+
+    def initial_state(self, batchsize: int = 1, device: str = "cpu", seed: typing.Optional[int] = None) -> ExcitationState:
+        return ExcitationState.create(batchsize, self.m_source.l_sin_gen.dim, "cpu", seed)
+
+    def forward(self, x: torch.Tensor, f0: torch.Tensor, state: typing.Optional[ExcitationState] = None) -> typing.Union[torch.Tensor, typing.Tuple[torch.Tensor, ExcitationState]]:
+        if state is None:
+            source = self.m_source(f0.cpu(), self.upp)
+        else:
+            source, state = self.m_source(f0.cpu(), self.upp, state)
+
+        audio = self.vocode(x, source.transpose(1, 2))
+
+        return audio if state is None else (audio, state)
+
+    def vocode(self, x: torch.Tensor, har_source: torch.Tensor) -> torch.Tensor:
+        audio = self.session.run(None, {"mel": x.detach().float().cpu().numpy(), "source": har_source.detach().float().cpu().numpy()})[0]
+
+        return torch.from_numpy(audio)
+
+class OnnxRMVPE(torch.nn.Module):
+    def __init__(self, model_path: str):
+        super().__init__()
+        self.session, _ = create_session(model_path)
+
+    def forward(self, mel: torch.Tensor) -> torch.Tensor:
+        hidden = self.session.run(None, {"mel": mel.detach().float().cpu().numpy()})[0]
+
+        return torch.from_numpy(hidden)
+
+def load_onnx_generator(model_path: str) -> typing.Tuple[OnnxGenerator, typing.Any]:
+    h = load_config(model_path)
+
+    return OnnxGenerator(model_path, h), h
+
+def export_onnx(nsf_hifigan: str, pitch_extractor: str, sample_rate: int = 44100) -> typing.Dict[str, float]:
+    # Imported here because Shift loads its ONNX Runtime models through this module.
+    from modules.shifter.shift import Shift
+
+    reference = Shift(nsf_hifigan, pitch_extractor, "cpu", sample_rate)
+
+    export_generator(reference.generator, nsf_hifigan)
+    export_rmvpe(reference.rmvpe.model, pitch_extractor)
+
+    # Parity check on a synthetic vibrato tone with breath noise, rendered with the same analysis and excitation.
+    time_axis = numpy.arange(5 * sample_rate) / sample_rate
+    frequency = 220 * 2 ** (numpy.sin(2 * numpy.pi * 5 * time_axis) / 12)
+    audio = 0.5 * numpy.sin(2 * numpy.pi * numpy.cumsum(frequency) / sample_rate) + 0.01 * numpy.random.default_rng(0).standard_normal(len(time_axis))
+
+    shifter = Shift(nsf_hifigan, pitch_extractor, "cpu", sample_rate, backend="onnx")
+    metrics = compare_precision(shifter, reference, audio.astype(numpy.float32), 3)
+
+    loguru.logger.info(f"ONNX parity: vocoder max error {metrics['max_error']:.2e} (SNR {metrics['snr_db']:.1f} dB), F0 deviation {metrics['f0_max_error_cents']:.2f} cents max")
+    loguru.logger.info(f"ONNX parity: vocoder {metrics['reference_time'] * 1000:.0f} ms (PyTorch) → {metrics['time'] * 1000:.0f} ms (ONNX Runtime)")
+
+    return metrics
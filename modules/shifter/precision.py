@@ -0,0 +1,112 @@
+import dataclasses
+import typing
+import time
+import loguru
+
+import torch
+import numpy
+
+if typing.TYPE_CHECKING:
+    from modules.shifter.shift import Shift
+
+PRECISIONS = {
+    "fp32": torch.float32,
+    "bf16": torch.bfloat16,
+    "fp16": torch.float16
+}
+
+@dataclasses.dataclass
+class Precision:
+    name: str
+    dtype: torch.dtype
+    weight_dtype: torch.dtype
+
+    @property
+    def autocast(self) -> bool:
+        return self.dtype != self.weight_dtype
+
+    def context(self, device: torch.device) -> torch.autocast:
+        return torch.autocast(device.type, dtype=self.dtype, enabled=self.autocast)
+
+def cpu_supports(dtype: torch.dtype) -> bool:
+    check = {
+        torch.bfloat16: "_is_mkldnn_bf16_supported",
+        torch.float16: "_is_mkldnn_fp16_supported"
+    }[dtype]
+
+    try:
+        return bool(getattr(torch.ops.mkldnn, check)())
+    except (AttributeError, RuntimeError):
+        return False
+
+def resolve_precision(name: str, device: torch.device) -> Precision:
+    if name not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {name} (expected one of {', '.join(PRECISIONS)})")
+
+    dtype = PRECISIONS[name]
+
+    if dtype == torch.float32:
+        return Precision("fp32", torch.float32, torch.float32)
+
+    if device.type == "cuda":
+        if dtype == torch.bfloat16 and not torch.cuda.is_bf16_supported():
+            loguru.logger.warning("bf16 is not supported by this GPU, falling back to fp16")
+            return Precision("fp16", torch.float16, torch.float16)
+
+        # GPUs run reduced-precision weights natively, so the models are cast once at load time.
+        return Precision(name, dtype, dtype)
+
+    if not cpu_supports(dtype):
+        loguru.logger.warning(f"This CPU has no native {name} support, falling back to fp32")
+        return Precision("fp32", torch.float32, torch.float32)
+
+    # On CPU the weights stay in fp32 and autocast runs convolutions and matmuls through the oneDNN (AMX/AVX-512) kernels.
+    return Precision(name, dtype, torch.float32)
+
+def compare_outputs(reference: numpy.ndarray, output: numpy.ndarray) -> typing.Dict[str, float]:
+    length = min(len(reference), len(output))
+    reference, output = reference[:length].astype(numpy.float64), output[:length].astype(numpy.float64)
+    error = output - reference
+
+    signal_power = numpy.mean(reference ** 2)
+    noise_power = numpy.mean(error ** 2)
+
+    return {
+        "snr_db": float(10 * numpy.log10(signal_power / noise_power)) if noise_power > 0 else float("inf"),
+        "max_error": float(numpy.abs(error).max()) if length else 0.0,
+    }
+
+def compare_precision(shifter: "Shift", reference: "Shift", audio: numpy.ndarray, key_shift: float) -> typing.Dict[str, float]:
+    # Both vocoders render the reference analysis, so their SNR only measures the vocoder; F0 is compared separately.
+    audio = shifter.normalize_input(audio)
+    analysis = reference.analyze(audio)
+    f0 = shifter.analyze(audio).f0
+
+    voiced = (analysis.f0 > 0) & (f0 > 0)
+    f0_error = numpy.abs(1200 * numpy.log2(f0[voiced] / analysis.f0[voiced])) if voiced.any() else numpy.zeros(1)
+
+    outputs, times = [], []
+
+    for model in (reference, shifter):
+        # The first call warms up the kernels, the second one is timed; both draw the same SineGen noise.
+        for _ in range(2):
+            torch.manual_seed(0)
+            start = time.perf_counter()
+            output_audio = model.synthesize(analysis, key_shift)
+
+        times.append(time.perf_counter() - start)
+        outputs.append(output_audio)
+
+    metrics = compare_outputs(outputs[0], outputs[1])
+    metrics.update(f0_error_cents=float(f0_error.mean()), f0_max_error_cents=float(f0_error.max()), f0_mismatch=float(numpy.mean((analysis.f0 > 0) != (f0 > 0))), reference_time=times[0], time=times[1])
+
+    return metrics
+
+def check_precision(shifter: "Shift", reference: "Shift", input: str, key_shift: float) -> typing.Dict[str, float]:
+    metrics = compare_precision(shifter, reference, reference.load_audio(input), key_shift)
+
+    loguru.logger.info(f"Precision check ({shifter.precision.name} vs fp32): vocoder SNR {metrics['snr_db']:.1f} dB, max error {metrics['max_error']:.2e}")
+    loguru.logger.info(f"Precision check: F0 deviation {metrics['f0_error_cents']:.1f} cents mean / {metrics['f0_max_error_cents']:.1f} cents max, voicing mismatch {metrics['f0_mismatch'] * 100:.2f}%")
+    loguru.logger.info(f"Precision check: vocoder {metrics['reference_time'] * 1000:.0f} ms (fp32) → {metrics['time'] * 1000:.0f} ms ({shifter.precision.name})")
+
+    return metrics
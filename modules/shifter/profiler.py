@@ -0,0 +1,357 @@
+import contextlib
+import dataclasses
+import threading
+import resource
+import pathlib
+import typing
+import json
+import time
+import os
+import re
+import loguru
+
+import torch
+import numpy
+
+if typing.TYPE_CHECKING:
+    from modules.shifter.shift import Shift
+
+PERCENTILES = (50, 90, 99)
+
+# Highest VmHWM reached before it was last cleared. The profiler clears VmHWM at the start of every stage, so the
+# peak over a longer span (a whole file) is the larger of this and the current VmHWM.
+_cleared_peak_rss = 0.0
+
+def read_status(field: str) -> typing.Optional[float]:
+    # A memory field of /proc/self/status in MB, None where procfs is not available.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return None
+
+def peak_rss() -> float:
+    # Peak resident memory in MB since the last `reset_peak_rss` (VmHWM), or since the start of the process.
+    peak = read_status("VmHWM")
+
+    return peak if peak is not None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def current_rss() -> float:
+    # Resident memory in MB now (VmRSS), 0 where it is unknown, so that peaks measured above it stay absolute.
+    current = read_status("VmRSS")
+
+    return current if current is not None else 0.0
+
+def reset_peak_rss() -> None:
+    global _cleared_peak_rss
+    _cleared_peak_rss = max(_cleared_peak_rss, peak_rss())
+
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+def mark_peak_rss() -> None:
+    # Starts a span for `peak_rss_since_mark`, which stage resets inside it do not shorten.
+    global _cleared_peak_rss
+    reset_peak_rss()
+    _cleared_peak_rss = 0.0
+
+def peak_rss_since_mark() -> float:
+    return max(_cleared_peak_rss, peak_rss())
+
+def peak_memory(device: torch.device) -> float:
+    if device.type == "cuda":
+        return torch.cuda.max_memory_allocated(device) / 1024 ** 2
+
+    return peak_rss()
+
+def current_memory(device: torch.device) -> float:
+    if device.type == "cuda":
+        return torch.cuda.memory_allocated(device) / 1024 ** 2
+
+    return current_rss()
+
+def reset_peak_memory(device: torch.device) -> None:
+    if device.type == "cuda":
+        torch.cuda.reset_peak_memory_stats(device)
+    else:
+        reset_peak_rss()
+
+@dataclasses.dataclass
+class StageTiming:
+    wall: float = 0.0
+    cpu: float = 0.0
+    peak_memory: float = 0.0
+    calls: int = 0
+
+@dataclasses.dataclass
+class Record:
+    # One file (or, in batched runs, one batch of files) with the stages timed while it was processed.
+    name: str
+    pid: int
+    stages: typing.Dict[str, StageTiming] = dataclasses.field(default_factory=dict)
+    events: typing.List[typing.Tuple[str, float, float, int]] = dataclasses.field(default_factory=list)
+
+@dataclasses.dataclass
+class OpenStage:
+    name: str
+    wall: float
+    cpu: float
+    peak_memory: float = 0.0
+    torch_range: typing.Any = None
+
+class Profiler:
+    # Stage times are inclusive of the stages nested in them. CPU time is process-wide, so it includes intra-op
+    # threads (and any other thread that runs at the same time). Peak memory is RSS on CPU, allocated memory on CUDA.
+    def __init__(self, enabled: bool = False, device: typing.Union[str, torch.device] = "cpu", torch_trace: typing.Optional[str] = None):
+        self.enabled = enabled
+        self.device = torch.device(device)
+        self.torch_trace = torch_trace
+        self.records: typing.List[Record] = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @property
+    def current(self) -> typing.Optional[Record]:
+        return getattr(self.local, "record", None)
+
+    @property
+    def stack(self) -> typing.List[OpenStage]:
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+
+        return self.local.stack
+
+    def start(self, name: str) -> None:
+        if not self.enabled or self.current is None:
+            return
+
+        # The peak is reset for every stage, so the enclosing stages keep the peak they had reached so far.
+        peak = peak_memory(self.device)
+        for stage in self.stack:
+            stage.peak_memory = max(stage.peak_memory, peak)
+
+        reset_peak_memory(self.device)
+        torch_range = torch.profiler.record_function(name).__enter__() if self.torch_trace else None
+
+        self.stack.append(OpenStage(name, time.perf_counter(), time.process_time(), torch_range=torch_range))
+
+    def stop(self, name: str) -> None:
+        if not self.enabled or self.current is None or not any(stage.name == name for stage in self.stack):
+            return
+
+        # Stages left open by an exception inside `name` are closed along with it.
+        while self.stack:
+            stage = self.stack.pop()
+            wall, cpu = time.perf_counter() - stage.wall, time.process_time() - stage.cpu
+            peak = max(stage.peak_memory, peak_memory(self.device))
+
+            if stage.torch_range is not None:
+                stage.torch_range.__exit__(None, None, None)
+
+            if self.stack:
+                self.stack[-1].peak_memory = max(self.stack[-1].peak_memory, peak)
+
+            timing = self.current.stages.setdefault(stage.name, StageTiming())
+            timing.wall += wall
+            timing.cpu += cpu
+            timing.peak_memory = max(timing.peak_memory, peak)
+            timing.calls += 1
+            self.current.events.append((stage.name, stage.wall, wall, threading.get_ident()))
+
+            if stage.name == name:
+                break
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> typing.Iterator[None]:
+        self.start(name)
+
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    @contextlib.contextmanager
+    def record(self, name: str) -> typing.Iterator[typing.Optional[Record]]:
+        if not self.enabled or self.current is not None:
+            yield self.current
+            return
+
+        record = Record(name, os.getpid())
+        self.local.record = record
+        self.local.stack = []
+
+        try:
+            if self.torch_trace:
+                with torch.profiler.profile(activities=self.torch_activities()) as torch_profile:
+                    with self.stage("total"):
+                        yield record
+
+                self.export_torch_trace(torch_profile, name)
+            else:
+                with self.stage("total"):
+                    yield record
+        finally:
+            self.local.record = None
+
+            with self.lock:
+                self.records.append(record)
+
+    def torch_activities(self) -> typing.List[torch.profiler.ProfilerActivity]:
+        activities = [torch.profiler.ProfilerActivity.CPU]
+
+        if self.device.type == "cuda":
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+        return activities
+
+    def export_torch_trace(self, torch_profile: torch.profiler.profile, name: str) -> None:
+        directory = pathlib.Path(self.torch_trace)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        with self.lock:
+            path = directory / f"{os.getpid()}_{len(self.records):05d}_{re.sub(r'[^A-Za-z0-9._-]+', '_', pathlib.Path(name).name)}.json"
+
+        torch_profile.export_chrome_trace(str(path))
+
+    def wrap(self, name: str, function: typing.Callable) -> typing.Callable:
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+
+        return timed
+
+    def hook_module(self, name: str, module: torch.nn.Module) -> None:
+        module.register_forward_pre_hook(lambda *_: self.start(name))
+        module.register_forward_hook(lambda *_: self.stop(name))
+
+    def upsample_hook(self, index: int) -> typing.Callable:
+        # A forward pre-hook must return None, anything else would replace the layer's input.
+        def hook(*_) -> None:
+            self.stop(f"upsample_{index - 1}")
+            self.start(f"upsample_{index}")
+
+        return hook
+
+    def instrument(self, generator: torch.nn.Module, rmvpe: typing.Any) -> None:
+        # Hooks into the vocoder and RMVPE, which are vendored, so the stages inside them are timed without changes to their code.
+        if generator is not None:
+            self.hook_module("excitation", generator.m_source)
+
+            # Each upsample stage runs from its transposed convolution to the next one (or to the output convolution).
+            ups = list(getattr(generator, "ups", []))
+            for index, layer in enumerate(ups):
+                layer.register_forward_pre_hook(self.upsample_hook(index))
+
+            if ups:
+                generator.conv_post.register_forward_pre_hook(lambda *_: self.stop(f"upsample_{len(ups) - 1}"))
+
+        if rmvpe is not None:
+            self.hook_module("rmvpe_mel", rmvpe.mel_extractor)
+            rmvpe.decode = self.wrap("f0_decode", rmvpe.decode)
+
+            if not isinstance(rmvpe.model, torch.jit.ScriptModule):
+                self.hook_module("rmvpe_model", rmvpe.model)
+
+    def drain(self) -> typing.List[Record]:
+        with self.lock:
+            records, self.records = self.records, []
+
+        return records
+
+def torch_trace_path(profile: str) -> str:
+    path = pathlib.Path(profile)
+
+    return str(path.with_name(path.stem + ".torch"))
+
+def profile_file(shifter: "Shift", input: str, output: str, key_shift: float, profile: str, profile_torch: bool = False) -> numpy.ndarray:
+    shifter.enable_profiling(torch_trace_path(profile) if profile_torch else None)
+
+    with shifter.profiler.record(input):
+        output_audio = shifter.process_file(input, output, key_shift)
+
+    write_report(shifter.profiler.drain(), profile)
+
+    return output_audio
+
+def merge_records(records: typing.List[Record]) -> typing.List[Record]:
+    # Stages of one file can run on several threads (decoding and encoding ahead of the model), which gives one record each.
+    merged = {}
+
+    for record in records:
+        target = merged.setdefault((record.pid, record.name), Record(record.name, record.pid))
+
+        for name, timing in record.stages.items():
+            total = target.stages.setdefault(name, StageTiming())
+            total.wall += timing.wall
+            total.cpu += timing.cpu
+            total.peak_memory = max(total.peak_memory, timing.peak_memory)
+            total.calls += timing.calls
+
+        target.events.extend(record.events)
+
+    return list(merged.values())
+
+def summarize(records: typing.List[Record]) -> typing.Dict[str, typing.Dict[str, float]]:
+    stages = {}
+
+    for record in records:
+        for name, timing in record.stages.items():
+            stages.setdefault(name, []).append(timing)
+
+    summary = {}
+
+    for name, timings in stages.items():
+        walls = numpy.array([timing.wall for timing in timings])
+        summary[name] = {
+            "records": len(timings),
+            "calls": sum(timing.calls for timing in timings),
+            "wall_total": float(walls.sum()),
+            "cpu_total": float(sum(timing.cpu for timing in timings)),
+            "peak_memory_mb": max(timing.peak_memory for timing in timings),
+            **{f"wall_p{percentile}": float(numpy.percentile(walls, percentile)) for percentile in PERCENTILES},
+        }
+
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["wall_total"]))
+
+def chrome_trace(records: typing.List[Record]) -> typing.Dict[str, typing.Any]:
+    # Complete ("X") events, one lane per process and thread, which chrome://tracing and Perfetto open directly.
+    start = min((event[1] for record in records for event in record.events), default=0.0)
+    events = []
+
+    for record in records:
+        for name, begin, duration, thread in record.events:
+            events.append({"name": name, "cat": "stage", "ph": "X", "ts": (begin - start) * 1e6, "dur": duration * 1e6, "pid": record.pid, "tid": thread, "args": {"record": record.name}})
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def write_report(records: typing.List[Record], path: str) -> typing.Dict[str, typing.Dict[str, float]]:
+    records = merge_records(records)
+    summary = summarize(records)
+    path = pathlib.Path(path)
+
+    report = {
+        "stages": summary,
+        "records": [{"name": record.name, "pid": record.pid, "stages": {name: dataclasses.asdict(timing) for name, timing in record.stages.items()}} for record in records],
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=4))
+    path.with_name(path.stem + ".trace.json").write_text(json.dumps(chrome_trace(records)))
+
+    log_summary(summary)
+    loguru.logger.info(f"Saved profile: {path} (Chrome trace: {path.with_name(path.stem + '.trace.json')})")
+
+    return summary
+
+def log_summary(summary: typing.Dict[str, typing.Dict[str, float]]) -> None:
+    loguru.logger.info(f"{'Stage':<16}{'total':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'cpu':>10}{'peak MB':>10}")
+
+    for name, stage in summary.items():
+        loguru.logger.info(f"{name:<16}{stage['wall_total']:>9.3f}s{stage['wall_p50']:>9.3f}s{stage['wall_p90']:>9.3f}s{stage['wall_p99']:>9.3f}s{stage['cpu_total']:>9.3f}s{stage['peak_memory_mb']:>10.0f}")
@@ -0,0 +1,166 @@
+import warnings
+import pathlib
+import typing
+import copy
+import loguru
+
+import torch
+import torch.ao.quantization as quantization
+
+from modules.rmvpe.model import E2E0
+from modules.shifter.precision import compare_outputs, compare_precision
+from modules.shifter.utils import checkpoint_signature
+
+QUANTIZED_SUFFIX = ".int8.pt"
+CALIBRATION_SECONDS = 30
+CALIBRATION_FRAMES = 1024
+
+CONVOLUTIONS = (torch.nn.Conv2d, torch.nn.ConvTranspose2d)
+
+def quantized_path(model_path: str) -> pathlib.Path:
+    path = pathlib.Path(model_path)
+
+    return path.with_name(path.stem + QUANTIZED_SUFFIX)
+
+def quantized_signature(model_path: str) -> str:
+    # Quantized weights are tied to the source checkpoint and to the kernels they were packed for.
+    return f"{checkpoint_signature(model_path)}:{torch.__version__}:{torch.backends.quantized.engine}"
+
+def fuse_sequential(sequential: torch.nn.Sequential) -> torch.nn.Sequential:
+    children = list(sequential)
+    groups = []
+    index = 0
+
+    while index < len(children):
+        if isinstance(children[index], CONVOLUTIONS) and index + 1 < len(children) and isinstance(children[index + 1], torch.nn.BatchNorm2d):
+            # Conv2d + BatchNorm2d + ReLU fuses into a single ConvReLU2d, ConvTranspose2d only folds the BatchNorm.
+            length = 3 if isinstance(children[index], torch.nn.Conv2d) and index + 2 < len(children) and isinstance(children[index + 2], torch.nn.ReLU) else 2
+            groups.append([str(position) for position in range(index, index + length)])
+            index += length
+        else:
+            index += 1
+
+    return quantization.fuse_modules(sequential, groups) if groups else sequential
+
+def wrap_convolutions(module: torch.nn.Module) -> None:
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Sequential) and all(isinstance(layer, CONVOLUTIONS + (torch.nn.BatchNorm2d, torch.nn.ReLU)) for layer in child):
+            setattr(module, name, quantization.QuantWrapper(fuse_sequential(child)))
+        elif isinstance(child, CONVOLUTIONS):
+            setattr(module, name, quantization.QuantWrapper(child))
+        else:
+            wrap_convolutions(child)
+
+def quantize_rmvpe_dynamic(model: E2E0) -> E2E0:
+    model.fc = quantization.quantize_dynamic(model.fc, {torch.nn.GRU, torch.nn.Linear}, dtype=torch.qint8)
+
+    return model
+
+def prepare_rmvpe(model: E2E0) -> E2E0:
+    # The U-Net convolutions are quantized statically (activation ranges come from calibration), the BiGRU and
+    # the output Linear dynamically, since their activation ranges are computed on the fly.
+    model.eval()
+    wrap_convolutions(model)
+
+    activation = quantization.HistogramObserver.with_args(quant_min=0, quant_max=127)
+
+    for module in model.modules():
+        if isinstance(module, quantization.QuantWrapper):
+            module.qconfig = quantization.QConfig(activation=activation, weight=quantization.default_per_channel_weight_observer)
+        elif isinstance(module, torch.nn.ConvTranspose2d):
+            module.qconfig = quantization.QConfig(activation=activation, weight=quantization.default_weight_observer)
+
+    return quantization.prepare(quantize_rmvpe_dynamic(model))
+
+def calibrate_rmvpe(model: E2E0, mels: typing.List[torch.Tensor]) -> torch.nn.Module:
+    prepared = prepare_rmvpe(copy.deepcopy(model).cpu())
+
+    with torch.no_grad():
+        for mel in mels:
+            prepared(mel)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return quantization.convert(prepared)
+
+def save_quantized_rmvpe(model: torch.nn.Module, model_path: str) -> pathlib.Path:
+    # Saved as TorchScript: it keeps the packed int8 weights, so loading does not repeat fusion, observers and packing.
+    path = quantized_path(model_path)
+
+    with torch.no_grad():
+        traced = torch.jit.trace(model, torch.zeros(1, 128, 64))
+
+    torch.jit.save(traced, str(path), _extra_files={"signature": quantized_signature(model_path)})
+    loguru.logger.info(f"Saved quantized model: {path}")
+
+    return path
+
+def load_quantized_rmvpe(model_path: str) -> typing.Optional[torch.nn.Module]:
+    path = quantized_path(model_path)
+
+    if not path.exists():
+        return None
+
+    extra_files = {"signature": ""}
+    model = torch.jit.load(str(path), map_location="cpu", _extra_files=extra_files)
+
+    if extra_files["signature"].decode() != quantized_signature(model_path):
+        loguru.logger.warning(f"Quantized model is stale, ignoring: {path}")
+        return None
+
+    return model.eval()
+
+def calibration_files(path: str) -> typing.List[pathlib.Path]:
+    path = pathlib.Path(path)
+
+    if path.is_file():
+        return [path]
+
+    return sorted(file for file in path.rglob("*") if file.suffix.lower() == ".wav")
+
+def calibration_segments(mel: torch.Tensor) -> typing.List[torch.Tensor]:
+    segments = []
+
+    for start in range(0, mel.shape[-1], CALIBRATION_FRAMES):
+        segment = mel[..., start:start + CALIBRATION_FRAMES]
+        segments.append(torch.nn.functional.pad(segment, (0, 32 * ((segment.shape[-1] - 1) // 32 + 1) - segment.shape[-1])))
+
+    return segments
+
+def calibrate(calibration: str, nsf_hifigan: str, pitch_extractor: str, sample_rate: int = 44100) -> typing.Dict[str, float]:
+    # Imported here because Shift loads its int8 RMVPE through this module.
+    from modules.shifter.shift import Shift
+
+    paths = calibration_files(calibration)
+
+    if not paths:
+        raise FileNotFoundError(f"No WAV files found for calibration: {calibration}")
+
+    reference = Shift(nsf_hifigan, pitch_extractor, "cpu", sample_rate)
+    audios = [reference.normalize_input(reference.load_audio(str(path))[:CALIBRATION_SECONDS * sample_rate]) for path in paths]
+    mels = []
+
+    loguru.logger.info(f"Calibrating int8 models on {len(paths)} file(s)...")
+
+    for audio in audios:
+        audio_16k = reference.resampler(torch.from_numpy(audio).float(), sample_rate, 16000)
+        mels.extend(calibration_segments(reference.rmvpe.mel_extractor(audio_16k.unsqueeze(0), center=True)))
+
+    save_quantized_rmvpe(calibrate_rmvpe(reference.rmvpe.model, mels), pitch_extractor)
+
+    shifter = Shift(nsf_hifigan, pitch_extractor, "cpu", sample_rate, quantize=True)
+    audio = audios[0][:10 * sample_rate]
+    metrics = compare_precision(shifter, reference, audio, 0)
+
+    # The vocoder is fp32 on both sides, so only full renders, each with its own F0, show what int8 RMVPE changes.
+    outputs = []
+
+    for model in (reference, shifter):
+        torch.manual_seed(0)
+        outputs.append(model.process_audio(audio, 0))
+
+    metrics.update(compare_outputs(outputs[0], outputs[1]))
+
+    loguru.logger.info(f"Calibration (int8 RMVPE vs fp32): rendered output SNR {metrics['snr_db']:.1f} dB, F0 deviation {metrics['f0_error_cents']:.1f} cents mean, voicing mismatch {metrics['f0_mismatch'] * 100:.2f}%")
+
+    return metrics
@@ -0,0 +1,58 @@
+import math
+
+import torch
+
+# Zero crossings of the sinc filter on each side, the 128 RMVPE always used with torchaudio. The kernel is built once
+# per rate pair, so the long filter only costs about 10 ms per 30 s of audio over a 16-crossing one.
+LOWPASS_FILTER_WIDTH = 128
+
+class Resampler:
+    def __init__(self, lowpass_filter_width: int = LOWPASS_FILTER_WIDTH, rolloff: float = 0.99):
+        self.lowpass_filter_width = lowpass_filter_width
+        self.rolloff = rolloff
+        self.kernels = {}
+
+    def kernel(self, orig_sr: int, target_sr: int, device: torch.device, dtype: torch.dtype) -> torch.Tensor:
+        kernel_key = f"{orig_sr}_{target_sr}_{device}_{dtype}"
+
+        if kernel_key not in self.kernels:
+            # One windowed-sinc filter per output phase, stacked as conv1d output channels, so that a single
+            # strided convolution produces `target_sr` samples for every `orig_sr` input samples.
+            base_frequency = min(orig_sr, target_sr) * self.rolloff
+            width = self.width(orig_sr, target_sr)
+
+            index = torch.arange(-width, width + orig_sr, dtype=torch.float64, device=device)[None, None] / orig_sr
+            time = torch.arange(0, -target_sr, -1, dtype=torch.float64, device=device)[:, None, None] / target_sr + index
+            time = (time * base_frequency).clamp(-self.lowpass_filter_width, self.lowpass_filter_width)
+
+            window = torch.cos(time * math.pi / self.lowpass_filter_width / 2) ** 2
+            time = time * math.pi
+            sinc = torch.where(time == 0, torch.ones_like(time), torch.sin(time) / time)
+
+            self.kernels[kernel_key] = (sinc * window * base_frequency / orig_sr).to(dtype)
+
+        return self.kernels[kernel_key]
+
+    def width(self, orig_sr: int, target_sr: int) -> int:
+        return int(math.ceil(self.lowpass_filter_width * orig_sr / (min(orig_sr, target_sr) * self.rolloff)))
+
+    def __call__(self, audio: torch.Tensor, orig_sr: int, target_sr: int) -> torch.Tensor:
+        if orig_sr == target_sr:
+            return audio
+
+        gcd = math.gcd(int(orig_sr), int(target_sr))
+        orig_sr, target_sr = int(orig_sr) // gcd, int(target_sr) // gcd
+
+        kernel = self.kernel(orig_sr, target_sr, audio.device, audio.dtype)
+        width = self.width(orig_sr, target_sr)
+
+        shape = audio.shape
+        audio = audio.reshape(-1, shape[-1])
+        length = audio.shape[-1]
+
+        audio = torch.nn.functional.pad(audio, (width, width + orig_sr))
+        resampled = torch.nn.functional.conv1d(audio.unsqueeze(1), kernel, stride=orig_sr)
+        resampled = resampled.transpose(1, 2).reshape(audio.shape[0], -1)
+        resampled = resampled[..., :int(math.ceil(target_sr * length / orig_sr))]
+
+        return resampled.reshape(*shape[:-1], resampled.shape[-1])
@@ -0,0 +1,103 @@
+import concurrent.futures
+import dataclasses
+import threading
+import typing
+import queue
+import time
+import loguru
+
+import numpy
+
+from modules.shifter.shift import Shift
+
+MAX_DELAY = 0.005
+MAX_QUEUE = 64
+MAX_BATCH = 8
+
+@dataclasses.dataclass
+class Request:
+    audio: numpy.ndarray
+    key_shift: float
+    future: concurrent.futures.Future
+    submitted: float
+
+class MicroBatchScheduler:
+    # Requests from any number of threads are handed to a single inference thread, which owns the models. Once a
+    # request comes in, the thread waits up to `max_delay` seconds for more (or until `max_batch_size` are pending),
+    # renders all of them together through `Shift.render_batch` and resolves their futures. The batch size has its own
+    # default rather than the shifter's (1 unless asked otherwise), so concurrent requests are batched out of the box.
+    # Since requests are rendered in windows of `render_batch`, a file shifted through the scheduler matches the same
+    # file rendered with chunking (`chunk_size`, or 5 s windows), not the whole-file path.
+    def __init__(self, shifter: Shift, max_batch_size: int = MAX_BATCH, max_delay: float = MAX_DELAY, max_queue: int = MAX_QUEUE):
+        self.shifter = shifter
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max(0.0, max_delay)
+        self.requests = queue.Queue(maxsize=max_queue)
+
+        self.batches = 0
+        self.rendered = 0
+        self.queue_time = 0.0
+
+        self.thread = threading.Thread(target=self.run, name="scheduler", daemon=True)
+        self.thread.start()
+
+    def submit(self, audio: numpy.ndarray, key_shift: float) -> concurrent.futures.Future:
+        # Raises queue.Full when `max_queue` requests are already waiting.
+        future = concurrent.futures.Future()
+        self.requests.put_nowait(Request(audio, key_shift, future, time.perf_counter()))
+
+        return future
+
+    def pending(self) -> int:
+        return self.requests.qsize()
+
+    def stats(self) -> typing.Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "requests": self.rendered,
+            "mean_batch_size": self.rendered / self.batches if self.batches else 0.0,
+            "mean_queue_ms": self.queue_time / self.rendered * 1000 if self.rendered else 0.0,
+        }
+
+    def next_batch(self) -> typing.List[Request]:
+        requests = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_delay
+
+        while len(requests) < self.max_batch_size:
+            try:
+                requests.append(self.requests.get(timeout=max(0.0, deadline - time.perf_counter())))
+            except queue.Empty:
+                break
+
+        return requests
+
+    def render(self, requests: typing.List[Request]) -> typing.List[typing.Union[numpy.ndarray, Exception]]:
+        try:
+            return self.shifter.render_batch([request.audio for request in requests], [request.key_shift for request in requests])
+        except Exception as e:
+            if len(requests) == 1:
+                return [e]
+
+            # One bad request should not fail the others, so fall back to rendering them one by one.
+            loguru.logger.debug(f"Batched render failed ({e}), rendering requests individually")
+
+            return [output for request in requests for output in self.render([request])]
+
+    def run(self) -> None:
+        while True:
+            requests = self.next_batch()
+            start = time.perf_counter()
+
+            outputs = self.render(requests)
+
+            self.batches += 1
+            self.rendered += len(requests)
+            self.queue_time += sum(start - request.submitted for request in requests)
+
+            loguru.logger.debug(f"Rendered a batch of {len(requests)} request(s) in {time.perf_counter() - start:.2f}s")
+
+            for request, output in zip(requests, outputs):
+                if isinstance(output, Exception):
+                    request.future.set_exception(output)
+                else:
+                    request.future.set_result(output)
@@ -0,0 +1,128 @@
+import http.server
+import urllib.parse
+import pathlib
+import queue
+import json
+import time
+import io
+import loguru
+
+import soundfile
+
+from modules.shifter.shift import Shift
+from modules.shifter.scheduler import MAX_BATCH, MAX_DELAY, MAX_QUEUE, MicroBatchScheduler
+from modules.shifter.client import DEFAULT_HOST, DEFAULT_PORT
+
+MAX_REQUEST_MB = 512
+
+OUTPUT_FORMATS = {
+    "wav": ("WAV", "audio/wav"),
+    "flac": ("FLAC", "audio/flac"),
+    "ogg": ("OGG", "audio/ogg")
+}
+
+class ShiftServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, shifter: Shift, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, max_delay: float = MAX_DELAY, max_queue: int = MAX_QUEUE, max_batch: int = MAX_BATCH):
+        super().__init__((host, port), ShiftRequestHandler)
+        self.shifter = shifter
+        self.scheduler = MicroBatchScheduler(shifter, max_batch, max_delay, max_queue)
+
+class ShiftRequestHandler(http.server.BaseHTTPRequestHandler):
+    server: ShiftServer
+
+    def log_message(self, format: str, *args) -> None:
+        loguru.logger.debug(f"{self.address_string()} - {format % args}")
+
+    def send_json(self, status: int, content: dict) -> None:
+        body = json.dumps(content).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if urllib.parse.urlparse(self.path).path != "/health":
+            self.send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+
+        shifter = self.server.shifter
+        self.send_json(200, {
+            "status": "ok",
+            "device": str(shifter.device),
+            "backend": shifter.backend,
+            "precision": "int8" if shifter.quantize else shifter.precision.name,
+            "sample_rate": shifter.sample_rate,
+            "batch_size": shifter.batch_size,
+            "max_batch": self.server.scheduler.max_batch_size,
+            "pending": self.server.scheduler.pending(),
+            **self.server.scheduler.stats(),
+        })
+
+    def do_POST(self) -> None:
+        url = urllib.parse.urlparse(self.path)
+        query = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+
+        if url.path != "/shift":
+            self.send_json(404, {"error": f"Unknown endpoint: {url.path}"})
+            return
+
+        try:
+            key_shift = float(query.get("key_shift", 0))
+            output_format, content_type = OUTPUT_FORMATS[query.get("format", "wav").lower()]
+            length = int(self.headers.get("Content-Length", 0))
+        except (KeyError, ValueError) as e:
+            self.send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        if length <= 0 or length > MAX_REQUEST_MB * 1024 * 1024:
+            self.send_json(413 if length > 0 else 400, {"error": f"Request body must hold between 1 byte and {MAX_REQUEST_MB} MB of audio"})
+            return
+
+        data = self.rfile.read(length)
+        start = time.perf_counter()
+
+        try:
+            audio = self.server.shifter.load_audio_bytes(data, pathlib.Path(query.get("filename", "")).suffix)
+        except Exception as e:
+            self.send_json(400, {"error": f"Could not decode audio: {str(e) or type(e).__name__}"})
+            return
+
+        try:
+            future = self.server.scheduler.submit(audio, key_shift)
+        except queue.Full:
+            self.send_json(503, {"error": "Server is busy, try again later"})
+            return
+
+        try:
+            output_audio = future.result()
+        except Exception as e:
+            loguru.logger.error(f"Request failed: {e}")
+            self.send_json(500, {"error": str(e)})
+            return
+
+        buffer = io.BytesIO()
+        soundfile.write(buffer, output_audio, self.server.shifter.sample_rate, format=output_format)
+        body = buffer.getvalue()
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Processing-Time", f"{time.perf_counter() - start:.4f}")
+        self.end_headers()
+        self.wfile.write(body)
+
+        loguru.logger.info(f"Shifted {len(audio) / self.server.shifter.sample_rate:.1f}s by {key_shift:+.1f} semitones in {time.perf_counter() - start:.2f}s")
+
+def serve(shifter: Shift, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, max_delay: float = MAX_DELAY, max_queue: int = MAX_QUEUE, max_batch: int = MAX_BATCH) -> None:
+    server = ShiftServer(shifter, host, port, max_delay, max_queue, max_batch)
+
+    loguru.logger.success(f"Serving on http://{host}:{server.server_address[1]} (POST /shift?key_shift=<semitones>, GET /health)")
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
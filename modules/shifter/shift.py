@@ -1,5 +1,7 @@
-import librosa
-import resampy
+import dataclasses
+import typing
+import math
+import time
 import soundfile
 import loguru
 
@@ -9,49 +11,227 @@ import numpy
 from modules.nsf_hifigan.models import load_model
 from modules.rmvpe.inference import RMVPE
 from modules.shifter.mel_extractor import MelExtractor
+from modules.shifter.resample import Resampler
+from modules.shifter.loader import DecodedAudio, decode_audio, decode_audio_bytes
+from modules.shifter.f0_cache import F0Cache
+from modules.shifter.precision import resolve_precision
+from modules.shifter.onnx_backend import OnnxRMVPE, load_onnx_generator
+from modules.shifter.snapshot import load_fused_generator, load_fused_rmvpe
+from modules.shifter.quantize import quantize_rmvpe_dynamic, load_quantized_rmvpe
+from modules.shifter.profiler import Profiler, profile_file
+from modules.shifter.bucket import bucket_by_length
+from modules.shifter.chunk import CONTEXT_SECONDS, Chunk, seconds_to_frames, plan_chunks, crossfade_window
 from modules.shifter.utils import *
 
+SILENCE_MEL = math.log(1e-5)
+F0_THRESHOLD = 0.03
+BACKENDS = ("torch", "onnx")
+WARM_UP_SECONDS = 5.0
+SEGMENT_SECONDS = 5.0
+
+@dataclasses.dataclass
+class Analysis:
+    audio_16k: torch.Tensor
+    mel: torch.Tensor
+    f0: numpy.ndarray
+    uv: numpy.ndarray
+
 class Shift:
-    def __init__(self, nsf_hifigan: str, pitch_extractor: str = None, device: str = "cuda", sample_rate: int = 44100):
+    def __init__(self, nsf_hifigan: str, pitch_extractor: str = None, device: str = "cuda", sample_rate: int = 44100, chunk_size: float = None, chunk_overlap: float = 0.2, batch_size: int = 1, f0_cache: str = None, f0_cache_size: float = 1024, use_viterbi: bool = False, precision: str = "fp32", quantize: bool = False, backend: str = "torch", compile: bool = False):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+        if backend == "onnx" and (device != "cpu" or quantize or precision != "fp32"):
+            loguru.logger.warning("The ONNX backend runs fp32 models on the CPU execution provider, ignoring device/precision/quantization")
+            device, quantize, precision = "cpu", False, "fp32"
+
+        self.backend = backend
         self.device = torch.device(device if torch.cuda.is_available() else "cpu")
         self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = max(1, batch_size)
+        self.use_viterbi = use_viterbi
+        self.quantize = quantize and self.device.type == "cpu"
+        self.compiled = compile and backend == "torch"
+
+        if quantize and not self.quantize:
+            loguru.logger.warning("int8 models only run on CPU, ignoring quantization")
 
-        loguru.logger.info(f"Using device: {self.device}")
+        if compile and not self.compiled:
+            loguru.logger.warning("ONNX Runtime models are already optimized graphs, ignoring compilation")
+
+        if self.quantize and precision != "fp32":
+            loguru.logger.warning(f"int8 models run in fp32 around the quantized layers, ignoring precision {precision}")
+            precision = "fp32"
+
+        self.precision = resolve_precision(precision, self.device)
+
+        loguru.logger.info(f"Using device: {self.device}" + (" (ONNX Runtime)" if backend == "onnx" else ""))
+        loguru.logger.info(f"Using precision: {'int8 RMVPE, fp32 vocoder' if self.quantize else self.precision.name}" + (" (autocast)" if self.precision.autocast else ""))
 
         loguru.logger.info("Loading NSF HiFiGAN...")
-        self.generator, self.config = load_model(nsf_hifigan, device=str(self.device))
+        self.generator, self.config = self.load_generator(nsf_hifigan)
         self.hop_length = self.config.hop_size
 
+        self.resampler = Resampler()
         self.mel_extractor = MelExtractor(sample_rate, self.config.n_fft, self.config.win_size, self.config.hop_size, self.config.fmin, self.config.fmax, self.config.num_mels,)
 
         loguru.logger.info("Loading pitch extractor...")
         self.rmvpe = None
 
         if pitch_extractor:
-            self.rmvpe = RMVPE(pitch_extractor, hop_length=160)
-            self.rmvpe.model = self.rmvpe.model.to(self.device)
-            loguru.logger.info("Using pitch extractor: RMVPE")
+            self.rmvpe = self.load_rmvpe(pitch_extractor)
+            loguru.logger.info(f"Using pitch extractor: RMVPE ({'viterbi' if use_viterbi else 'argmax'} decoding)")
         else:
             loguru.logger.warning("No pitch extractor provided - pitch extraction will fail!")
 
-    def process_audio(self, audio: numpy.ndarray, key_shift: float,) -> numpy.ndarray:
-        max_amplitude = numpy.max(numpy.abs(audio))
-        if max_amplitude > 1.0:
-            audio = audio / max_amplitude
-        
-        audio_tensor = torch.from_numpy(audio).float().unsqueeze(0).to(self.device)
+        self.f0_cache = F0Cache(f0_cache, pitch_extractor, F0_THRESHOLD, f0_cache_size, use_viterbi, 'int8' if self.quantize else self.precision.name, backend) if f0_cache and pitch_extractor else None
+
+        if chunk_size:
+            loguru.logger.info(f"Chunked processing: {chunk_size:.1f}s chunks, {chunk_overlap:.2f}s overlap")
+
+        self.profiler = Profiler(device=self.device)
+
+        if self.compiled:
+            self.compile_models()
+            self.warm_up()
 
-        mel_spectrogram = self.mel_extractor(audio_tensor)
-        mel_length = mel_spectrogram.shape[-1]
+    def load_generator(self, nsf_hifigan: str) -> typing.Tuple[torch.nn.Module, typing.Any]:
+        if self.backend == "onnx":
+            return load_onnx_generator(nsf_hifigan)
 
-        if self.sample_rate != 16000:
-            audio_16k = resampy.resample(audio, self.sample_rate, 16000)
+        # The vocoder stays fp32 under --quantize: int8 activations were measured slower than fp32 on its upsampling
+        # stack and audibly degrade the output, and int8 weights dequantized at load only add rounding error.
+        return load_fused_generator(nsf_hifigan, str(self.device), self.precision.weight_dtype) or load_model(nsf_hifigan, device=str(self.device), dtype=self.precision.weight_dtype)
+
+    def load_rmvpe(self, pitch_extractor: str) -> RMVPE:
+        if self.backend == "onnx":
+            return RMVPE(pitch_extractor, hop_length=160, resampler=self.resampler, model=OnnxRMVPE(pitch_extractor))
+
+        if not self.quantize:
+            rmvpe = RMVPE(pitch_extractor, hop_length=160, resampler=self.resampler, dtype=self.precision.dtype, model=load_fused_rmvpe(pitch_extractor))
+            rmvpe.model = rmvpe.model.to(self.device, self.precision.weight_dtype)
+
+            return rmvpe
+
+        model = load_quantized_rmvpe(pitch_extractor)
+
+        if model is not None:
+            return RMVPE(pitch_extractor, hop_length=160, resampler=self.resampler, model=model)
+
+        loguru.logger.warning("No calibrated int8 RMVPE found (see --calibrate), only its GRU and Linear layers are quantized")
+
+        rmvpe = RMVPE(pitch_extractor, hop_length=160, resampler=self.resampler, model=load_fused_rmvpe(pitch_extractor))
+        rmvpe.model = quantize_rmvpe_dynamic(rmvpe.model)
+
+        return rmvpe
+
+    def compile_models(self) -> None:
+        # On CPU, freezing lets inductor constant-fold the weights and prepack them for the oneDNN kernels.
+        options = {"freezing": True} if self.device.type == "cpu" else None
+
+        # Only the convolution stack is compiled: the harmonic source draws random noise, which inductor would
+        # generate differently from eager mode, and its sine synthesis is faster as plain cumsum/sin kernels.
+        self.generator.vocode = torch.compile(self.generator.vocode, options=options)
+
+        # The int8 RMVPE is a TorchScript module, which torch.compile cannot trace.
+        if self.rmvpe is not None and not isinstance(self.rmvpe.model, torch.jit.ScriptModule):
+            self.rmvpe.model = torch.compile(self.rmvpe.model, options=options)
+
+    def enable_profiling(self, torch_trace: typing.Optional[str] = None) -> None:
+        self.profiler.enabled = True
+        self.profiler.torch_trace = torch_trace
+
+        # Hooks inside compiled graphs would break them up, so compiled models are only timed as a whole.
+        if self.compiled:
+            loguru.logger.warning("Compiled models are profiled as a whole, without per-layer stages")
         else:
-            audio_16k = audio
-        
-        f0 = self.rmvpe.infer_from_audio(audio_16k, 16000, self.device, 0.03)
-        uv = f0 == 0
+            self.profiler.instrument(self.generator, self.rmvpe)
+
+    def warm_up_frames(self) -> typing.List[int]:
+        if self.chunk_size:
+            chunk_frames = seconds_to_frames(self.chunk_size, self.sample_rate, self.hop_length)
+            context_frames = seconds_to_frames(CONTEXT_SECONDS, self.sample_rate, self.hop_length)
+
+            # Inner chunk windows carry context on both sides, the first and last ones only on one.
+            return [chunk_frames + 2 * context_frames, chunk_frames + context_frames]
 
+        return [seconds_to_frames(WARM_UP_SECONDS, self.sample_rate, self.hop_length), seconds_to_frames(WARM_UP_SECONDS / 2, self.sample_rate, self.hop_length)]
+
+    def warm_up(self) -> None:
+        # Compilation happens on the first call with every new input shape. Running two different lengths up front
+        # also makes the time axis dynamic, so real files and chunks reuse the compiled graphs instead of recompiling.
+        loguru.logger.info("Compiling models (warm-up)...")
+        start = time.perf_counter()
+
+        # Warm-up inputs are not worth caching, so the F0 cache is bypassed while they run.
+        f0_cache, self.f0_cache = self.f0_cache, None
+
+        try:
+            for frames in self.warm_up_frames():
+                analyses = self.analyze_batch([numpy.zeros(frames * self.hop_length, dtype=numpy.float32)] * self.batch_size)
+                self.synthesize_many(analyses, [0.0] * len(analyses))
+        finally:
+            self.f0_cache = f0_cache
+
+        loguru.logger.info(f"Models compiled in {time.perf_counter() - start:.1f}s")
+
+    def extract_f0_batch(self, audios_16k: typing.List[torch.Tensor]) -> typing.List[numpy.ndarray]:
+        keys = [self.f0_cache.key(audio_16k) for audio_16k in audios_16k] if self.f0_cache else [None] * len(audios_16k)
+        f0s = [self.f0_cache.get(key) for key in keys] if self.f0_cache else [None] * len(audios_16k)
+        missing = [index for index, f0 in enumerate(f0s) if f0 is None]
+
+        if self.f0_cache and len(missing) < len(audios_16k):
+            loguru.logger.debug(f"F0 cache: {len(audios_16k) - len(missing)} hit(s), {len(missing)} miss(es)")
+
+        # One path for any number of misses, so a file's F0 does not depend on which files share its batch.
+        extracted = self.rmvpe.infer_batch([audios_16k[index] for index in missing], 16000, self.device, F0_THRESHOLD, self.use_viterbi, batch_size=self.batch_size) if missing else []
+
+        for index, f0 in zip(missing, extracted):
+            f0s[index] = f0
+
+            if self.f0_cache:
+                self.f0_cache.put(keys[index], f0)
+
+        return f0s
+
+    def analyze(self, audio: numpy.ndarray) -> Analysis:
+        audio_tensor = torch.from_numpy(audio).float().unsqueeze(0).to(self.device)
+
+        with self.profiler.stage("mel"):
+            mel_spectrogram = self.mel_extractor(audio_tensor)
+
+        with self.profiler.stage("resample_16k"):
+            audio_16k = self.resampler(audio_tensor[0], self.sample_rate, 16000)
+
+        with self.profiler.stage("f0"):
+            f0 = self.extract_f0_batch([audio_16k])[0]
+
+        return Analysis(audio_16k=audio_16k, mel=mel_spectrogram, f0=f0, uv=f0 == 0)
+
+    def analyze_batch(self, audios: typing.List[numpy.ndarray]) -> typing.List[Analysis]:
+        if len(audios) == 1:
+            return [self.analyze(audios[0])]
+
+        audio_tensors = [torch.from_numpy(audio).float().unsqueeze(0).to(self.device) for audio in audios]
+
+        with self.profiler.stage("mel"):
+            mel_spectrograms = [self.mel_extractor(audio_tensor) for audio_tensor in audio_tensors]
+
+        with self.profiler.stage("resample_16k"):
+            audios_16k = [self.resampler(audio_tensor[0], self.sample_rate, 16000) for audio_tensor in audio_tensors]
+
+        with self.profiler.stage("f0"):
+            f0s = self.extract_f0_batch(audios_16k)
+
+        return [Analysis(audio_16k=audio_16k, mel=mel_spectrogram, f0=f0, uv=f0 == 0) for audio_16k, mel_spectrogram, f0 in zip(audios_16k, mel_spectrograms, f0s)]
+
+    def align_f0(self, analysis: Analysis, key_shift: float) -> numpy.ndarray:
+        with self.profiler.stage("f0_interpolate"):
+            return self.interpolate_f0(analysis.f0, analysis.uv, analysis.mel.shape[-1], key_shift)
+
+    def interpolate_f0(self, f0: numpy.ndarray, uv: numpy.ndarray, num_frames: int, key_shift: float) -> numpy.ndarray:
         if len(f0[~uv]) > 0:
             f0_continuous = f0.copy()
             f0_continuous[uv] = numpy.interp(numpy.where(uv)[0], numpy.where(~uv)[0], f0[~uv])
@@ -59,7 +239,7 @@ class Shift:
             f0_continuous = f0
         
         original_time = 0.01 * numpy.arange(len(f0))
-        target_time = (numpy.arange(mel_length) * self.hop_length) / self.sample_rate
+        target_time = (numpy.arange(num_frames) * self.hop_length) / self.sample_rate
         
         f0_interpolated = numpy.interp(target_time, original_time, f0_continuous)
         uv_interpolated = numpy.interp(target_time, original_time, uv.astype(float)) > 0.5
@@ -67,29 +247,186 @@ class Shift:
         pitch_factor = 2 ** (key_shift / 12)
         f0_shifted = f0_interpolated * pitch_factor
         f0_shifted[uv_interpolated] = 0
-        
+
+        return f0_shifted
+
+    def synthesize(self, analysis: Analysis, key_shift: float) -> numpy.ndarray:
+        f0_shifted = self.align_f0(analysis, key_shift)
         f0_tensor = torch.from_numpy(f0_shifted).float().unsqueeze(0).to(self.device)
 
-        with torch.no_grad():
-            output_audio = self.generator(mel_spectrogram, f0_tensor)
-        
-        output_audio = output_audio.squeeze().cpu().numpy()
-        output_audio = output_audio / (numpy.max(numpy.abs(output_audio)) + 1e-5) * 0.95
+        with torch.no_grad(), self.precision.context(self.device), self.profiler.stage("vocoder"):
+            output_audio = self.generator(analysis.mel.to(self.precision.weight_dtype), f0_tensor)
         
-        return output_audio
-    
-    def process_file(self, input_path: str, output_path: str, key_shift: float) -> numpy.ndarray:
-        loguru.logger.info(f"Processing: {input_path}")
-        loguru.logger.info(f"Pitch shifting: {key_shift:+.1f} semitones ()")
+        return output_audio.squeeze().float().cpu().numpy()
+
+    def synthesize_batch(self, analyses: typing.List[Analysis], key_shifts: typing.List[float]) -> typing.List[numpy.ndarray]:
+        if len(analyses) == 1:
+            return [self.synthesize(analyses[0], key_shifts[0])]
 
-        audio, _ = librosa.load(input_path, sr=self.sample_rate, mono=True)
+        lengths = [analysis.mel.shape[-1] for analysis in analyses]
+        max_length = max(lengths)
 
-        if self.sample_rate != 16000:
-            audio_16k = resampy.resample(audio, self.sample_rate, 16000)
+        mel_batch = torch.full((len(analyses), self.config.num_mels, max_length), SILENCE_MEL, device=self.device)
+        f0_batch = torch.zeros((len(analyses), max_length), device=self.device)
+
+        for index, (analysis, key_shift, length) in enumerate(zip(analyses, key_shifts, lengths)):
+            mel_batch[index, :, :length] = analysis.mel[0]
+            f0_batch[index, :length] = torch.from_numpy(self.align_f0(analysis, key_shift)).float()
+
+        with torch.no_grad(), self.precision.context(self.device), self.profiler.stage("vocoder"):
+            output_audio = self.generator(mel_batch.to(self.precision.weight_dtype), f0_batch)
+
+        output_audio = output_audio.squeeze(1).float().cpu().numpy()
+
+        return [output_audio[index, :length * self.hop_length] for index, length in enumerate(lengths)]
+
+    def synthesize_many(self, analyses: typing.List[Analysis], key_shifts: typing.List[float]) -> typing.List[numpy.ndarray]:
+        outputs = []
+
+        for offset in range(0, len(analyses), self.batch_size):
+            outputs.extend(self.synthesize_batch(analyses[offset:offset + self.batch_size], key_shifts[offset:offset + self.batch_size]))
+
+        return outputs
+
+    def window_audio(self, audio: numpy.ndarray, chunk: Chunk) -> numpy.ndarray:
+        num_frames = len(audio) // self.hop_length
+        window_end = chunk.window_end * self.hop_length if chunk.window_end < num_frames else len(audio)
+
+        return audio[chunk.window_start * self.hop_length:window_end]
+
+    def overlap_add(self, output_audio: numpy.ndarray, chunk: Chunk, chunk_audio: numpy.ndarray) -> None:
+        start = (chunk.start - chunk.window_start) * self.hop_length
+        end = (chunk.end - chunk.window_start) * self.hop_length
+        window = crossfade_window(end - start, chunk.fade_in * self.hop_length, chunk.fade_out * self.hop_length)
+
+        output_audio[chunk.start * self.hop_length:chunk.end * self.hop_length] += chunk_audio[start:end] * window
+
+    def render_chunked(self, audio: numpy.ndarray, key_shifts: typing.List[float]) -> typing.Tuple[typing.List[numpy.ndarray], numpy.ndarray]:
+        num_frames = len(audio) // self.hop_length
+        chunks = plan_chunks(
+            num_frames,
+            seconds_to_frames(self.chunk_size, self.sample_rate, self.hop_length),
+            seconds_to_frames(self.chunk_overlap, self.sample_rate, self.hop_length),
+            seconds_to_frames(CONTEXT_SECONDS, self.sample_rate, self.hop_length),
+        )
+
+        loguru.logger.debug(f"Vocoding {num_frames} frames in {len(chunks)} chunk(s)")
+
+        output_audios = [numpy.zeros(num_frames * self.hop_length, dtype=numpy.float32) for _ in key_shifts]
+        f0_pieces = []
+
+        for offset in range(0, len(chunks), self.batch_size):
+            batch = chunks[offset:offset + self.batch_size]
+            analyses = self.analyze_batch([self.window_audio(audio, chunk) for chunk in batch])
+            chunk_outputs = self.synthesize_many(analyses * len(key_shifts), [key_shift for key_shift in key_shifts for _ in analyses])
+
+            for position, (chunk, analysis) in enumerate(zip(batch, analyses)):
+                for key_index, output_audio in enumerate(output_audios):
+                    self.overlap_add(output_audio, chunk, chunk_outputs[key_index * len(analyses) + position])
+
+                f0_start = round((chunk.start + chunk.fade_in - chunk.window_start) * self.hop_length / self.sample_rate * 100)
+                f0_end = round((chunk.end - chunk.window_start) * self.hop_length / self.sample_rate * 100)
+                f0_pieces.append(analysis.f0[f0_start:f0_end])
+
+        return output_audios, numpy.concatenate(f0_pieces)
+
+    @staticmethod
+    def normalize_input(audio: numpy.ndarray) -> numpy.ndarray:
+        max_amplitude = numpy.max(numpy.abs(audio))
+        if max_amplitude > 1.0:
+            audio = audio / max_amplitude
+
+        return audio
+
+    @staticmethod
+    def normalize_output(output_audio: numpy.ndarray) -> numpy.ndarray:
+        return output_audio / (numpy.max(numpy.abs(output_audio)) + 1e-5) * 0.95
+
+    def render_multi(self, audio: numpy.ndarray, key_shifts: typing.List[float]) -> typing.Tuple[typing.List[numpy.ndarray], numpy.ndarray]:
+        with self.profiler.stage("normalize"):
+            audio = self.normalize_input(audio)
+
+        if self.chunk_size:
+            output_audios, f0 = self.render_chunked(audio, key_shifts)
         else:
-            audio_16k = audio
+            analysis = self.analyze(audio)
+            output_audios, f0 = self.synthesize_many([analysis] * len(key_shifts), key_shifts), analysis.f0
+
+        with self.profiler.stage("normalize"):
+            return [self.normalize_output(output_audio) for output_audio in output_audios], f0
+
+    def render_batch(self, audios: typing.List[numpy.ndarray], key_shifts: typing.List[float], segment_size: typing.Optional[float] = None) -> typing.List[numpy.ndarray]:
+        # Independent inputs rendered together: every input is cut into windows of a common length, and the windows
+        # of all inputs go through batched RMVPE and Generator calls, grouped by length, before being crossfaded back.
+        segment_frames = seconds_to_frames(segment_size or self.chunk_size or SEGMENT_SECONDS, self.sample_rate, self.hop_length)
+        audios = [self.normalize_input(audio) for audio in audios]
+        windows = []
+
+        for index, audio in enumerate(audios):
+            num_frames = len(audio) // self.hop_length
+
+            if num_frames == 0:
+                raise ValueError(f"Audio is too short ({len(audio)} samples)")
+
+            chunks = plan_chunks(num_frames, segment_frames, seconds_to_frames(self.chunk_overlap, self.sample_rate, self.hop_length), seconds_to_frames(CONTEXT_SECONDS, self.sample_rate, self.hop_length))
+            windows.extend((index, chunk) for chunk in chunks)
+
+        output_audios = [numpy.zeros(len(audio) // self.hop_length * self.hop_length, dtype=numpy.float32) for audio in audios]
+
+        for bucket in bucket_by_length([chunk.window_end - chunk.window_start for _, chunk in windows], self.batch_size):
+            items = [windows[position] for position in bucket]
+            analyses = self.analyze_batch([self.window_audio(audios[index], chunk) for index, chunk in items])
+            chunk_outputs = self.synthesize_batch(analyses, [key_shifts[index] for index, _ in items])
+
+            for (index, chunk), chunk_audio in zip(items, chunk_outputs):
+                self.overlap_add(output_audios[index], chunk, chunk_audio)
+
+        return [self.normalize_output(output_audio) for output_audio in output_audios]
+
+    def render(self, audio: numpy.ndarray, key_shift: float) -> typing.Tuple[numpy.ndarray, numpy.ndarray]:
+        output_audios, f0 = self.render_multi(audio, [key_shift])
+
+        return output_audios[0], f0
+
+    def process_audio(self, audio: numpy.ndarray, key_shift: float,) -> numpy.ndarray:
+        output_audio, _ = self.render(audio, key_shift)
         
-        f0 = self.rmvpe.infer_from_audio(audio_16k, 16000, self.device, 0.03)
+        return output_audio
+
+    def process_audio_multi(self, audio: numpy.ndarray, key_shifts: typing.List[float]) -> typing.List[numpy.ndarray]:
+        output_audios, _ = self.render_multi(audio, key_shifts)
+
+        return output_audios
+
+    def load_audio(self, input_path: str) -> numpy.ndarray:
+        with self.profiler.stage("decode"):
+            decoded = decode_audio(input_path, self.sample_rate)
+
+        return self.conform_audio(decoded, input_path)
+
+    def load_audio_bytes(self, data: bytes, suffix: str = "") -> numpy.ndarray:
+        return self.conform_audio(decode_audio_bytes(data, self.sample_rate, suffix), f"{len(data)} bytes")
+
+    def conform_audio(self, decoded: DecodedAudio, name: str) -> numpy.ndarray:
+        audio = decoded.audio
+
+        loguru.logger.debug(f"Decoded {name} with {decoded.decoder} in {decoded.decode_time * 1000:.1f} ms ({decoded.sample_rate} Hz, {len(audio) / decoded.sample_rate:.1f}s)")
+
+        if decoded.sample_rate != self.sample_rate:
+            start = time.perf_counter()
+
+            with self.profiler.stage("resample"):
+                audio = self.resampler(torch.from_numpy(audio), decoded.sample_rate, self.sample_rate).numpy()
+
+            loguru.logger.debug(f"Resampled {decoded.sample_rate} Hz -> {self.sample_rate} Hz in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        return audio
+
+    def save_audio(self, output_path: str, audio: numpy.ndarray) -> None:
+        with self.profiler.stage("write"):
+            soundfile.write(output_path, audio, self.sample_rate)
+
+    def log_f0(self, f0: numpy.ndarray, key_shift: float) -> None:
         uv = f0 == 0
         
         if len(f0[~uv]) > 0:
@@ -99,23 +436,52 @@ class Shift:
             loguru.logger.info(f"F0 range: {f0_shift(f0_min, f0_max, key_shift)}")
             loguru.logger.info(f"F0 mean: {format_hz(f0_mean)} → {format_hz(f0_mean * (2 ** (key_shift / 12)))}")
 
-        output_audio = self.process_audio(audio, key_shift)
+    def process_file(self, input_path: str, output_path: str, key_shift: float) -> numpy.ndarray:
+        loguru.logger.info(f"Processing: {input_path}")
+        loguru.logger.info(f"Pitch shifting: {key_shift:+.1f} semitones ()")
+
+        audio = self.load_audio(input_path)
+
+        output_audio, f0 = self.render(audio, key_shift)
+        self.log_f0(f0, key_shift)
 
         loguru.logger.info(f"Saving output: {output_path}")
-        soundfile.write(output_path, output_audio, self.sample_rate)
+        self.save_audio(output_path, output_audio)
         loguru.logger.success("Process completed successfully!")
 
         return output_audio
     
     def process_file_silent(self, input_path: str, output_path: str, key_shift: float) -> numpy.ndarray:
-        audio, _ = librosa.load(input_path, sr=self.sample_rate, mono=True)
+        audio = self.load_audio(input_path)
         output_audio = self.process_audio(audio, key_shift)
-        soundfile.write(output_path, output_audio, self.sample_rate)
+        self.save_audio(output_path, output_audio)
         
         return output_audio
     
+    def process_file_multi(self, input_path: str, output_paths: typing.List[str], key_shifts: typing.List[float], silent: bool = False, audio: typing.Optional[numpy.ndarray] = None) -> typing.List[numpy.ndarray]:
+        if not silent:
+            loguru.logger.info(f"Processing: {input_path}")
+
+        # Callers that already decoded the file pass its audio in to skip a second decode.
+        if audio is None:
+            audio = self.load_audio(input_path)
+        output_audios, f0 = self.render_multi(audio, key_shifts)
+
+        for output_path, output_audio, key_shift in zip(output_paths, output_audios, key_shifts):
+            if not silent:
+                loguru.logger.info(f"Pitch shifting: {key_shift:+.1f} semitones")
+                self.log_f0(f0, key_shift)
+                loguru.logger.info(f"Saving output: {output_path}")
+
+            self.save_audio(output_path, output_audio)
+
+        return output_audios
+
     @staticmethod
-    def shift_audio(input: str, output: str, key_shift: float, nsf_hifigan: str, pitch_extractor: str = None, device: str = "cuda", sample_rate: int = 44100) -> numpy.ndarray:
-        shifter = Shift(nsf_hifigan, pitch_extractor, device, sample_rate)
+    def shift_audio(input: str, output: str, key_shift: float, nsf_hifigan: str, pitch_extractor: str = None, device: str = "cuda", sample_rate: int = 44100, chunk_size: float = None, chunk_overlap: float = 0.2, batch_size: int = 1, f0_cache: str = None, f0_cache_size: float = 1024, use_viterbi: bool = False, precision: str = "fp32", quantize: bool = False, backend: str = "torch", compile: bool = False, profile: str = None, profile_torch: bool = False) -> numpy.ndarray:
+        shifter = Shift(nsf_hifigan, pitch_extractor, device, sample_rate, chunk_size, chunk_overlap, batch_size, f0_cache, f0_cache_size, use_viterbi, precision, quantize, backend, compile)
+
+        if not profile:
+            return shifter.process_file(input, output, key_shift)
 
-        return shifter.process_file(input, output, key_shift)
+        return profile_file(shifter, input, output, key_shift, profile, profile_torch)
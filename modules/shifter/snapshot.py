@@ -0,0 +1,96 @@
+import pathlib
+import typing
+import time
+import loguru
+
+import torch
+
+from modules.nsf_hifigan.models import Generator, load_config, load_model
+from modules.rmvpe.model import E2E0
+from modules.rmvpe.inference import RMVPE
+from modules.shifter.utils import checkpoint_signature
+
+FUSED_SUFFIX = ".fused.pt"
+
+def fused_path(model_path: str) -> pathlib.Path:
+    path = pathlib.Path(model_path)
+
+    return path.with_name(path.stem + FUSED_SUFFIX)
+
+def save_snapshot(model: torch.nn.Module, model_path: str) -> pathlib.Path:
+    # Only the inference weights, as contiguous fp32 CPU tensors in torch's zip format, which torch.load can memory-map.
+    path = fused_path(model_path)
+    state_dict = {name: (tensor.float() if tensor.is_floating_point() else tensor).detach().cpu().contiguous() for name, tensor in model.state_dict().items()}
+
+    torch.save({"signature": checkpoint_signature(model_path), "state_dict": state_dict}, path)
+    loguru.logger.info(f"Saved fused model: {path}")
+
+    return path
+
+def load_snapshot(model_path: str) -> typing.Optional[typing.Dict[str, torch.Tensor]]:
+    path = fused_path(model_path)
+
+    if not path.exists():
+        loguru.logger.debug(f"No fused model found, loading the checkpoint (see --fuse_checkpoints): {model_path}")
+        return None
+
+    # The tensors stay backed by the file: pages are read on first use and shared with every other process
+    # that maps the same snapshot.
+    snapshot = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+    if snapshot.get("signature") != checkpoint_signature(model_path):
+        loguru.logger.warning(f"Fused model is older than its checkpoint, ignoring: {path}")
+        return None
+
+    return snapshot["state_dict"]
+
+def assign_weights(model: torch.nn.Module, state_dict: typing.Dict[str, torch.Tensor]) -> torch.nn.Module:
+    # `model` is built on the meta device, so no weights were allocated or initialized: assigning points its
+    # parameters at the memory-mapped tensors instead of copying them.
+    model.load_state_dict(state_dict, assign=True)
+
+    return model.eval()
+
+def load_fused_generator(model_path: str, device: str = "cpu", dtype: torch.dtype = torch.float32) -> typing.Optional[typing.Tuple[Generator, typing.Any]]:
+    state_dict = load_snapshot(model_path)
+
+    if state_dict is None:
+        return None
+
+    h = load_config(model_path)
+
+    with torch.device("meta"):
+        generator = Generator(h, fused=True)
+
+    # Moving to the CPU in fp32 is a no-op, other devices and dtypes copy the weights.
+    return assign_weights(generator, state_dict).to(device, dtype), h
+
+def load_fused_rmvpe(model_path: str) -> typing.Optional[E2E0]:
+    state_dict = load_snapshot(model_path)
+
+    if state_dict is None:
+        return None
+
+    with torch.device("meta"):
+        model = E2E0(4, 1, (2, 2))
+
+    return assign_weights(model, state_dict)
+
+def fuse_checkpoints(nsf_hifigan: str, pitch_extractor: str) -> typing.Dict[str, float]:
+    # Loads the training checkpoints the slow way once, then stores the fused weights for every later start.
+    start = time.perf_counter()
+    generator, _ = load_model(nsf_hifigan, device="cpu")
+    rmvpe = RMVPE(pitch_extractor, hop_length=160)
+    load_time = time.perf_counter() - start
+
+    save_snapshot(generator, nsf_hifigan)
+    save_snapshot(rmvpe.model, pitch_extractor)
+
+    start = time.perf_counter()
+    load_fused_generator(nsf_hifigan)
+    load_fused_rmvpe(pitch_extractor)
+    fused_load_time = time.perf_counter() - start
+
+    loguru.logger.info(f"Model loading: {load_time * 1000:.0f} ms (checkpoints) → {fused_load_time * 1000:.0f} ms (fused)")
+
+    return {"load_time": load_time, "fused_load_time": fused_load_time}
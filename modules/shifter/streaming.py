@@ -0,0 +1,174 @@
+import typing
+import time
+import loguru
+
+import torch
+import numpy
+
+from modules.nsf_hifigan.models import VocoderState
+from modules.shifter.shift import Shift, F0_THRESHOLD
+
+F0_CONTEXT_SECONDS = 0.25
+F0_LOOKAHEAD_FRAMES = 4
+
+def vocoder_latency(config, source_lag: int = 0) -> int:
+    # Number of samples the streamed vocoder output trails its mel input by, when the excitation trails the mel by
+    # `source_lag` samples: walked from conv_pre through every transposed convolution, excitation convolution and
+    # resblock stack to conv_post, each only computing the outputs that all of its inputs have arrived for.
+    def conv(lag: int, kernel_size: int, dilation: int = 1) -> int:
+        return lag + (kernel_size - 1) * dilation // 2
+
+    def resblock(lag: int, kernel_size: int, dilations: typing.List[int]) -> int:
+        # ResBlock1 follows every dilated convolution with an undilated one, ResBlock2 does not.
+        for dilation in dilations:
+            lag = conv(conv(lag, kernel_size, dilation), kernel_size) if config.resblock == "1" else conv(lag, kernel_size, dilation)
+
+        return lag
+
+    lag = conv(0, 7)
+    for index, (rate, kernel_size) in enumerate(zip(config.upsample_rates, config.upsample_kernel_sizes)):
+        lag = lag * rate + (kernel_size - rate) // 2
+
+        # The excitation convolution of every stage but the last downsamples the excitation to the rate of the stage.
+        stride = int(numpy.prod(config.upsample_rates[index + 1:]))
+        source_kernel_size, source_padding = (stride * 2, stride // 2) if index + 1 < len(config.upsample_rates) else (1, 0)
+        source = -(-(source_lag - source_padding + source_kernel_size) // stride) - 1
+
+        lag = max(resblock(max(lag, source), k, d) for k, d in zip(config.resblock_kernel_sizes, config.resblock_dilation_sizes))
+
+    return conv(lag, 7)
+
+class StreamingShift:
+    # Frames go through three stages: a mel frame exists once the STFT window after it has arrived and goes to the
+    # vocoder right away, its F0 and excitation are committed once `lookahead_frames` more mel frames exist, and the
+    # vocoder keeps the inputs every convolution still needs between blocks (VocoderState), so that each block only
+    # vocodes its new frames and the output continues the previous blocks exactly as a whole-file render would.
+    # RMVPE runs on the frames to commit, with `f0_context` seconds before them and the lookahead frames after them,
+    # so only the pitch curve differs from a whole-file render, and less so with a longer lookahead.
+    # Output is delayed by a fixed `latency` (in samples): the STFT window plus how far the vocoder output trails it.
+    def __init__(self, shifter: Shift, key_shift: float = 0.0, lookahead_frames: int = F0_LOOKAHEAD_FRAMES, f0_context: float = F0_CONTEXT_SECONDS, seed: typing.Optional[int] = None):
+        if shifter.backend != "torch":
+            raise ValueError("Streaming keeps the state of every vocoder layer, which needs the torch backend")
+
+        self.shifter = shifter
+        self.key_shift = key_shift
+        self.lookahead_frames = max(0, lookahead_frames)
+        self.hop_length = shifter.hop_length
+        self.f0_context_frames = int(round(f0_context * shifter.sample_rate / self.hop_length))
+
+        mel_extractor = shifter.mel_extractor
+        self.mel_padding = mel_extractor.padding
+        self.mel_lookahead = mel_extractor.num_fft - mel_extractor.padding
+
+        self.latency = self.mel_lookahead + vocoder_latency(shifter.config, self.lookahead_frames * self.hop_length)
+        self.seed = seed
+
+        self.reset()
+
+        loguru.logger.info(f"Streaming latency: {self.latency} samples ({self.latency_seconds * 1000:.1f} ms)")
+
+    @property
+    def latency_seconds(self) -> float:
+        return self.latency / self.shifter.sample_rate
+
+    def reset(self) -> None:
+        # The input starts with `mel_padding` samples of silence so that the first mel frames have a full window.
+        self.input = numpy.zeros(self.mel_padding, dtype=numpy.float32)
+        self.input_start = -self.mel_padding
+        self.received = 0
+
+        self.frames = 0
+        self.emitted = 0
+
+        self.state = self.shifter.generator.initial_state(1, self.shifter.device, self.seed)
+        self.vocoder_state = VocoderState()
+        self.output = numpy.zeros(self.latency, dtype=numpy.float32)
+        self.step_times = []
+
+    def samples(self, start: int, end: int) -> numpy.ndarray:
+        return self.input[start - self.input_start:end - self.input_start]
+
+    def available_frames(self) -> int:
+        if self.received < self.mel_lookahead:
+            return 0
+
+        return (self.received - self.mel_lookahead) // self.hop_length + 1
+
+    def extract_mel(self, end: int) -> torch.Tensor:
+        audio = torch.from_numpy(self.samples(self.frames * self.hop_length - self.mel_padding, (end - 1) * self.hop_length + self.mel_lookahead)).float()
+
+        return self.shifter.mel_extractor(audio.unsqueeze(0).to(self.shifter.device), pad=False)
+
+    def extract_f0(self, commit: int, end: int) -> numpy.ndarray:
+        # RMVPE only sees the frames to commit with a fixed context before them and the lookahead frames after them.
+        start = max(0, self.emitted - self.f0_context_frames)
+        audio = torch.from_numpy(self.samples(start * self.hop_length, end * self.hop_length)).float().to(self.shifter.device)
+        audio_16k = self.shifter.resampler(audio, self.shifter.sample_rate, 16000)
+
+        if self.shifter.rmvpe is not None:
+            f0 = self.shifter.rmvpe.infer_from_audio(audio_16k, 16000, self.shifter.device, F0_THRESHOLD, self.shifter.use_viterbi)
+        else:
+            f0 = numpy.zeros(len(audio_16k) // 160 + 1, dtype=numpy.float32)
+
+        f0_shifted = self.shifter.interpolate_f0(f0, f0 == 0, end - start, self.key_shift)
+
+        return f0_shifted[self.emitted - start:commit - start]
+
+    def step(self, end: int) -> numpy.ndarray:
+        generator = self.shifter.generator
+        weight_dtype = self.shifter.precision.weight_dtype
+        commit = max(self.emitted, end - self.lookahead_frames)
+
+        mel = self.extract_mel(end)
+        f0 = self.extract_f0(commit, end) if commit > self.emitted else numpy.zeros(0, dtype=numpy.float32)
+        f0 = torch.from_numpy(f0).float().unsqueeze(0).to(self.shifter.device)
+
+        with torch.no_grad(), self.shifter.precision.context(self.shifter.device):
+            source, self.state = generator.m_source(f0, generator.upp, self.state)
+            audio = generator.vocode_step(mel.to(weight_dtype), source.transpose(1, 2).to(weight_dtype), self.vocoder_state)
+
+        self.frames = end
+        self.emitted = commit
+        self.trim()
+
+        return audio.reshape(-1).float().cpu().numpy()
+
+    def trim(self) -> None:
+        # Keep the samples the next mel frames and the next F0 window will need.
+        input_start = min(self.frames * self.hop_length - self.mel_padding, max(0, self.emitted - self.f0_context_frames) * self.hop_length)
+        if input_start > self.input_start:
+            self.input = self.input[input_start - self.input_start:]
+            self.input_start = input_start
+
+    def process(self, block: numpy.ndarray) -> numpy.ndarray:
+        # Returns as many samples as it is given, delayed by `latency` samples.
+        self.input = numpy.concatenate([self.input, numpy.asarray(block, dtype=numpy.float32)])
+        self.received += len(block)
+
+        end = self.available_frames()
+
+        if end > self.frames:
+            start = time.perf_counter()
+            self.output = numpy.concatenate([self.output, self.step(end)])
+            self.step_times.append(time.perf_counter() - start)
+
+        output, self.output = self.output[:len(block)], self.output[len(block):]
+
+        return output
+
+    def flush(self) -> numpy.ndarray:
+        # Pushes silence through the pipeline to return the last `latency` samples of the stream.
+        return self.process(numpy.zeros(self.latency, dtype=numpy.float32))
+
+    def stats(self) -> typing.Dict[str, float]:
+        step_times = numpy.array(self.step_times) if self.step_times else numpy.zeros(1)
+        rendered = self.emitted * self.hop_length / self.shifter.sample_rate
+
+        return {
+            "latency_ms": self.latency_seconds * 1000,
+            "steps": len(self.step_times),
+            "step_mean_ms": float(step_times.mean() * 1000),
+            "step_max_ms": float(step_times.max() * 1000),
+            # Processing time per second of rendered audio, the stream keeps up with its input only below 1.
+            "realtime_factor": float(step_times.sum() / rendered) if rendered else 0.0,
+        }
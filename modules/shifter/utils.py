@@ -1,3 +1,7 @@
+import pathlib
+import typing
+import math
+
 import numpy
 
 NOTE_NAMES = [
@@ -119,3 +123,47 @@ def shift_suffix(key_shift: float) -> str:
         return f"_{int(key_shift)}x"
     else:
         return f"_{key_shift}x"
+
+def parse_key_shifts(value: str) -> typing.List[float]:
+    if ":" not in value:
+        return [float(value)]
+    
+    parts = value.split(":")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Expected <start>:<stop>[:<step>], got '{value}'")
+    
+    start, stop = float(parts[0]), float(parts[1])
+    step = abs(float(parts[2])) if len(parts) == 3 else 1.0
+
+    if step == 0:
+        raise ValueError(f"Key shift step must not be zero: '{value}'")
+    
+    if stop < start:
+        step = -step
+
+    # The range stops at the last whole step, never past `stop` (the epsilon absorbs float error like 0:0.3:0.1).
+    count = math.floor((stop - start) / step + 1e-9) + 1
+
+    return [round(start + index * step, 6) for index in range(count)]
+
+def join_key_shift(argv: typing.List[str]) -> typing.List[str]:
+    # argparse only accepts values starting with "-" when they look like plain negative numbers, so a range such as
+    # "--key_shift -12:12:1" would be read as an unknown flag; joining it into "--key_shift=-12:12:1" keeps it a value.
+    joined = []
+    index = 0
+
+    while index < len(argv):
+        if argv[index] == "--key_shift" and index + 1 < len(argv) and argv[index + 1].startswith("-"):
+            joined.append(f"--key_shift={argv[index + 1]}")
+            index += 2
+        else:
+            joined.append(argv[index])
+            index += 1
+
+    return joined
+
+def checkpoint_signature(model_path: str) -> str:
+    # Size and modification time of a checkpoint, stored with everything derived from it to detect a replaced checkpoint.
+    stat = pathlib.Path(model_path).stat()
+
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
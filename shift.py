@@ -3,9 +3,8 @@ import sys
 import pathlib
 import loguru
 
-import torch
-
-from modules.shifter import Shift, BatchProcessor
+# torch and the models are imported by main() once the arguments are validated, so --help and usage errors stay fast
+from modules.shifter.client import DEFAULT_HOST, DEFAULT_PORT, ShiftClient, server_url
 from modules.shifter.utils import *
 
 DEFAULT = {
@@ -13,6 +12,9 @@ DEFAULT = {
     "rmvpe": "checkpoints/rmvpe/model.pt"
 }
 
+# A running server renders with the options it was started with and neither profiles nor checks a request, so these only take effect locally
+LOCAL_OPTIONS = ["device", "chunk_size", "chunk_overlap", "batch_size", "f0_cache", "f0_cache_size", "viterbi", "precision", "quantize", "backend", "compile", "check_precision", "profile", "profile_torch"]
+
 def setup_logger(verbose: bool = False, quiet: bool = False):
     loguru.logger.remove()
 
@@ -27,10 +29,11 @@ def setup_logger(verbose: bool = False, quiet: bool = False):
 
 def parse_arguments():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input", type=str, required=True)
-    parser.add_argument("--output", type=str, required=True)
-    parser.add_argument("--key_shift", type=float, required=True)
-    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu", choices=["cuda", "cpu"])
+    parser.add_argument("command", nargs="?", choices=["serve"])
+    parser.add_argument("--input", type=str)
+    parser.add_argument("--output", type=str)
+    parser.add_argument("--key_shift", type=parse_key_shifts)
+    parser.add_argument("--device", type=str, default=None, choices=["cuda", "cpu"])
     parser.add_argument("--recursive", action="store_true")
     parser.add_argument("--overwrite", action="store_true")
     parser.add_argument("--format", type=str, default="wav", choices=["wav", "flac", "mp3"])
@@ -38,8 +41,49 @@ def parse_arguments():
     parser.add_argument("--quiet", action="store_true")
     parser.add_argument("--silent", action="store_true", required=False)
     parser.add_argument("--add_suffix", action="store_true")
+    parser.add_argument("--chunk_size", type=float, default=None)
+    parser.add_argument("--chunk_overlap", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--prefetch", type=int, default=0)
+    parser.add_argument("--batch_size", type=int, default=None)
+    parser.add_argument("--f0_cache", type=str, default=None)
+    parser.add_argument("--f0_cache_size", type=float, default=1024)
+    parser.add_argument("--viterbi", action="store_true")
+    parser.add_argument("--precision", type=str, default="fp32", choices=["fp32", "bf16", "fp16"])
+    parser.add_argument("--check_precision", action="store_true")
+    parser.add_argument("--quantize", action="store_true", help="int8 RMVPE on CPU, the vocoder stays fp32")
+    parser.add_argument("--calibrate", type=str, default=None)
+    parser.add_argument("--backend", type=str, default="torch", choices=["torch", "onnx"])
+    parser.add_argument("--export_onnx", action="store_true")
+    parser.add_argument("--fuse_checkpoints", action="store_true")
+    parser.add_argument("--profile", type=str, default=None)
+    parser.add_argument("--profile_torch", action="store_true")
+    parser.add_argument("--report", type=str, default=None)
+    parser.add_argument("--compile", action="store_true")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max_delay", type=float, default=5.0)
+    parser.add_argument("--max_batch", type=int, default=8)
+    parser.add_argument("--server", type=str, default=server_url())
+
+    arguments = parser.parse_args(join_key_shift(sys.argv[1:]))
+
+    # Serving, calibration and export only need the models (and a few WAV files)
+    if arguments.command is None and arguments.calibrate is None and not arguments.export_onnx and not arguments.fuse_checkpoints and None in (arguments.input, arguments.output, arguments.key_shift):
+        parser.error("the following arguments are required: --input, --output, --key_shift")
+
+    arguments.local_options = [name for name in LOCAL_OPTIONS if getattr(arguments, name) != parser.get_default(name)]
+
+    # The server vocodes the windows of a micro-batch together, so its vocoder batch follows --max_batch by default
+    if arguments.batch_size is None:
+        arguments.batch_size = arguments.max_batch if arguments.command == "serve" else 1
+
+    return arguments
 
-    return parser.parse_args()
+def default_device() -> str:
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
 
 def validate_paths(arguments) -> bool:
     if not pathlib.Path(arguments.input).exists():
@@ -47,6 +91,9 @@ def validate_paths(arguments) -> bool:
         
         return False
     
+    return validate_models()
+
+def validate_models() -> bool:
     if not pathlib.Path(DEFAULT["nsf_hifigan"]).exists():
         loguru.logger.error(f"NSF HiFiGAN model not found: {DEFAULT['nsf_hifigan']}")
         loguru.logger.info("Please download vocoder and place it in checkpoints/nsf_hifigan/")
@@ -79,26 +126,117 @@ def main():
     loguru.logger.info("v2")
     loguru.logger.info("=====================")
 
+    if arguments.calibrate:
+        if not validate_models():
+            return 1
+
+        from modules.shifter.quantize import calibrate
+
+        calibrate(arguments.calibrate, DEFAULT["nsf_hifigan"], DEFAULT["rmvpe"])
+
+        return 0
+
+    if arguments.export_onnx:
+        if not validate_models():
+            return 1
+
+        from modules.shifter.onnx_backend import export_onnx
+
+        export_onnx(DEFAULT["nsf_hifigan"], DEFAULT["rmvpe"])
+
+        return 0
+
+    if arguments.fuse_checkpoints:
+        if not validate_models():
+            return 1
+
+        from modules.shifter.snapshot import fuse_checkpoints
+
+        fuse_checkpoints(DEFAULT["nsf_hifigan"], DEFAULT["rmvpe"])
+
+        return 0
+
+    if arguments.command == "serve":
+        if not validate_models():
+            return 1
+
+        from modules.shifter import Shift
+        from modules.shifter.server import serve
+
+        shifter = Shift(DEFAULT["nsf_hifigan"], DEFAULT["rmvpe"], arguments.device or default_device(), 44100, arguments.chunk_size, arguments.chunk_overlap, arguments.batch_size, arguments.f0_cache, arguments.f0_cache_size, arguments.viterbi, arguments.precision, arguments.quantize, arguments.backend, arguments.compile)
+
+        try:
+            serve(shifter, arguments.host, arguments.port, arguments.max_delay / 1000, max_batch=arguments.max_batch)
+        except KeyboardInterrupt:
+            loguru.logger.warning("Server stopped")
+
+        return 0
+
+    single_file = not pathlib.Path(arguments.input).is_dir() and not pathlib.Path(arguments.output).is_dir() and len(arguments.key_shift) == 1
+
+    if single_file and arguments.report:
+        loguru.logger.warning("--report covers folder and multi-key runs, ignoring it for a single file")
+
+    use_server = arguments.server and single_file
+
+    if use_server and arguments.local_options:
+        options = ", ".join(f"--{name}" for name in arguments.local_options)
+        loguru.logger.warning(f"The server at {arguments.server} ignores {options}, processing locally instead")
+
+        use_server = False
+
+    if use_server:
+        # A running server already has the models loaded, so nothing is loaded here.
+        if not pathlib.Path(arguments.input).exists():
+            loguru.logger.error(f"Input not found: {arguments.input}")
+
+            return 1
+
+        try:
+            ShiftClient(arguments.server).process_file(arguments.input, arguments.output, arguments.key_shift[0])
+        except Exception as e:
+            loguru.logger.error(f"Fatal error: {e}")
+
+            return 1
+
+        return 0
+
     if not validate_paths(arguments):
         return 1
+
+    from modules.shifter import Shift, BatchProcessor
+
+    arguments.device = arguments.device or default_device()
     
     input_path = pathlib.Path(arguments.input)
     output_path = pathlib.Path(arguments.output)
 
     try:
-        is_batch = input_path.is_dir() or (input_path.is_file() and output_path.is_dir())
+        is_batch = input_path.is_dir() or (input_path.is_file() and output_path.is_dir()) or len(arguments.key_shift) > 1
 
         if is_batch:
             loguru.logger.info("Selected mode: Batch")
 
-            if arguments.add_suffix:
-                suffix = shift_suffix(arguments.key_shift)
-
             processor = BatchProcessor(
                 nsf_hifigan=DEFAULT["nsf_hifigan"],
                 pitch_extractor=DEFAULT["rmvpe"],
-                device="cuda" if torch.cuda.is_available() else "cpu",
+                device=arguments.device,
                 sample_rate=44100,
+                chunk_size=arguments.chunk_size,
+                chunk_overlap=arguments.chunk_overlap,
+                workers=arguments.workers,
+                prefetch=arguments.prefetch,
+                batch_size=arguments.batch_size,
+                f0_cache=arguments.f0_cache,
+                f0_cache_size=arguments.f0_cache_size,
+                use_viterbi=arguments.viterbi,
+                precision=arguments.precision,
+                quantize=arguments.quantize,
+                backend=arguments.backend,
+                compile=arguments.compile,
+                profile=arguments.profile,
+                profile_torch=arguments.profile_torch,
+                report=arguments.report,
             )
 
             results = processor.process(
@@ -119,15 +257,23 @@ def main():
         else:
             loguru.logger.info("Selected mode: Single")
 
-            Shift.shift_audio(
-                input=str(input_path),
-                output=str(output_path),
-                key_shift=arguments.key_shift,
-                nsf_hifigan=DEFAULT["nsf_hifigan"],
-                pitch_extractor=DEFAULT["rmvpe"],
-                device=arguments.device,
-                sample_rate=44100,
-            )
+            shifter = Shift(DEFAULT["nsf_hifigan"], DEFAULT["rmvpe"], arguments.device, 44100, arguments.chunk_size, arguments.chunk_overlap, arguments.batch_size, arguments.f0_cache, arguments.f0_cache_size, arguments.viterbi, arguments.precision, arguments.quantize, arguments.backend, arguments.compile)
+
+            if arguments.check_precision:
+                from modules.shifter.precision import check_precision
+
+                # Only the fp32 reference is loaded on top of the models that process the file.
+                reference = Shift(DEFAULT["nsf_hifigan"], DEFAULT["rmvpe"], arguments.device, 44100, use_viterbi=arguments.viterbi)
+                check_precision(shifter, reference, str(input_path), arguments.key_shift[0])
+
+                del reference
+
+            if arguments.profile:
+                from modules.shifter.profiler import profile_file
+
+                profile_file(shifter, str(input_path), str(output_path), arguments.key_shift[0], arguments.profile, arguments.profile_torch)
+            else:
+                shifter.process_file(str(input_path), str(output_path), arguments.key_shift[0])
 
         return 0
     
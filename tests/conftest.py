@@ -0,0 +1,20 @@
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import pytest
+
+from benchmarks.fixtures import random_checkpoints
+
+@pytest.fixture(scope="session")
+def checkpoints(tmp_path_factory):
+    # Randomly initialized weights of the real architectures, so the tests need no downloaded checkpoints.
+    return random_checkpoints(str(tmp_path_factory.mktemp("checkpoints")))
+
+@pytest.fixture(scope="session")
+def shifter(checkpoints):
+    from modules.shifter import Shift
+
+    return Shift(*checkpoints, "cpu")
@@ -0,0 +1,83 @@
+import numpy
+import pytest
+import soundfile
+
+from benchmarks.fixtures import remove_excitation_noise, synthetic_audio
+from modules.shifter import batch
+from modules.shifter.batch import BatchProcessor, Status
+
+KEY_SHIFTS = [0.0, 3.0]
+
+@pytest.fixture(scope="module")
+def inputs(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("inputs")
+
+    for signal, duration in (("vocal", 1.0), ("sweep", 1.5), ("noise", 0.7)):
+        soundfile.write(str(directory / f"{signal}.wav"), synthetic_audio(signal, duration), 44100)
+
+    # Not a WAV file at all, so decoding fails for this one and the others still have to complete.
+    (directory / "broken.wav").write_bytes(b"RIFF\x10\x00\x00\x00WAVEjunk" + bytes(64))
+
+    return directory
+
+def run(checkpoints, inputs, output, **options):
+    processor = BatchProcessor(*checkpoints, "cpu", **options)
+    remove_excitation_noise(processor.shifter.generator)
+
+    results = processor.process(str(inputs), str(output), KEY_SHIFTS)
+    statuses = {(result.input_path.name, result.output_path.name): result.status for result in results}
+    outputs = {path.name: soundfile.read(str(path))[0] for path in sorted(output.glob("*.wav"))}
+
+    return statuses, outputs
+
+@pytest.fixture(scope="module")
+def sequential(checkpoints, inputs, tmp_path_factory):
+    return run(checkpoints, inputs, tmp_path_factory.mktemp("sequential"))
+
+def test_sequential_run_fails_only_the_broken_file(sequential):
+    statuses, outputs = sequential
+
+    assert len(statuses) == 4 * len(KEY_SHIFTS)
+    assert {name for (name, _), status in statuses.items() if status == Status.FAILED} == {"broken.wav"}
+    assert len(outputs) == 3 * len(KEY_SHIFTS)
+
+@pytest.mark.parametrize("options", [{"workers": 2}, {"prefetch": 2}], ids=["workers", "prefetch"])
+def test_matches_sequential_run(checkpoints, inputs, tmp_path, sequential, options):
+    statuses, outputs = run(checkpoints, inputs, tmp_path, **options)
+
+    assert statuses == sequential[0]
+    assert outputs.keys() == sequential[1].keys()
+
+    for name, output in outputs.items():
+        numpy.testing.assert_allclose(output, sequential[1][name], atol=1e-4, err_msg=name)
+
+def test_batched_run_decodes_long_files_once(checkpoints, inputs, tmp_path):
+    # With chunk_size below every file's length, all of them leave the batch and are rendered in chunks.
+    processor = BatchProcessor(*checkpoints, "cpu", batch_size=2, chunk_size=0.5)
+    load_audio = processor.shifter.load_audio
+    decoded = []
+    processor.shifter.load_audio = lambda path: decoded.append(path) or load_audio(path)
+
+    results = processor.process(str(inputs), str(tmp_path), KEY_SHIFTS)
+
+    assert sorted(decoded) == sorted(str(path) for path in inputs.glob("*.wav"))
+    assert sum(result.status == Status.SUCCESS for result in results) == 3 * len(KEY_SHIFTS)
+
+@pytest.mark.parametrize("options, tracked", [
+    ({}, False),
+    ({"prefetch": 2}, False),
+    ({"batch_size": 2}, False),
+    ({"report": "report.json"}, True),
+    ({"batch_size": 2, "report": "report.json"}, True),
+], ids=["sequential", "prefetch", "batched", "report", "batched-report"])
+def test_peak_rss_is_only_reset_for_a_profile_or_report(checkpoints, inputs, tmp_path, monkeypatch, options, tracked):
+    marks = []
+    monkeypatch.setattr(batch, "mark_peak_rss", lambda: marks.append(True))
+
+    if "report" in options:
+        options["report"] = str(tmp_path / options["report"])
+
+    results = BatchProcessor(*checkpoints, "cpu", **options).process(str(inputs), str(tmp_path / "output"), KEY_SHIFTS)
+
+    assert bool(marks) == tracked
+    assert all(result.peak_rss_mb > 0 for result in results if result.status == Status.SUCCESS)
@@ -0,0 +1,71 @@
+import numpy
+import pytest
+import torch
+
+from benchmarks.fixtures import remove_excitation_noise, synthetic_audio
+from modules.shifter import Shift
+from modules.shifter.bucket import bucket_by_length
+from modules.shifter.shift import Analysis
+
+# Frames at the end of a shorter item that see the padding through the vocoder's receptive field.
+PADDED_TAIL_FRAMES = 8
+
+@pytest.fixture
+def deterministic_shifter(checkpoints):
+    shifter = Shift(*checkpoints, "cpu")
+    remove_excitation_noise(shifter.generator)
+
+    return shifter
+
+def voiced_analysis(shifter: Shift, frames: int, seed: int) -> Analysis:
+    mel = torch.randn(1, shifter.config.num_mels, frames, generator=torch.Generator().manual_seed(seed)) - 5
+    f0 = numpy.full(frames * shifter.hop_length * 100 // shifter.sample_rate + 1, 220.0)
+
+    return Analysis(audio_16k=None, mel=mel, f0=f0, uv=f0 == 0)
+
+@pytest.mark.parametrize("lengths, batch_size, expected", [
+    ([100, 95, 50, 48, 47], 8, [[0, 1], [2, 3, 4]]),
+    ([100, 95, 92, 91], 2, [[0, 1], [2, 3]]),
+    ([], 4, []),
+])
+def test_bucket_by_length(lengths, batch_size, expected):
+    assert bucket_by_length(lengths, batch_size) == expected
+
+def test_synthesize_batch_matches_single(deterministic_shifter):
+    shifter = deterministic_shifter
+    analyses = [voiced_analysis(shifter, frames, seed) for seed, frames in enumerate((64, 40, 52))]
+    key_shifts = [0.0, 3.0, -2.0]
+
+    singles = [shifter.synthesize(analysis, key_shift) for analysis, key_shift in zip(analyses, key_shifts)]
+    batched = shifter.synthesize_batch(analyses, key_shifts)
+
+    for analysis, single, output in zip(analyses, singles, batched):
+        assert len(output) == analysis.mel.shape[-1] * shifter.hop_length
+
+        # Padding only reaches the last frames of the shorter items, the longest one is untouched.
+        end = len(single) if analysis.mel.shape[-1] == 64 else len(single) - PADDED_TAIL_FRAMES * shifter.hop_length
+        numpy.testing.assert_allclose(output[:end], single[:end], atol=1e-5)
+
+def audio_16k(shifter: Shift, signal: str, duration: float) -> torch.Tensor:
+    return shifter.resampler(torch.from_numpy(synthetic_audio(signal, duration, shifter.sample_rate)), shifter.sample_rate, 16000)
+
+def test_rmvpe_batch_matches_single(shifter):
+    # Inputs shorter than a segment are padded to a common length and run in one batch, which must not change their F0.
+    audios = [audio_16k(shifter, "vocal", 1.0), audio_16k(shifter, "sweep", 0.7), audio_16k(shifter, "noise", 1.3)]
+    batched = shifter.rmvpe.infer_batch(audios, 16000, shifter.device, batch_size=3)
+
+    for audio, f0 in zip(audios, batched):
+        numpy.testing.assert_allclose(f0, shifter.rmvpe.infer_from_audio(audio, 16000, shifter.device), rtol=1e-5)
+
+def test_rmvpe_batch_runs_long_inputs_whole(shifter, monkeypatch):
+    # Compared on the salience, before decoding, since the argmax of random weights jumps between near-equal bins.
+    # A long input must come out exactly as on its own, whichever short inputs share its call.
+    rmvpe = shifter.rmvpe
+    monkeypatch.setattr(rmvpe, "decode", lambda hidden, thred=0.03, use_viterbi=False: hidden)
+
+    audios = [audio_16k(shifter, "vocal", 4.0), audio_16k(shifter, "sweep", 1.0)]
+    batched = rmvpe.infer_batch(audios, 16000, shifter.device, max_batch_frames=256)
+
+    for audio, hidden in zip(audios, batched):
+        whole = rmvpe.mel2hidden(rmvpe.mel_extractor(audio.unsqueeze(0), center=True))
+        torch.testing.assert_close(hidden, whole, atol=1e-5, rtol=0)
@@ -0,0 +1,50 @@
+import numpy
+import pytest
+
+from modules.shifter.chunk import crossfade_window, plan_chunks
+from modules.shifter.shift import Analysis
+
+@pytest.mark.parametrize("num_frames", [1, 50, 100, 101, 437])
+def test_plan_chunks_covers_every_frame(num_frames):
+    chunks = plan_chunks(num_frames, 100, 20, 30)
+
+    assert chunks[0].start == 0 and chunks[-1].end == num_frames
+    assert chunks[0].fade_in == 0 and chunks[-1].fade_out == 0
+
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.end - chunk.start == chunk.fade_in == previous.fade_out
+
+    for chunk in chunks:
+        assert max(0, chunk.start - 30) == chunk.window_start and chunk.window_end == min(num_frames, chunk.end + 30)
+
+def test_plan_chunks_rejects_overlap_larger_than_chunk():
+    with pytest.raises(ValueError):
+        plan_chunks(100, 20, 20, 0)
+
+def test_crossfades_sum_to_one():
+    fade_out = crossfade_window(64, 0, 16)[-16:]
+    fade_in = crossfade_window(64, 16, 0)[:16]
+
+    numpy.testing.assert_allclose(fade_out + fade_in, 1, atol=1e-6)
+
+def test_render_chunked_reconstructs_identity(shifter, monkeypatch):
+    # With analysis and synthesis replaced by the identity (the window audio is carried in the analysis), overlap-add
+    # of the chunk windows must give back the input, for every key and across batches of chunks.
+    def analyze_batch(audios):
+        return [Analysis(audio_16k=audio, mel=None, f0=numpy.zeros(len(audio) * 100 // shifter.sample_rate + 1), uv=None) for audio in audios]
+
+    def synthesize_many(analyses, key_shifts):
+        return [analysis.audio_16k * (1 + key_shift) for analysis, key_shift in zip(analyses, key_shifts)]
+
+    monkeypatch.setattr(shifter, "chunk_size", 1.0)
+    monkeypatch.setattr(shifter, "batch_size", 2)
+    monkeypatch.setattr(shifter, "analyze_batch", analyze_batch)
+    monkeypatch.setattr(shifter, "synthesize_many", synthesize_many)
+
+    audio = numpy.random.default_rng(0).standard_normal(int(4.3 * shifter.sample_rate)).astype(numpy.float32)
+    outputs, f0 = shifter.render_chunked(audio, [0, 1])
+    expected = audio[:len(audio) // shifter.hop_length * shifter.hop_length]
+
+    numpy.testing.assert_allclose(outputs[0], expected, atol=1e-5)
+    numpy.testing.assert_allclose(outputs[1], 2 * expected, atol=1e-5)
+    assert abs(len(f0) - len(audio) * 100 // shifter.sample_rate) <= 6
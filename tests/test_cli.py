@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+import pytest
+
+import shift
+
+from conftest import ROOT
+
+# Parses the arguments in a fresh interpreter, since the test process has imported torch already.
+PARSE_AND_LIST_MODULES = """
+import sys
+sys.argv = ["shift.py", *sys.argv[1:]]
+import shift
+try:
+    shift.parse_arguments()
+except SystemExit:
+    pass
+print(" ".join(sorted(sys.modules)))
+"""
+
+@pytest.mark.parametrize("key_shift", [["--key_shift", "-12:12:1"], ["--key_shift=-12:12:1"]], ids=["space", "equals"])
+def test_negative_key_shift_range(monkeypatch, key_shift):
+    monkeypatch.setattr(sys, "argv", ["shift.py", "--input", "in.wav", "--output", "out.wav", *key_shift])
+
+    assert shift.parse_arguments().key_shift == [float(key) for key in range(-12, 13)]
+
+def test_negative_key_shift(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["shift.py", "--key_shift", "-3", "--input", "in.wav", "--output", "out.wav"])
+
+    assert shift.parse_arguments().key_shift == [-3.0]
+
+@pytest.mark.parametrize("arguments", [["--help"], ["--input", "in.wav"]], ids=["help", "usage-error"])
+def test_parsing_does_not_import_torch(arguments):
+    result = subprocess.run([sys.executable, "-c", PARSE_AND_LIST_MODULES, *arguments], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    modules = result.stdout.splitlines()[-1].split()
+
+    assert "shift" in modules
+    assert "torch" not in modules and "modules.shifter.shift" not in modules
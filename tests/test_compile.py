@@ -0,0 +1,49 @@
+import numpy
+import pytest
+import torch
+
+from benchmarks.fixtures import TINY_NSF_HIFIGAN_CONFIG, random_checkpoints, remove_excitation_noise, synthetic_audio
+from modules.shifter import Shift
+from modules.shifter.quantize import calibrate_rmvpe, calibration_segments, save_quantized_rmvpe
+
+def inductor_available() -> bool:
+    # Inductor needs a working C++ toolchain on CPU, which only shows when something is actually compiled.
+    try:
+        torch.compile(lambda tensor: tensor + 1)(torch.zeros(1))
+    except Exception:
+        return False
+
+    return True
+
+pytestmark = pytest.mark.skipif(not inductor_available(), reason="torch.compile (inductor) is unavailable")
+
+@pytest.fixture(scope="module")
+def tiny_checkpoints(tmp_path_factory):
+    nsf_hifigan, rmvpe = random_checkpoints(str(tmp_path_factory.mktemp("tiny")), config=TINY_NSF_HIFIGAN_CONFIG)
+
+    # A calibrated int8 RMVPE is a TorchScript module, which --compile leaves alone, so only the vocoder is compiled
+    # here: compiling the fp32 RMVPE takes minutes on a small CPU and goes through the same torch.compile call.
+    reference = Shift(nsf_hifigan, rmvpe, "cpu")
+    audio_16k = reference.resampler(torch.from_numpy(synthetic_audio("vocal", 1.0)), reference.sample_rate, 16000)
+    save_quantized_rmvpe(calibrate_rmvpe(reference.rmvpe.model, calibration_segments(reference.rmvpe.mel_extractor(audio_16k.unsqueeze(0), center=True))), rmvpe)
+
+    return nsf_hifigan, rmvpe
+
+def render(shifter, audio):
+    remove_excitation_noise(shifter.generator)
+    torch.manual_seed(0)
+
+    return shifter.process_audio(audio, 3.0)
+
+def test_compiled_render_matches_eager(tiny_checkpoints):
+    audio = synthetic_audio("vocal", 1.0)
+
+    eager = render(Shift(*tiny_checkpoints, "cpu", quantize=True), audio)
+    compiled = Shift(*tiny_checkpoints, "cpu", quantize=True, compile=True)
+
+    assert isinstance(compiled.rmvpe.model, torch.jit.ScriptModule)
+
+    compiled = render(compiled, audio)
+
+    assert compiled.shape == eager.shape
+    numpy.testing.assert_allclose(compiled, eager, atol=1e-4, rtol=0)
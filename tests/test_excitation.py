@@ -0,0 +1,59 @@
+import numpy
+import torch
+
+from modules.nsf_hifigan.models import ExcitationState, SourceModuleHnNSF
+
+SAMPLE_RATE = 44100
+UPP = 512
+
+def f0_track(frames: int) -> torch.Tensor:
+    # A glide with a vibrato and an unvoiced gap, so both the sines and the unvoiced noise are exercised.
+    f0 = 220 * 2 ** (numpy.linspace(-1, 1, frames) + 0.3 * numpy.sin(numpy.arange(frames) / 5) / 12)
+    f0[frames // 3:frames // 3 + 10] = 0
+
+    return torch.from_numpy(f0).float().unsqueeze(0)
+
+def source_module() -> SourceModuleHnNSF:
+    torch.manual_seed(0)
+
+    return SourceModuleHnNSF(sampling_rate=SAMPLE_RATE, harmonic_num=8).eval()
+
+def test_carried_state_matches_single_call():
+    source = source_module()
+    f0 = f0_track(300)
+
+    whole, _ = source(f0, UPP, ExcitationState.create(1, 9, seed=1))
+
+    state = ExcitationState.create(1, 9, seed=1)
+    pieces = []
+    for start, end in ((0, 150), (150, 230), (230, 300)):
+        piece, state = source(f0[:, start:end], UPP, state)
+        pieces.append(piece)
+
+    torch.testing.assert_close(torch.cat(pieces, dim=1), whole, atol=1e-5, rtol=0)
+
+def test_clone_replays_the_same_chunk():
+    source = source_module()
+    f0 = f0_track(40)
+    state = ExcitationState.create(2, 9, seed=3)
+    snapshot = state.clone()
+
+    first, next_state = source(f0.repeat(2, 1), UPP, state)
+    replay, replay_state = source(f0.repeat(2, 1), UPP, snapshot)
+
+    torch.testing.assert_close(replay, first, atol=0, rtol=0)
+    torch.testing.assert_close(replay_state.phase, next_state.phase, atol=0, rtol=0)
+
+def test_phase_is_continuous_across_calls():
+    # Without noise, the fundamental of the next chunk must continue the previous one's phase instead of restarting.
+    source = source_module()
+    source.l_sin_gen.noise_std = 0
+    f0 = torch.full((1, 20), 200.0)
+    state = ExcitationState.create(1, 9, seed=0)
+
+    sines, _, phase = source.l_sin_gen.excitation(f0, UPP, state.phase, state.generator)
+    next_sines, _, _ = source.l_sin_gen.excitation(f0, UPP, phase, state.generator)
+
+    expected = source.sine_amp * torch.sin(2 * numpy.pi * (torch.arange(1, 3, dtype=torch.float64) * 200 / SAMPLE_RATE + 20 * UPP * 200 / SAMPLE_RATE))
+    torch.testing.assert_close(next_sines[0, :2, 0].double(), expected, atol=1e-5, rtol=0)
+    assert sines.shape == next_sines.shape == (1, 20 * UPP, 9)
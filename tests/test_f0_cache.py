@@ -0,0 +1,63 @@
+import numpy
+
+from modules.shifter.f0_cache import F0Cache
+
+def model_file(tmp_path):
+    path = tmp_path / "model.pt"
+    path.write_bytes(b"weights")
+
+    return str(path)
+
+def test_get_returns_what_was_put(tmp_path):
+    cache = F0Cache(str(tmp_path / "cache"), model_file(tmp_path), 0.03)
+    audio = numpy.random.default_rng(0).standard_normal(1600).astype(numpy.float32)
+    f0 = numpy.linspace(100, 200, 11).astype(numpy.float32)
+
+    assert cache.get(cache.key(audio)) is None
+
+    cache.put(cache.key(audio), f0)
+
+    numpy.testing.assert_array_equal(cache.get(cache.key(audio)), f0)
+
+def test_entry_evicted_during_a_hit_is_still_returned(tmp_path, monkeypatch):
+    cache = F0Cache(str(tmp_path / "cache"), model_file(tmp_path), 0.03)
+    f0 = numpy.linspace(100, 200, 11).astype(numpy.float32)
+    cache.put("0" * 64, f0)
+
+    def evicted(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr("os.utime", evicted)
+
+    numpy.testing.assert_array_equal(cache.get("0" * 64), f0)
+
+def test_namespace_separates_settings(tmp_path):
+    model_path = model_file(tmp_path)
+    audio = numpy.zeros(1600, dtype=numpy.float32)
+    caches = [
+        F0Cache(str(tmp_path / "cache"), model_path, 0.03),
+        F0Cache(str(tmp_path / "cache"), model_path, 0.05),
+        F0Cache(str(tmp_path / "cache"), model_path, 0.03, use_viterbi=True),
+        F0Cache(str(tmp_path / "cache"), model_path, 0.03, precision="bf16"),
+        F0Cache(str(tmp_path / "cache"), model_path, 0.03, backend="onnx"),
+    ]
+
+    assert len({cache.key(audio) for cache in caches}) == len(caches)
+
+def test_eviction_keeps_the_limit_and_scans_only_when_over_it(tmp_path, monkeypatch):
+    cache = F0Cache(str(tmp_path / "cache"), model_file(tmp_path), 0.03, max_size_mb=0.1)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1) or evict())
+
+    for index in range(300):
+        cache.put(f"{index:064x}", numpy.zeros(256, dtype=numpy.float32))
+
+    files = list((tmp_path / "cache").glob("*.npy"))
+
+    assert sum(path.stat().st_size for path in files) <= cache.max_size
+    assert cache.size == sum(path.stat().st_size for path in files)
+    # One scan on the first write, then one each time the entries written since the last eviction fill the headroom.
+    assert len(scans) <= 300 // 5
+    assert (tmp_path / "cache" / f"{299:064x}.npy").exists()
+    assert not (tmp_path / "cache" / f"{0:064x}.npy").exists()
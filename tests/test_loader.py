@@ -0,0 +1,91 @@
+import numpy
+import pytest
+import soundfile
+
+from modules.shifter.loader import decode_audio, decode_audio_bytes, read_wav_layout
+
+SAMPLE_RATE = 22050
+
+def write(path, channels: int = 1, subtype: str = "PCM_16", format: str = "WAV", **metadata):
+    audio = numpy.random.default_rng(channels).uniform(-0.9, 0.9, (SAMPLE_RATE // 2, channels))
+
+    with soundfile.SoundFile(str(path), "w", SAMPLE_RATE, channels, subtype, format=format) as file:
+        for name, value in metadata.items():
+            setattr(file, name, value)
+
+        file.write(audio)
+
+    return str(path)
+
+def reference(path: str) -> numpy.ndarray:
+    audio, _ = soundfile.read(path, dtype="float32", always_2d=True)
+
+    return audio.mean(axis=1, dtype=numpy.float32) if audio.shape[1] > 1 else audio[:, 0]
+
+@pytest.mark.parametrize("subtype", ["PCM_16", "PCM_32", "FLOAT", "DOUBLE"])
+@pytest.mark.parametrize("channels", [1, 2, 3])
+def test_memory_mapped_formats(tmp_path, subtype, channels):
+    path = write(tmp_path / "audio.wav", channels, subtype)
+    decoded = decode_audio(path)
+
+    assert decoded.decoder == "wav-mmap"
+    assert decoded.sample_rate == SAMPLE_RATE
+    assert decoded.audio.dtype == numpy.float32
+
+    if channels == 1:
+        numpy.testing.assert_array_equal(decoded.audio, reference(path))
+    else:
+        # The channel mean is taken before scaling integer samples, so it can differ in the last bit.
+        numpy.testing.assert_allclose(decoded.audio, reference(path), atol=1e-7, rtol=0)
+
+@pytest.mark.parametrize("subtype, format", [("PCM_24", "WAV"), ("PCM_U8", "WAV"), ("PCM_16", "RF64")])
+def test_unsupported_layouts_fall_back_to_soundfile(tmp_path, subtype, format):
+    path = write(tmp_path / "audio.wav", 2, subtype, format)
+
+    assert read_wav_layout(path) is None
+
+    decoded = decode_audio(path)
+
+    assert decoded.decoder == "soundfile"
+    numpy.testing.assert_array_equal(decoded.audio, reference(path))
+
+def test_skips_list_chunks(tmp_path):
+    path = write(tmp_path / "audio.wav", title="title", artist="artist")
+
+    with open(path, "rb") as file:
+        assert b"LIST" in file.read()
+
+    decoded = decode_audio(path)
+
+    assert decoded.decoder == "wav-mmap"
+    numpy.testing.assert_array_equal(decoded.audio, reference(path))
+
+def test_truncated_file_keeps_the_complete_frames(tmp_path):
+    path = write(tmp_path / "audio.wav", 2)
+    expected = reference(path)
+    data = (tmp_path / "audio.wav").read_bytes()
+    # Cut the file in the middle of a frame, leaving the header's data size larger than what is left.
+    (tmp_path / "audio.wav").write_bytes(data[:-1001])
+
+    decoded = decode_audio(path)
+    frames = (len(data) - 1001 - read_wav_layout(path).offset) // 4
+
+    assert decoded.decoder == "wav-mmap"
+    assert len(decoded.audio) == frames
+    numpy.testing.assert_allclose(decoded.audio, expected[:frames], atol=1e-7, rtol=0)
+
+def test_not_a_wav_file_is_not_memory_mapped(tmp_path):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(b"RIFF\x10\x00\x00\x00WAVEjunk" + bytes(64))
+
+    assert read_wav_layout(str(path)) is None
+
+    with pytest.raises(Exception):
+        decode_audio(str(path))
+
+def test_decode_bytes(tmp_path):
+    path = write(tmp_path / "audio.flac", 2, "PCM_16", "FLAC")
+    decoded = decode_audio_bytes(open(path, "rb").read(), suffix=".flac")
+
+    assert decoded.decoder == "soundfile"
+    numpy.testing.assert_array_equal(decoded.audio, reference(path))
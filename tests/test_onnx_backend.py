@@ -0,0 +1,33 @@
+import numpy
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from benchmarks.fixtures import synthetic_audio
+from modules.shifter import Shift
+from modules.shifter.onnx_backend import export_generator, export_rmvpe
+from modules.shifter.precision import compare_precision
+
+@pytest.fixture(scope="module")
+def onnx_shifter(checkpoints, shifter):
+    nsf_hifigan, rmvpe = checkpoints
+    export_generator(shifter.generator, nsf_hifigan)
+    export_rmvpe(shifter.rmvpe.model, rmvpe)
+
+    return Shift(nsf_hifigan, rmvpe, "cpu", backend="onnx")
+
+def test_onnx_matches_torch(onnx_shifter, shifter):
+    # Same analysis and excitation on both sides, so the outputs only differ by the kernels.
+    metrics = compare_precision(onnx_shifter, shifter, synthetic_audio("vocal", 1.0), 3)
+
+    assert metrics["snr_db"] > 60
+    assert metrics["f0_mismatch"] == 0
+    assert metrics["f0_max_error_cents"] < 1
+
+def test_onnx_batch_matches_single(onnx_shifter):
+    # The exported graphs have a dynamic batch axis, including RMVPE's GRU.
+    audios = [synthetic_audio("vocal", 1.0), synthetic_audio("sweep", 0.6)]
+
+    for audio, analysis in zip(audios, onnx_shifter.analyze_batch(audios)):
+        numpy.testing.assert_allclose(analysis.f0, onnx_shifter.analyze(audio).f0, rtol=1e-4)
@@ -0,0 +1,29 @@
+import numpy
+import pytest
+import torch
+
+from benchmarks.fixtures import synthetic_audio
+from modules.shifter import Shift
+from modules.shifter.precision import compare_outputs, compare_precision, cpu_supports, resolve_precision
+
+def test_compare_outputs():
+    reference = numpy.sin(numpy.linspace(0, 100, 4410)).astype(numpy.float32)
+
+    assert compare_outputs(reference, reference) == {"snr_db": float("inf"), "max_error": 0.0}
+    assert compare_outputs(reference, reference * 1.01)["snr_db"] == pytest.approx(40, abs=0.1)
+
+def test_fp32_reference_is_deterministic(shifter):
+    # Both renders draw the same SineGen noise, so any difference in a real comparison comes from the precision.
+    metrics = compare_precision(shifter, shifter, synthetic_audio("vocal", 1.0), 0)
+
+    assert metrics["max_error"] == 0
+    assert metrics["f0_mismatch"] == 0
+
+@pytest.mark.skipif(not cpu_supports(torch.bfloat16), reason="no native bf16 on this CPU")
+def test_bf16_vocoder_snr(checkpoints, shifter):
+    bf16 = Shift(*checkpoints, "cpu", precision="bf16")
+    metrics = compare_precision(bf16, shifter, synthetic_audio("vocal", 1.0), 0)
+
+    assert bf16.precision == resolve_precision("bf16", torch.device("cpu"))
+    assert metrics["snr_db"] > 25
+    assert metrics["f0_mismatch"] < 0.01
@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+
+import loguru
+import pytest
+
+from modules.shifter.profiler import Profiler, chrome_trace, log_summary, merge_records, summarize, write_report
+
+@pytest.fixture
+def messages():
+    messages = []
+    handler = loguru.logger.add(messages.append, level="INFO", format="{message}")
+
+    yield messages
+
+    loguru.logger.remove(handler)
+
+def profile_files(profiler, names):
+    # Every file runs a decode stage and a model stage with two nested vocoder calls.
+    for name in names:
+        with profiler.record(name):
+            with profiler.stage("decode"):
+                time.sleep(0.002)
+
+            with profiler.stage("model"):
+                for _ in range(2):
+                    with profiler.stage("vocoder"):
+                        time.sleep(0.005)
+
+    return profiler
+
+def test_stage_table(messages):
+    records = profile_files(Profiler(enabled=True), ["a.wav", "b.wav", "c.wav"]).drain()
+    summary = summarize(records)
+
+    # Stages are sorted by total time, and the total includes the stages nested in it.
+    assert list(summary) == ["total", "model", "vocoder", "decode"]
+    assert summary["total"]["wall_total"] >= summary["model"]["wall_total"] >= summary["vocoder"]["wall_total"] >= 0.03
+
+    assert summary["vocoder"]["records"] == 3 and summary["vocoder"]["calls"] == 6
+    assert summary["decode"]["wall_p50"] <= summary["decode"]["wall_p90"] <= summary["decode"]["wall_p99"]
+
+    log_summary(summary)
+    header, *rows = [message.strip() for message in messages]
+
+    assert header.split() == ["Stage", "total", "p50", "p90", "p99", "cpu", "peak", "MB"]
+    assert [row.split()[0] for row in rows] == list(summary)
+    assert rows[1].split()[1] == f"{summary['model']['wall_total']:.3f}s"
+
+def test_disabled_profiler_records_nothing():
+    assert profile_files(Profiler(), ["a.wav"]).drain() == []
+
+def test_records_of_one_file_on_several_threads_are_merged():
+    profiler = Profiler(enabled=True)
+    thread = threading.Thread(target=profile_files, args=(profiler, ["a.wav"]))
+    thread.start()
+    thread.join()
+    profile_files(profiler, ["a.wav"])
+
+    records = merge_records(profiler.drain())
+
+    assert len(records) == 1
+    assert records[0].stages["vocoder"].calls == 4
+    assert len({event[3] for event in records[0].events}) == 2
+
+def test_chrome_trace(tmp_path):
+    records = merge_records(profile_files(Profiler(enabled=True), ["a.wav", "b.wav"]).drain())
+    trace = chrome_trace(records)
+    events = trace["traceEvents"]
+
+    assert trace["displayTimeUnit"] == "ms"
+    assert len(events) == 2 * 5
+    assert min(event["ts"] for event in events) == 0
+    assert all(event["ph"] == "X" and event["dur"] > 0 for event in events)
+    assert {event["args"]["record"] for event in events} == {"a.wav", "b.wav"}
+
+    # Nested stages lie within the stage they are nested in.
+    for name in ("a.wav", "b.wav"):
+        spans = {event["name"]: event for event in events if event["args"]["record"] == name and event["name"] != "vocoder"}
+        vocoders = [event for event in events if event["args"]["record"] == name and event["name"] == "vocoder"]
+
+        assert spans["total"]["ts"] <= spans["decode"]["ts"] < spans["model"]["ts"]
+        assert all(spans["model"]["ts"] <= event["ts"] and event["ts"] + event["dur"] <= spans["model"]["ts"] + spans["model"]["dur"] for event in vocoders)
+
+    path = tmp_path / "profile.json"
+    summary = write_report(records, str(path))
+
+    assert json.loads(path.read_text())["stages"] == summary
+    assert json.loads((tmp_path / "profile.trace.json").read_text()) == trace
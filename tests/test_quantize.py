@@ -0,0 +1,74 @@
+import os
+
+import numpy
+import pytest
+import soundfile
+import torch
+
+from benchmarks.fixtures import random_checkpoints, synthetic_audio
+from modules.shifter import Shift
+from modules.shifter.quantize import calibrate, calibrate_rmvpe, calibration_segments, load_quantized_rmvpe, quantized_path, save_quantized_rmvpe
+
+# The argmax of random weights jumps between near-equal bins on some frames, so the F0 tolerance is on the median.
+F0_MEDIAN_ERROR_CENTS = 1.0
+SALIENCE_ERROR = 0.02
+
+@pytest.fixture(scope="module")
+def quantized_checkpoints(tmp_path_factory):
+    # Separate checkpoints, since the tests write the int8 model next to them and touch the RMVPE checkpoint.
+    return random_checkpoints(str(tmp_path_factory.mktemp("quantized")))
+
+@pytest.fixture(scope="module")
+def reference(quantized_checkpoints):
+    return Shift(*quantized_checkpoints, "cpu")
+
+@pytest.fixture(scope="module")
+def audio_16k(reference):
+    return reference.resampler(torch.from_numpy(synthetic_audio("vocal", 2.0)), reference.sample_rate, 16000)
+
+@pytest.fixture(scope="module")
+def quantized_model(reference, audio_16k):
+    return calibrate_rmvpe(reference.rmvpe.model, calibration_segments(reference.rmvpe.mel_extractor(audio_16k.unsqueeze(0), center=True)))
+
+def test_quantized_rmvpe_stays_within_f0_tolerance(quantized_checkpoints, reference, audio_16k, quantized_model):
+    save_quantized_rmvpe(quantized_model, quantized_checkpoints[1])
+
+    shifter = Shift(*quantized_checkpoints, "cpu", quantize=True)
+    assert isinstance(shifter.rmvpe.model, torch.jit.ScriptModule)
+
+    mel = reference.rmvpe.mel_extractor(audio_16k.unsqueeze(0), center=True)
+    assert (shifter.rmvpe.mel2hidden(mel) - reference.rmvpe.mel2hidden(mel)).abs().amax(dim=-1).mean() < SALIENCE_ERROR
+
+    f0 = shifter.rmvpe.infer_from_audio(audio_16k, 16000, "cpu")
+    reference_f0 = reference.rmvpe.infer_from_audio(audio_16k, 16000, "cpu")
+    voiced = (f0 > 0) & (reference_f0 > 0)
+
+    assert numpy.mean((f0 > 0) != (reference_f0 > 0)) < 0.01
+    assert numpy.median(numpy.abs(1200 * numpy.log2(f0[voiced] / reference_f0[voiced]))) < F0_MEDIAN_ERROR_CENTS
+
+def test_stale_quantized_model_is_ignored_and_rebuilt(quantized_checkpoints, quantized_model):
+    nsf_hifigan, rmvpe = quantized_checkpoints
+
+    save_quantized_rmvpe(quantized_model, rmvpe)
+    assert load_quantized_rmvpe(rmvpe) is not None
+
+    # A newer checkpoint makes the saved int8 model stale: Shift falls back to dynamic quantization instead of using it.
+    stat = os.stat(rmvpe)
+    os.utime(rmvpe, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert load_quantized_rmvpe(rmvpe) is None
+    assert not isinstance(Shift(nsf_hifigan, rmvpe, "cpu", quantize=True).rmvpe.model, torch.jit.ScriptModule)
+
+    save_quantized_rmvpe(quantized_model, rmvpe)
+
+    assert isinstance(load_quantized_rmvpe(rmvpe), torch.jit.ScriptModule)
+
+def test_calibrate_compares_full_renders(quantized_checkpoints, tmp_path):
+    soundfile.write(str(tmp_path / "vocal.wav"), synthetic_audio("vocal", 2.0), 44100)
+    quantized_path(quantized_checkpoints[1]).unlink(missing_ok=True)
+
+    metrics = calibrate(str(tmp_path), *quantized_checkpoints)
+
+    assert quantized_path(quantized_checkpoints[1]).exists()
+    # Same seed, same fp32 vocoder: only the int8 F0 can make the renders differ, so the SNR is finite but high.
+    assert 10 < metrics["snr_db"] < float("inf")
@@ -0,0 +1,26 @@
+import pytest
+import torch
+
+from modules.shifter.resample import Resampler
+
+torchaudio = pytest.importorskip("torchaudio")
+
+@pytest.mark.parametrize("orig_sr, target_sr", [(44100, 16000), (48000, 44100), (22050, 44100), (16000, 16000)])
+@pytest.mark.parametrize("lowpass_filter_width", [16, 128])
+def test_matches_torchaudio(orig_sr, target_sr, lowpass_filter_width):
+    audio = torch.randn(2, orig_sr, generator=torch.Generator().manual_seed(0))
+
+    resampled = Resampler(lowpass_filter_width)(audio, orig_sr, target_sr)
+    expected = torchaudio.functional.resample(audio, orig_sr, target_sr, lowpass_filter_width=lowpass_filter_width, rolloff=0.99)
+
+    assert resampled.shape == expected.shape
+    torch.testing.assert_close(resampled, expected, atol=1e-4, rtol=0)
+
+def test_reuses_the_kernel_per_rate_pair():
+    resampler = Resampler()
+    audio = torch.randn(44100)
+
+    resampler(audio, 44100, 16000)
+    resampler(audio[:1000], 44100, 16000)
+
+    assert len(resampler.kernels) == 1
@@ -0,0 +1,69 @@
+import numpy
+import pytest
+import torch
+
+from modules.rmvpe.constants import CONST, N_CLASS
+from modules.rmvpe.utils import to_local_average_cents, viterbi_path
+
+def dense_viterbi(prob: numpy.ndarray, width: int = 30) -> numpy.ndarray:
+    # The decoder RMVPE shipped with: a full triangular transition matrix over all bins and a uniform prior.
+    states = numpy.arange(prob.shape[1])
+    transition = numpy.maximum(width - numpy.abs(states[:, None] - states[None, :]), 0).astype(numpy.float64)
+    log_trans = numpy.log(transition / transition.sum(axis=1, keepdims=True) + numpy.finfo(numpy.float64).tiny)
+    log_prob = numpy.log(prob + numpy.finfo(prob.dtype).tiny)
+
+    value = log_prob[0] - numpy.log(prob.shape[1])
+    pointers = numpy.zeros(prob.shape, dtype=numpy.int64)
+
+    for t in range(1, len(prob)):
+        scores = value[:, None] + log_trans
+        pointers[t] = numpy.argmax(scores, axis=0)
+        value = scores[pointers[t], states] + log_prob[t]
+
+    path = numpy.empty(len(prob), dtype=numpy.int64)
+    path[-1] = numpy.argmax(value)
+
+    for t in range(len(prob) - 1, 0, -1):
+        path[t - 1] = pointers[t, path[t]]
+
+    return path
+
+def frame_cents(salience: numpy.ndarray, thred: float) -> float:
+    center = int(numpy.argmax(salience))
+    start, end = max(0, center - 4), min(len(salience), center + 5)
+    window = salience[start:end]
+
+    return numpy.sum(window * (20 * numpy.arange(start, end) + CONST)) / numpy.sum(window) if numpy.max(window) > thred else 0
+
+def melody(frames: int, seed: int) -> numpy.ndarray:
+    # A wandering pitch track with salience blurred around it, plus noise and a few unvoiced frames.
+    random = numpy.random.default_rng(seed)
+    track = numpy.clip(180 + numpy.cumsum(random.integers(-6, 7, frames)), 0, N_CLASS - 1)
+    salience = numpy.exp(-0.5 * ((numpy.arange(N_CLASS)[None, :] - track[:, None]) / 3) ** 2)
+    salience += 0.3 * random.random((frames, N_CLASS))
+    salience[random.random(frames) < 0.1] *= 0.01
+
+    return salience.astype(numpy.float32)
+
+@pytest.mark.parametrize("salience", [melody(300, 0), melody(50, 1), numpy.random.default_rng(2).random((120, N_CLASS)).astype(numpy.float32)], ids=["melody", "short", "noise"])
+def test_banded_viterbi_matches_dense(salience):
+    prob = salience / salience.sum(axis=1, keepdims=True)
+
+    numpy.testing.assert_array_equal(viterbi_path(prob), dense_viterbi(prob))
+
+def test_viterbi_path_accepts_tensors_and_empty_input():
+    prob = melody(40, 3)
+    prob /= prob.sum(axis=1, keepdims=True)
+
+    numpy.testing.assert_array_equal(viterbi_path(torch.from_numpy(prob)).numpy(), viterbi_path(prob))
+    assert viterbi_path(numpy.zeros((0, N_CLASS), dtype=numpy.float32)).shape == (0,)
+
+def test_local_average_cents_matches_per_frame():
+    salience = melody(200, 4)
+    salience[:5, :3] = 1.0
+    salience[5:10, -3:] = 1.0
+
+    expected = numpy.array([frame_cents(frame, 0.03) for frame in salience])
+
+    numpy.testing.assert_allclose(to_local_average_cents(salience, thred=0.03), expected, rtol=1e-6)
+    numpy.testing.assert_allclose(to_local_average_cents(salience[7], thred=0.03), expected[7], rtol=1e-6)
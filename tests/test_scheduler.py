@@ -0,0 +1,47 @@
+import threading
+
+import numpy
+
+from modules.shifter.scheduler import MAX_BATCH, MicroBatchScheduler
+
+class RecordingShifter:
+    # Stands in for Shift: renders by scaling the input by the key, and records the size of every batch.
+    batch_size = 1
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+
+    def render_batch(self, audios, key_shifts):
+        self.release.wait()
+        self.batches.append(len(audios))
+
+        if any(len(audio) == 0 for audio in audios):
+            raise ValueError("empty input")
+
+        return [audio * key_shift for audio, key_shift in zip(audios, key_shifts)]
+
+def test_batches_concurrent_requests_by_default():
+    shifter = RecordingShifter()
+    scheduler = MicroBatchScheduler(shifter, max_delay=0.05)
+
+    # The first request is held in render_batch while the others queue up behind it.
+    futures = [scheduler.submit(numpy.ones(4), key) for key in range(1, 6)]
+    shifter.release.set()
+
+    for key, future in enumerate(futures, 1):
+        numpy.testing.assert_array_equal(future.result(timeout=10), numpy.full(4, key))
+
+    assert scheduler.max_batch_size == MAX_BATCH > shifter.batch_size
+    assert sum(shifter.batches) == 5 and len(shifter.batches) < 5
+
+def test_failed_request_does_not_fail_the_batch():
+    shifter = RecordingShifter()
+    shifter.release.set()
+    scheduler = MicroBatchScheduler(shifter, max_batch_size=2, max_delay=0.5)
+
+    good = scheduler.submit(numpy.ones(4), 2)
+    bad = scheduler.submit(numpy.ones(0), 2)
+
+    numpy.testing.assert_array_equal(good.result(timeout=10), numpy.full(4, 2))
+    assert isinstance(bad.exception(timeout=10), ValueError)
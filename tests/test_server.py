@@ -0,0 +1,64 @@
+import concurrent.futures
+import threading
+
+import numpy
+import pytest
+
+from benchmarks.fixtures import remove_excitation_noise, synthetic_audio
+from modules.shifter import Shift
+from modules.shifter.client import ShiftClient
+from modules.shifter.server import ShiftServer
+
+# The response is 16-bit PCM.
+PCM_TOLERANCE = 1e-4
+
+@pytest.fixture(scope="module")
+def server(checkpoints):
+    shifter = Shift(*checkpoints, "cpu")
+    remove_excitation_noise(shifter.generator)
+
+    # Port 0 picks a free port. The delay is long enough for concurrent requests to share a batch.
+    server = ShiftServer(shifter, "127.0.0.1", 0, max_delay=0.5)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(server):
+    return ShiftClient(f"http://127.0.0.1:{server.server_address[1]}", timeout=120)
+
+def test_shift_returns_the_rendered_audio(server, client):
+    audio = synthetic_audio("vocal", 1.0)
+
+    output = client.process_audio(audio, 3.0)
+
+    numpy.testing.assert_allclose(output, server.shifter.render_batch([audio], [3.0])[0], atol=PCM_TOLERANCE, rtol=0)
+    assert client.health()["status"] == "ok"
+
+def test_concurrent_requests_share_a_batch(server, client):
+    audios = [synthetic_audio(signal, 1.0) for signal in ("vocal", "sweep", "noise", "vocal")]
+    key_shifts = [0.0, 2.0, -3.0, 5.0]
+    before = server.scheduler.stats()
+
+    with concurrent.futures.ThreadPoolExecutor(len(audios)) as executor:
+        outputs = list(executor.map(client.process_audio, audios, key_shifts))
+
+    after = server.scheduler.stats()
+
+    assert after["requests"] - before["requests"] == len(audios)
+    assert after["batches"] - before["batches"] < len(audios)
+
+    for audio, key_shift, output in zip(audios, key_shifts, outputs):
+        numpy.testing.assert_allclose(output, server.shifter.render_batch([audio], [key_shift])[0], atol=PCM_TOLERANCE, rtol=0)
+
+@pytest.mark.parametrize("data, query", [
+    (b"not audio", {"key_shift": 0}),
+    (b"RIFF", {"key_shift": "up"}),
+    (b"RIFF", {"format": "aiff"}),
+])
+def test_bad_request_is_rejected_with_400(client, data, query):
+    with pytest.raises(RuntimeError, match="Server error 400"):
+        client.request("/shift", data, query)
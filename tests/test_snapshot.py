@@ -0,0 +1,64 @@
+import os
+
+import loguru
+import pytest
+import torch
+
+from benchmarks.fixtures import random_checkpoints
+from modules.nsf_hifigan.models import load_model
+from modules.rmvpe.inference import RMVPE
+from modules.shifter.snapshot import fused_path, load_fused_generator, load_fused_rmvpe, save_snapshot
+
+@pytest.fixture
+def snapshot_checkpoints(tmp_path):
+    # Separate checkpoints, since the tests write the fused snapshots next to them and touch them.
+    return random_checkpoints(str(tmp_path))
+
+@pytest.fixture
+def warnings():
+    messages = []
+    handler = loguru.logger.add(messages.append, level="WARNING", format="{message}")
+
+    yield messages
+
+    loguru.logger.remove(handler)
+
+def test_fused_snapshot_round_trip(snapshot_checkpoints):
+    nsf_hifigan, rmvpe = snapshot_checkpoints
+    generator, _ = load_model(nsf_hifigan, device="cpu")
+    model = RMVPE(rmvpe, hop_length=160).model
+
+    save_snapshot(generator, nsf_hifigan)
+    save_snapshot(model, rmvpe)
+
+    fused_generator, config = load_fused_generator(nsf_hifigan)
+    fused_model = load_fused_rmvpe(rmvpe)
+
+    assert config.hop_size == 512
+    for expected, loaded in ((generator, fused_generator), (model, fused_model)):
+        state_dict = loaded.state_dict()
+
+        assert state_dict.keys() == expected.state_dict().keys()
+        assert all(torch.equal(state_dict[name], tensor) for name, tensor in expected.state_dict().items())
+        assert not loaded.training
+
+    mel = torch.randn(1, 128, 32)
+    source = torch.randn(1, 1, 32 * generator.upp)
+
+    with torch.no_grad():
+        torch.testing.assert_close(fused_generator.vocode(mel, source), generator.vocode(mel, source), atol=0, rtol=0)
+        torch.testing.assert_close(fused_model(mel), model(mel), atol=0, rtol=0)
+
+def test_changed_checkpoint_invalidates_the_snapshot(snapshot_checkpoints, warnings):
+    nsf_hifigan, rmvpe = snapshot_checkpoints
+
+    save_snapshot(load_model(nsf_hifigan, device="cpu")[0], nsf_hifigan)
+    save_snapshot(RMVPE(rmvpe, hop_length=160).model, rmvpe)
+
+    for model_path in snapshot_checkpoints:
+        stat = os.stat(model_path)
+        os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert load_fused_generator(nsf_hifigan) is None
+    assert load_fused_rmvpe(rmvpe) is None
+    assert [message.strip() for message in warnings] == [f"Fused model is older than its checkpoint, ignoring: {fused_path(model_path)}" for model_path in snapshot_checkpoints]
@@ -0,0 +1,85 @@
+import numpy
+import pytest
+import torch
+
+from modules.nsf_hifigan.models import VocoderState
+from modules.shifter.streaming import StreamingShift, vocoder_latency
+
+def stream_and_render(shifter, block_size=2048, lookahead_frames=4):
+    # Renders the same audio block by block and in one vocoder call, with one F0 track and one excitation seed for
+    # both, so that only the vocoder's view of the neighbouring frames can make them differ.
+    audio = numpy.random.default_rng(0).standard_normal(shifter.sample_rate * 2).astype(numpy.float32) * 0.1
+    frames = len(audio) // shifter.hop_length + 1
+    f0 = 220 * 2 ** (numpy.sin(numpy.arange(frames + 64) / 9) / 12).astype(numpy.float32)
+
+    stream = StreamingShift(shifter, lookahead_frames=lookahead_frames, seed=0)
+    stream.extract_f0 = lambda commit, end: f0[stream.emitted:commit]
+    streamed = numpy.concatenate([stream.process(audio[start:start + block_size]) for start in range(0, len(audio), block_size)] + [stream.flush()])
+
+    with torch.no_grad():
+        mel = shifter.mel_extractor(torch.from_numpy(audio).unsqueeze(0))
+        whole, _ = shifter.generator(mel, torch.from_numpy(f0[:mel.shape[-1]]).unsqueeze(0), shifter.generator.initial_state(1, "cpu", 0))
+
+    whole = whole.squeeze().numpy()
+    streamed = streamed[stream.latency:stream.latency + len(whole)]
+
+    # The first and last frames see the padding of the two mel extractions, which differs.
+    edge = 20 * shifter.hop_length
+
+    return streamed[edge:-edge], whole[edge:-edge]
+
+@pytest.mark.parametrize("block_size, lookahead_frames", [(2048, 4), (300, 1), (5000, 14)])
+def test_streaming_matches_whole_file_render(shifter, block_size, lookahead_frames):
+    streamed, whole = stream_and_render(shifter, block_size, lookahead_frames)
+
+    numpy.testing.assert_allclose(streamed, whole, atol=1e-4, rtol=0)
+
+@pytest.mark.parametrize("source_lag", [0, 4 * 512, 14 * 512])
+def test_vocoder_latency_matches_the_streamed_output(shifter, source_lag):
+    generator = shifter.generator
+    state = VocoderState()
+    mel = torch.randn(1, shifter.config.num_mels, 40)
+    source = torch.randn(1, 1, 40 * generator.upp)
+    produced = 0
+
+    with torch.no_grad():
+        for frame in range(40):
+            produced += generator.vocode_step(mel[..., frame:frame + 1], source[..., max(0, frame * generator.upp - source_lag):max(0, (frame + 1) * generator.upp - source_lag)], state).shape[-1]
+
+    assert (frame + 1) * generator.upp - produced == vocoder_latency(shifter.config, source_lag)
+
+def test_vocoder_work_per_block_is_bounded_by_the_block_size(shifter, monkeypatch):
+    # Counts the input samples of every convolution, per channel, for a whole-file render and for every block of a
+    # stream of one frame per block: each block may only add the inputs every layer keeps between blocks.
+    generator = shifter.generator
+    frames = 48
+    work = []
+
+    def counted(function):
+        def wrapper(input, *args, **kwargs):
+            work[-1] += input.numel()
+            return function(input, *args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(torch.nn.functional, "conv1d", counted(torch.nn.functional.conv1d))
+    monkeypatch.setattr(torch.nn.functional, "conv_transpose1d", counted(torch.nn.functional.conv_transpose1d))
+
+    state = VocoderState()
+    mel = torch.randn(1, shifter.config.num_mels, frames)
+    source = torch.randn(1, 1, frames * generator.upp)
+
+    with torch.no_grad():
+        for frame in range(frames):
+            work.append(0)
+            generator.vocode_step(mel[..., frame:frame + 1], source[..., frame * generator.upp:(frame + 1) * generator.upp], state)
+
+        work.append(0)
+        generator.vocode(mel, source)
+
+    whole = work.pop()
+    kept = sum(input.numel() for input in state.inputs.values())
+
+    assert max(work) <= whole / frames + kept
+    # A window with the receptive field on both sides, as re-vocoding the context would need, is far above that.
+    assert max(work) < 3 * whole / frames
@@ -0,0 +1,19 @@
+import pytest
+
+from modules.shifter.utils import parse_key_shifts
+
+@pytest.mark.parametrize("value, expected", [
+    ("3", [3.0]),
+    ("-2:2", [-2.0, -1.0, 0.0, 1.0, 2.0]),
+    ("12:-12:6", [12.0, 6.0, 0.0, -6.0, -12.0]),
+    ("0:0.3:0.1", [0.0, 0.1, 0.2, 0.3]),
+    ("-12:12:5", [-12.0, -7.0, -2.0, 3.0, 8.0]),
+    ("0:1:0.35", [0.0, 0.35, 0.7]),
+])
+def test_parse_key_shifts(value, expected):
+    assert parse_key_shifts(value) == expected
+
+@pytest.mark.parametrize("value", ["0:1:0", "0:1:2:3"])
+def test_parse_key_shifts_invalid(value):
+    with pytest.raises(ValueError):
+        parse_key_shifts(value)